@@ -0,0 +1,415 @@
+"""Provides an asyncio interface to PvDatasets, for services loading parameters and data arrays of many studies.
+
+The blocking pvobj and analyzer classes do the actual work: every call that touches the storage (opening a
+study, indexing a scan, parsing a parameter file, reading a data array) runs in a thread pool, so the event
+loop is never blocked. The number of such calls running at once is bounded per storage device by the
+`DeviceLimiter`, shared by all studies of the process: a local disk, a network file system mount or an HTTP
+file server is not overloaded when many studies are read concurrently, while studies on different devices
+do not wait for each other.
+
+Cancelling a coroutine of this module returns immediately. A blocking call that already started runs to
+completion in its thread and its result is discarded; its slot of the device limit is only released when it
+returns, so the bound holds for the threads actually reading. Frame iteration reads one batch of frames per
+blocking call, so a cancelled iteration stops reading within one batch.
+
+Examples:
+    >>> study = await AsyncStudy.open('20190724_114946_BRKRAW_1_1.zip')
+    >>> scan = await study.get_scan(3)
+    >>> method = await scan.get_parameter('method')
+    >>> dataarray = await scan.get_dataarray()
+    >>> async for frame in scan.iter_frames(reco_id=1):
+    ...     process(frame)
+
+Classes:
+    DeviceLimiter: Bounds the number of concurrent blocking calls per storage device.
+    AsyncStudy: The asyncio interface of a PvStudy.
+    AsyncScan: The asyncio interface of a PvScan.
+
+Attributes:
+    device_limiter (DeviceLimiter): The limiter shared by all asynchronous studies in this process.
+"""
+
+from __future__ import annotations
+import os
+import asyncio
+import weakref
+import threading
+from functools import partial
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from .pvobj import PvStudy
+from .pvobj.storage import is_url
+from .analyzer import ScanInfoAnalyzer, DataArrayAnalyzer
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Callable, Dict, Hashable, Iterable, Optional, Union, AsyncIterator
+    from concurrent.futures import Executor, Future
+    import numpy as np
+    from .pvobj import PvScan, Parameter
+    from .data.scan import ScanInfo
+
+
+def get_device(path: Union[Path, str]) -> Hashable:
+    """Identifies the storage device of a dataset: the device ID of a local path, or the host of a URL.
+
+    Args:
+        path (Path or str): The path to the dataset, or its URL.
+
+    Returns:
+        Hashable: The device key, or None if the path cannot be stat'ed.
+    """
+    if is_url(path):
+        return urlsplit(path).netloc.lower()
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return None
+
+
+class DeviceLimiter:
+    """Bounds the number of concurrent blocking calls per storage device.
+
+    Each device gets its own semaphore in each event loop. Limits can be set per device, through any path on
+    that device; other devices use the default limit.
+
+    Args:
+        default (int, optional): The default number of concurrent calls per device. Defaults to the
+            `BRKRAW_AIO_LIMIT` environment variable, or 4.
+    """
+    def __init__(self, default: Optional[int] = None):
+        self.default = default or int(os.environ.get('BRKRAW_AIO_LIMIT', 4))
+        self._limits: Dict[Hashable, int] = {}
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def set_limit(self, path: Union[Path, str], limit: Optional[int]):
+        """Sets the number of concurrent calls allowed on the device of a path.
+
+        The limit applies to semaphores created afterwards, i.e. in event loops that did not use the device yet.
+
+        Args:
+            path (Path or str): A path on the device, or a URL on the server.
+            limit (int, optional): The number of concurrent calls, or None to restore the default.
+        """
+        device = get_device(path)
+        with self._lock:
+            if limit is None:
+                self._limits.pop(device, None)
+            else:
+                self._limits[device] = limit
+
+    def get_limit(self, device: Hashable) -> int:
+        """Returns the number of concurrent calls allowed on a device."""
+        return self._limits.get(device, self.default)
+
+    def get_semaphore(self, device: Hashable) -> asyncio.Semaphore:
+        """Returns the semaphore of a device in the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._semaphores.setdefault(loop, {})
+            if (semaphore := semaphores.get(device)) is None:
+                semaphore = semaphores[device] = asyncio.Semaphore(self.get_limit(device))
+        return semaphore
+
+
+device_limiter = DeviceLimiter()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(thread_name_prefix='brkraw-aio')
+    return _executor
+
+
+class _Runner:
+    """Runs blocking calls in a thread pool, within the limit of a storage device."""
+    def __init__(self, device: Hashable, executor: Optional[Executor] = None,
+                 limiter: Optional[DeviceLimiter] = None):
+        self.device = device
+        self.executor = executor
+        self.limiter = limiter or device_limiter
+
+    async def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Waits for a slot of the device and starts a blocking call.
+
+        Returns:
+            Future: The concurrent future of the call. The slot is released when the call returns.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self.limiter.get_semaphore(self.device)
+        await semaphore.acquire()
+        try:
+            future = (self.executor or _get_executor()).submit(partial(func, *args, **kwargs))
+        except BaseException:
+            semaphore.release()
+            raise
+        future.add_done_callback(lambda _: self._release(loop, semaphore))
+        return future
+
+    @staticmethod
+    def _release(loop: asyncio.AbstractEventLoop, semaphore: asyncio.Semaphore):
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:
+            # the event loop is closed
+            pass
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Runs a blocking call and returns its result."""
+        return await asyncio.wrap_future(await self.submit(func, *args, **kwargs))
+
+
+class AsyncStudy:
+    """The asyncio interface of a PvStudy.
+
+    Create instances with `await AsyncStudy.open(path)`. The study can be used as an asynchronous context
+    manager, which closes its archive handles on exit.
+
+    Args:
+        pvstudy (PvStudy): The opened study.
+        runner (_Runner): The runner of the blocking calls.
+
+    Attributes:
+        pvstudy (PvStudy): The underlying study.
+    """
+    def __init__(self, pvstudy: PvStudy, runner: _Runner):
+        self.pvstudy = pvstudy
+        self._runner = runner
+        self._scans: Dict[int, AsyncScan] = {}
+
+    @classmethod
+    async def open(cls, path: Union[Path, str], shallow: bool = False, executor: Optional[Executor] = None,
+                   limiter: Optional[DeviceLimiter] = None) -> 'AsyncStudy':
+        """Opens a study without blocking the event loop.
+
+        Args:
+            path (Path or str): The path to the study folder or archive, or the URL of a zip archive.
+            shallow (bool): If True, scan folders of an uncompressed study are indexed on first access.
+            executor (Executor, optional): The executor of the blocking calls. Defaults to a thread pool
+                shared by the asynchronous studies of the process.
+            limiter (DeviceLimiter, optional): The concurrency limiter. Defaults to `device_limiter`.
+
+        Returns:
+            AsyncStudy: The opened study.
+        """
+        runner = _Runner(get_device(path), executor, limiter)
+        return cls(await runner.run(PvStudy, path, shallow=shallow), runner)
+
+    @property
+    def path(self):
+        """The path to the study, or its URL."""
+        return self.pvstudy.path
+
+    @property
+    def avail(self) -> list:
+        """The IDs of the available scans."""
+        return self.pvstudy.avail
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Runs a blocking function in the thread pool, within the limit of the storage device of the study.
+
+        Args:
+            func (Callable): The function, e.g. a method of the underlying pvobj objects.
+            *args: The positional arguments of the function.
+            **kwargs: The keyword arguments of the function.
+
+        Returns:
+            The result of the function.
+        """
+        return await self._runner.run(func, *args, **kwargs)
+
+    async def get_scan(self, scan_id: int) -> 'AsyncScan':
+        """Retrieves a scan, indexing its folder first in shallow mode.
+
+        Args:
+            scan_id (int): The scan ID.
+
+        Returns:
+            AsyncScan: The scan.
+
+        Raises:
+            KeyError: If the scan does not exist.
+        """
+        if (scan := self._scans.get(scan_id)) is None:
+            pvscan = await self.run(self.pvstudy.get_scan, scan_id)
+            scan = self._scans.setdefault(scan_id, AsyncScan(pvscan, self._runner))
+        return scan
+
+    async def iter_scans(self, scan_ids: Optional[Iterable[int]] = None) -> AsyncIterator['AsyncScan']:
+        """Iterates over the scans of the study.
+
+        Args:
+            scan_ids (Iterable[int], optional): The IDs of the scans. Defaults to all available scans.
+
+        Yields:
+            AsyncScan: The scans, in the order of `scan_ids`.
+        """
+        for scan_id in (self.avail if scan_ids is None else scan_ids):
+            yield await self.get_scan(scan_id)
+
+    async def get_parameter(self, name: str, keys: Optional[Iterable[str]] = None) -> Parameter:
+        """Loads a parameter file of the study, e.g. 'subject'. See `BaseMethods.get_parameter`."""
+        return await self.run(self.pvstudy.get_parameter, name, keys)
+
+    async def close(self):
+        """Closes the archive handles of the study."""
+        await self.run(self.pvstudy.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+        return False
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(path='{self.path}')"
+
+
+class AsyncScan:
+    """The asyncio interface of a PvScan.
+
+    The image information of a reconstruction (data type, shape, slope and offset, frame groups) is analyzed
+    from its parameter files with `ScanInfoAnalyzer`, as the data layer does, and the data is read with
+    `DataArrayAnalyzer`.
+
+    Args:
+        pvscan (PvScan): The scan.
+        runner (_Runner): The runner of the blocking calls.
+
+    Attributes:
+        pvscan (PvScan): The underlying scan.
+    """
+    def __init__(self, pvscan: PvScan, runner: _Runner):
+        self.pvscan = pvscan
+        self._runner = runner
+
+    @property
+    def scan_id(self) -> int:
+        """The scan ID."""
+        return self.pvscan._scan_id
+
+    @property
+    def avail(self) -> list:
+        """The IDs of the available reconstructions."""
+        return self.pvscan.avail
+
+    async def get_parameter(self, name: str, keys: Optional[Iterable[str]] = None) -> Parameter:
+        """Loads a parameter file of the scan, e.g. 'acqp' or 'method'. See `BaseMethods.get_parameter`."""
+        return await self._runner.run(self.pvscan.get_parameter, name, keys)
+
+    async def get_visu_pars(self, reco_id: Optional[int] = None, keys: Optional[Iterable[str]] = None) -> Parameter:
+        """Loads the 'visu_pars' of the scan or of a reconstruction. See `PvScan.get_visu_pars`."""
+        return await self._runner.run(self.pvscan.get_visu_pars, reco_id, keys)
+
+    def _get_info(self, reco_id: Optional[int] = None) -> ScanInfo:
+        """Analyzes the image information of a reconstruction, as `Scan.get_scaninfo` does."""
+        # the data package loads the recipe parser of the app layer, so it is only imported when needed
+        from .data.scan import ScanInfo
+        infoobj = ScanInfo()
+        analysed = ScanInfoAnalyzer(self.pvscan, reco_id)
+        for attr_name in dir(analysed):
+            if 'info_' in attr_name:
+                attr_vals = getattr(analysed, attr_name)
+                if warns := attr_vals.pop('warns', None):
+                    infoobj.warns.extend(warns)
+                setattr(infoobj, attr_name.replace('info_', ''), attr_vals)
+        return infoobj
+
+    def _get_dataarray_analyzer(self, reco_id: Optional[int] = None) -> DataArrayAnalyzer:
+        reco_id = reco_id or sorted(self.avail)[0]
+        fileobj = self.pvscan.get_2dseq(reco_id=reco_id)
+        try:
+            return DataArrayAnalyzer(self._get_info(reco_id), fileobj)
+        except BaseException:
+            fileobj.close()
+            raise
+
+    async def get_info(self, reco_id: Optional[int] = None) -> ScanInfo:
+        """Analyzes the image information of a reconstruction.
+
+        Args:
+            reco_id (int, optional): The reconstruction ID. Defaults to the scan-level visu_pars, if any.
+
+        Returns:
+            ScanInfo: The analyzed information (dataarray, image, frame_group, ...), and the analysis warnings.
+        """
+        return await self._runner.run(self._get_info, reco_id)
+
+    async def get_dataarray_analyzer(self, reco_id: Optional[int] = None) -> DataArrayAnalyzer:
+        """Opens the 2dseq of a reconstruction with its analyzed information.
+
+        The analyzer owns the opened file object; close it with `analyzer.buffer.close()`.
+
+        Args:
+            reco_id (int, optional): The reconstruction ID. Defaults to the first reconstruction.
+
+        Returns:
+            DataArrayAnalyzer: The analyzer.
+        """
+        return await self._runner.run(self._get_dataarray_analyzer, reco_id)
+
+    async def get_dataarray(self, reco_id: Optional[int] = None, mmap: bool = False) -> np.ndarray:
+        """Reads the data array of a reconstruction.
+
+        Args:
+            reco_id (int, optional): The reconstruction ID. Defaults to the first reconstruction.
+            mmap (bool): If True, return a read-only memory-mapped array when the data file can be mapped.
+
+        Returns:
+            np.ndarray: The data array, see `DataArrayAnalyzer.get_dataarray`.
+        """
+        analyzer = await self.get_dataarray_analyzer(reco_id)
+        future = None
+        try:
+            future = await self._runner.submit(analyzer.get_dataarray, mmap)
+            return await asyncio.wrap_future(future)
+        finally:
+            self._close_after(analyzer.buffer, future)
+
+    async def iter_frames(self, reco_id: Optional[int] = None, start: int = 0, stop: Optional[int] = None,
+                          step: int = 1, batch: int = 1) -> AsyncIterator[np.ndarray]:
+        """Iterates over the frames of a reconstruction, reading `batch` frames per blocking call.
+
+        Frames are counted as in `DataArrayAnalyzer.get_frames`. Only the selected frames are read.
+
+        Args:
+            reco_id (int, optional): The reconstruction ID. Defaults to the first reconstruction.
+            start (int): The index of the first frame. Negative values count from the end.
+            stop (int, optional): The index after the last frame. Defaults to the number of frames.
+            step (int): The step between frames. Negative values are supported.
+            batch (int): The number of frames read by each blocking call.
+
+        Yields:
+            np.ndarray: The frames, each with shape `frame_shape`.
+        """
+        analyzer = await self.get_dataarray_analyzer(reco_id)
+        indices = range(*slice(start, stop, step).indices(analyzer.num_frames))
+        future = None
+        try:
+            for i in range(0, len(indices), batch):
+                part = indices[i:i + batch]
+                # a negative stop would count from the end
+                future = await self._runner.submit(analyzer.get_frames, part.start,
+                                                   part.stop if part.stop >= 0 else None, part.step)
+                frames = await asyncio.wrap_future(future)
+                for j in range(len(part)):
+                    yield frames[..., j]
+        finally:
+            self._close_after(analyzer.buffer, future)
+
+    @staticmethod
+    def _close_after(fileobj, future: Optional[Future]):
+        """Closes a file object once the blocking call reading it, if any, has returned."""
+        if future is None:
+            fileobj.close()
+        else:
+            future.add_done_callback(lambda _: fileobj.close())
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(scan_id={self.scan_id})"
@@ -6,15 +6,17 @@ data arrays into more accessible formats, complementing the broader data process
 """
 
 from __future__ import annotations
+import io
 import numpy as np
 from copy import copy
 from .base import BaseAnalyzer
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from ..data import ScanInfo
-    from typing import Union
+    from typing import Union, Optional, Sequence
     from io import BufferedReader
     from zipfile import ZipExtFile
+    from ..pvobj.pool import FileWindow
 
 
 class DataArrayAnalyzer(BaseAnalyzer):
@@ -25,7 +27,7 @@ class DataArrayAnalyzer(BaseAnalyzer):
 
     Args:
         infoobj (ScanInfo): The information object containing metadata related to data arrays.
-        fileobj (Union[BufferedReader, ZipExtFile]): The file object from which the data array is read.
+        fileobj (Union[BufferedReader, ZipExtFile, FileWindow]): The file object from which the data array is read.
 
     Attributes:
         slope (float): The scaling factor applied to the data array values.
@@ -33,8 +35,9 @@ class DataArrayAnalyzer(BaseAnalyzer):
         dtype (type): The data type of the data array.
         shape (list[int]): The dimensions of the data array.
         shape_desc (list[str]): Descriptions of the data array dimensions.
+        frame_shape (list[int]): The dimensions of a single frame (image), the leading dimensions of the array.
     """
-    def __init__(self, infoobj: 'ScanInfo', fileobj: Union[BufferedReader, ZipExtFile]):
+    def __init__(self, infoobj: 'ScanInfo', fileobj: Union[BufferedReader, ZipExtFile, FileWindow]):
         """Initialize the DataArrayAnalyzer with an information object and a file object.
         """
         infoobj = copy(infoobj)
@@ -51,6 +54,7 @@ class DataArrayAnalyzer(BaseAnalyzer):
         self.dtype = infoobj.dataarray['dtype']
         self.shape = infoobj.image['shape'][:]
         self.shape_desc = infoobj.image['dim_desc'][:]
+        self.frame_shape = self.shape[:]
         if infoobj.frame_group and infoobj.frame_group['type']:
             self._calc_array_shape(infoobj)
             
@@ -60,9 +64,117 @@ class DataArrayAnalyzer(BaseAnalyzer):
         self.shape.extend(infoobj.frame_group['shape'][:])
         self.shape_desc.extend([fgid.replace('FG_', '').lower() for fgid in infoobj.frame_group['id']])
     
-    def get_dataarray(self):
+    def get_dataarray(self, mmap: bool = False):
         """Read and return the structured data array from the buffer, applying data type and shape transformations.
+
+        Args:
+            mmap (bool): If True, return a read-only memory-mapped view of the data file instead of reading it
+                into memory, so only the pages that are accessed get loaded. This applies to files on disk and to
+                uncompressed members of zip archives; other buffers are read into memory as usual.
         """
+        if mmap and (dataarray := self._get_memmap()) is not None:
+            return dataarray
         self.buffer.seek(0)
         return np.frombuffer(self.buffer.read(), self.dtype).reshape(self.shape, order='F')
 
+    def _get_memmap(self):
+        """Memory-map the data file of the buffer with the data type and Fortran-ordered shape of the array.
+
+        Buffers that are a window onto a larger file, such as uncompressed zip members, provide the position of
+        their data in the file through an `offset` attribute.
+
+        Returns:
+            np.memmap or None: The mapped array, or None if the buffer has no underlying file descriptor.
+        """
+        try:
+            self.buffer.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            return None
+        return np.memmap(self.buffer, dtype=self.dtype, mode='r', offset=getattr(self.buffer, 'offset', 0),
+                         shape=tuple(self.shape), order='F')
+
+    @property
+    def num_frames(self) -> int:
+        """The number of frames stored in the data file, the product of the frame group dimensions."""
+        return int(np.prod(self.shape[len(self.frame_shape):], dtype=int))
+
+    @property
+    def volume_shape(self) -> list:
+        """The dimensions of a single volume: the frame dimensions followed by the leading slice dimensions of
+        the frame group, if any (e.g. the slices of a multi-slice 2D acquisition)."""
+        ndim = len(self.frame_shape)
+        while ndim < len(self.shape) and self.shape_desc[ndim] == 'slice':
+            ndim += 1
+        return self.shape[:ndim]
+
+    @property
+    def num_volumes(self) -> int:
+        """The number of volumes stored in the data file."""
+        return int(np.prod(self.shape, dtype=int)) // int(np.prod(self.volume_shape, dtype=int))
+
+    def get_frames(self, start: int = 0, stop: Optional[int] = None, step: int = 1):
+        """Read a range of frames from the buffer without reading the rest of the data file.
+
+        The frames are counted along the flattened frame group dimensions (in the Fortran order of the data
+        array), so `get_frames(i, i + 1)` returns the i-th image stored in the file. Only the byte ranges of the
+        selected frames are read; consecutive frames are read with a single call.
+
+        Args:
+            start (int): The index of the first frame. Negative values count from the end.
+            stop (int, optional): The index after the last frame. Defaults to the number of frames.
+            step (int): The step between frames. Negative values are supported.
+
+        Returns:
+            np.ndarray: The frames, stacked along the last axis, with shape `frame_shape + [n]`.
+        """
+        indices = range(*slice(start, stop, step).indices(self.num_frames))
+        return self._read_blocks(self.frame_shape, indices)
+
+    def get_volume(self, index: int):
+        """Read a single volume from the buffer without reading the rest of the data file.
+
+        This is typically one repetition of a functional or diffusion series; see `volume_shape`.
+
+        Args:
+            index (int): The index of the volume along the flattened non-volume dimensions. Negative values
+                count from the end.
+
+        Returns:
+            np.ndarray: The volume, with shape `volume_shape`.
+
+        Raises:
+            IndexError: If the index is out of range.
+        """
+        num_volumes = self.num_volumes
+        if not -num_volumes <= index < num_volumes:
+            raise IndexError(f"Volume index {index} is out of range for {num_volumes} volumes.")
+        volume_shape = self.volume_shape
+        return self._read_blocks(volume_shape, [index % num_volumes]).reshape(volume_shape, order='F')
+
+    def _read_blocks(self, block_shape: list, indices: Sequence[int]):
+        """Read equally sized blocks of the data file by seeking to their byte offsets.
+
+        Runs of consecutive blocks are read at once, in increasing file order, as seeking backwards in a
+        compressed zip member restarts the decompression from the start of the member.
+
+        Args:
+            block_shape (list[int]): The dimensions of a block, the leading dimensions of the data array.
+            indices (Sequence[int]): The indices of the blocks to read, in output order.
+
+        Returns:
+            np.ndarray: The blocks, stacked along the last axis, with shape `block_shape + [len(indices)]`.
+        """
+        block_size = int(np.prod(block_shape, dtype=int))
+        nbytes = block_size * np.dtype(self.dtype).itemsize
+        dataarray = np.empty((block_size, len(indices)), dtype=self.dtype, order='F')
+        order = sorted(range(len(indices)), key=lambda i: indices[i])
+        run_start = 0
+        for i in range(1, len(order) + 1):
+            if i < len(order) and indices[order[i]] == indices[order[i - 1]] + 1:
+                continue
+            first = indices[order[run_start]]
+            self.buffer.seek(first * nbytes)
+            data = np.frombuffer(self.buffer.read((i - run_start) * nbytes), self.dtype)
+            dataarray[:, order[run_start:i]] = data.reshape((block_size, i - run_start), order='F')
+            run_start = i
+        return dataarray.reshape(list(block_shape) + [len(indices)], order='F')
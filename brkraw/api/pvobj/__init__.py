@@ -12,6 +12,8 @@ Classes Exposed:
              allowing users to add any files and utilize full module functionalities if all required files are present.
     Parameter: Represents parameter metadata for various components within a scan.
     Parser: Facilitates the parsing of raw dataset information into structured formats.
+    ParameterCache: Memoizes parsed parameter files, shared by all objects through `parameter_cache`.
+    ParameterStore: Persists decoded parameter files on disk across processes, through `parameter_store`.
 """
 
 from .pvstudy import PvStudy
@@ -19,5 +21,8 @@ from .pvscan import PvScan
 from .pvreco import PvReco
 from .pvfiles import PvFiles
 from .parameters import Parameter, Parser
+from .cache import ParameterCache, parameter_cache
+from .store import ParameterStore, parameter_store
 
-__all__ = ['PvStudy', 'PvScan', 'PvReco', 'PvFiles', 'Parameter', 'Parser']
\ No newline at end of file
+__all__ = ['PvStudy', 'PvScan', 'PvReco', 'PvFiles', 'Parameter', 'Parser', 'ParameterCache', 'parameter_cache',
+           'ParameterStore', 'parameter_store']
\ No newline at end of file
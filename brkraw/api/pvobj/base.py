@@ -4,6 +4,9 @@ This module defines core classes that offer foundational utilities for managing
 The classes provide methods for handling file operations, such as opening and closing file buffers, fetching 
 directory structures, and more, all while using an object-oriented approach to maintain and access these datasets.
 
+Files are listed, stat'ed and opened through the storage backend of the dataset (see `storage`), shared by all
+objects of a pvobj tree.
+
 Classes:
     BaseBufferHandler: Manages file buffer operations, ensuring proper opening, closing, and context management of file streams.
     BaseMethods: Extends BaseBufferHandler to include various file and directory handling methods necessary 
@@ -12,15 +15,28 @@ Classes:
 
 from __future__ import annotations
 import os
+import re
+import hashlib
 from zipfile import ZipFile
-from collections import OrderedDict, defaultdict
 from pathlib import Path
 from .parameters import Parameter
+from .pool import TarHandlePool
+from .storage import BaseStorage, is_url, scan_dir, build_archive_contents, get_storage
+from .cache import parameter_cache
+from .store import parameter_store
 from xnippet.formatter import PathFormatter
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
-    from typing import Optional, List
+    from typing import Optional, List, Iterable, Iterator, Tuple
     from .types import PvFileBuffer
+    from .pool import BaseHandlePool
+
+# Paravision file kinds
+PARAMETER_FILE = 'parameter'
+BINARY_FILE = 'binary'
+PARAMETER_FILENAMES = {'subject', 'acqp', 'method', 'visu_pars', 'reco', 'procs', 'id', 
+                       'AdjStatePerScan', 'AdjStatePerStudy', 'ResultState'}
+ptrn_binary_filename = re.compile(r'^(?:2dseq|fid|ser|traj|rawdata\.job\d+)$')
 
 
 class BaseBufferHandler(PathFormatter):
@@ -30,15 +46,27 @@ class BaseBufferHandler(PathFormatter):
     of file streams. It ensures that all buffers are closed when no longer needed, preventing resource leakage.
 
     Attributes:
-        _buffers (Union[List[BufferedReader], List[ZipExtFile]]): A list of file buffer objects.
+        _buffers (Union[List[BufferedReader], List[ZipExtFile]]): A list of file buffer objects, owned by each instance.
+        _pool (Optional[BaseStorage]): The storage backend shared within a pvobj tree, e.g. the archive handle pool
+            of an archived dataset.
+        _owns_pool (bool): True if the storage backend was created by this object, which closes it. Objects
+            sharing the backend of a parent only close their own buffers.
     """
-    _buffers: List[PvFileBuffer] = []
+    _pool: Optional[BaseStorage] = None
+    _owns_pool: bool = False
+
+    @property
+    def _buffers(self) -> List[PvFileBuffer]:
+        return self.__dict__.setdefault('_buffers', [])
+
     def close(self):
-        """Closes all open file buffers managed by this handler."""
+        """Closes all open file buffers, and the handles of the storage backend if this object created it."""
         if self._buffers:
             for b in self._buffers:
                 if not b.closed:
                     b.close()
+        if self._pool and self._owns_pool:
+            self._pool.close()
     
     def __enter__(self):
         """Enters the runtime context related to this object."""
@@ -84,11 +112,16 @@ class BaseMethods(BaseBufferHandler):
         return self.__class__.__name__ == name
     
     @staticmethod
-    def _fetch_dir(path: 'Path'):
+    def _fetch_dir(path: 'Path', recursive: bool = True, prefix: Optional[str] = None):
         """Searches for directories and files in a given directory and returns the directory structure.
 
+        The directory tree is listed with `os.scandir`, so no additional stat call is made per file.
+        File sizes are only looked up when the 'file_sizes' entry is first accessed.
+
         Args:
             path: The path to the directory.
+            recursive: If False, only the given directory itself is listed.
+            prefix: The relative path of the given directory within the dataset, prepended to the keys.
 
         Returns:
             dict: A dictionary representing the directory structure.
@@ -96,23 +129,18 @@ class BaseMethods(BaseBufferHandler):
                 - 'dirs': A list of directory names.
                 - 'files': A list of file names.
                 - 'file_indexes': An empty list.
+                - 'file_sizes': A lazily evaluated list of file sizes.
         """
-        contents = OrderedDict()
-        abspath = path.absolute()
-        for dirpath, dirnames, filenames in os.walk(abspath):
-            normalized_dirpath = os.path.normpath(dirpath)
-            relative_path = os.path.relpath(normalized_dirpath, abspath)
-            file_sizes = [os.path.getsize(os.path.join(dirpath, f)) for f in filenames]
-            contents[relative_path] = {'dirs': dirnames, 'files': filenames, 
-                                       'file_indexes': [], 'file_sizes': file_sizes}
-        return contents
+        return scan_dir(path, recursive=recursive, prefix=prefix)
     
     @staticmethod
-    def _fetch_zip(path: 'Path'):
+    def _fetch_zip(path: 'Path', pool: Optional[BaseHandlePool] = None):
         """Searches for files in a zip file and returns the directory structure and file information.
 
         Args:
             path: The path to the zip file.
+            pool: The handle pool of the zip file. If given, its member table is reused instead of
+                opening the archive again.
 
         Returns:
             dict: A dictionary representing the directory structure and file information.
@@ -121,20 +149,76 @@ class BaseMethods(BaseBufferHandler):
                 - 'files': A list of file names.
                 - 'file_indexes': A list of file indexes.
         """
+        if pool:
+            return pool.list()
         with ZipFile(path) as zip_file:
-            contents = defaultdict(lambda: {'dirs': set(), 'files': [], 'file_indexes': [], 'file_sizes': []})
-            for i, item in enumerate(zip_file.infolist()):
-                if not item.is_dir():
-                    dirpath, filename = os.path.split(item.filename)
-                    contents[dirpath]['files'].append(filename)
-                    contents[dirpath]['file_indexes'].append(i)
-                    contents[dirpath]['file_sizes'].append(item.file_size)
-                    while dirpath:
-                        dirpath, dirname = os.path.split(dirpath)
-                        if dirname:
-                            contents[dirpath]['dirs'].add(dirname)
-        return contents
-    
+            infolist = zip_file.infolist()
+        return build_archive_contents(
+            (i, *os.path.split(item.filename), item.file_size) for i, item in enumerate(infolist) if not item.is_dir())
+
+    @staticmethod
+    def _fetch_tar(path: 'Path', pool: Optional[BaseHandlePool] = None):
+        """Searches for files in a tar file and returns the directory structure and file information.
+
+        The member table (names, data offsets and sizes of the regular files) is read once by the handle pool,
+        which requires decompressing the whole stream for compressed tar files.
+
+        Args:
+            path: The path to the tar file.
+            pool: The handle pool of the tar file. If given, its member table is reused.
+
+        Returns:
+            dict: A dictionary representing the directory structure and file information, in the same format
+                as `_fetch_zip`. The file indexes refer to the member table of the handle pool.
+        """
+        return (pool or TarHandlePool(path)).list()
+
+    def _resolve(self, path):
+        """Resolves a local path. The URLs of remote datasets are kept as they are."""
+        if is_url(path):
+            return path
+        return super()._resolve(path)
+
+    def _get_storage(self, rootpath: 'Path'):
+        """Returns the storage backend of this object, creating one if it was not shared by a parent object.
+
+        Args:
+            rootpath: The path to the dataset directory or archive, or its URL.
+
+        Returns:
+            BaseStorage: The storage backend of the dataset.
+        """
+        if self._pool is None:
+            self._pool = get_storage(rootpath)
+            self._owns_pool = True
+        return self._pool
+
+    def _get_member(self, key: str):
+        """Returns the member reference of a file within the storage backend of the dataset.
+
+        Args:
+            key: The filename.
+
+        Returns:
+            int or str: The position of the member in the archive member table, or the path of the file relative
+                to the dataset root for directories.
+        """
+        if file_indexes := self.contents.get('file_indexes'):
+            return file_indexes[self.contents['files'].index(key)]
+        return os.path.join(*self._get_path_list(key))
+
+    def _get_path_list(self, key: str):
+        """Builds the path components of a file relative to the dataset root.
+
+        Args:
+            key: The filename.
+
+        Returns:
+            list: The scan ID, the 'pdata' folder and reco ID when applicable, followed by the filename.
+        """
+        return [*([str(self._scan_id)] if self._scan_id else []), 
+                *(['pdata', str(self._reco_id)] if self._reco_id else []), key]
+
     def _open_as_fileobject(self, key: str):
         """Opens a file object for the given key.
 
@@ -151,7 +235,7 @@ class BaseMethods(BaseBufferHandler):
         if not self.contents:
             raise KeyError(f'Failed to load contents list from "{rootpath}".')
         files = self.contents.get('files')
-        path_list = [*([str(self._scan_id)] if self._scan_id else []), *(['pdata', str(self._reco_id)] if self._reco_id else []), key]
+        path_list = self._get_path_list(key)
 
         if key not in files:
             if file_indexes := self.contents.get('file_indexes'):
@@ -160,14 +244,24 @@ class BaseMethods(BaseBufferHandler):
                 rel_path = os.path.join(*path_list)
             raise KeyError(f'Failed to load filename "{key}" from folder "{rel_path}".\n [{", ".join(files)}]')
 
-        if file_indexes := self.contents.get('file_indexes'):
-            with ZipFile(rootpath) as zf:
-                idx = file_indexes[files.index(key)]
-                return zf.open(zf.namelist()[idx])
-        else:
-            path_list.insert(0, rootpath)
-            path = os.path.join(*path_list)
-            return open(path, 'rb')
+        return self._get_storage(rootpath).open(self._get_member(key))
+
+    def _get_cache_key(self, key: str):
+        """Builds the parameter cache key of a file and the size of the file.
+
+        The key combines the dataset path, the scan and reconstruction IDs, the filename and a signature of the
+        file content: the modification time and size for files on disk, or the signature of an archive member
+        (e.g. the timestamp, size and CRC of a zip member).
+
+        Args:
+            key: The filename.
+
+        Returns:
+            tuple: The cache key and the file size in bytes.
+        """
+        rootpath = self._rootpath or self._path
+        signature, nbytes = self._get_storage(rootpath).stat(self._get_member(key))
+        return (str(rootpath), self._scan_id, self._reco_id, key, signature), nbytes
 
     def _open_as_string(self, key: str):
         """Opens a file as binary, decodes it as UTF-8, and splits it into lines.
@@ -213,16 +307,155 @@ class BaseMethods(BaseBufferHandler):
         key = key[1:] if key.startswith('_') else key 
         
         if file := [f for f in self.contents['files'] if (f == key or f.replace('.', '_') == key)]:
-            fileobj = self._open_as_fileobject(file.pop())
-            if self._is_binary(fileobj):
+            filename = file.pop()
+            file_kind = self._get_file_kind(filename)
+            if file_kind == BINARY_FILE:
+                return self._open_as_fileobject(filename)
+            cache_key, nbytes = self._get_cache_key(filename) \
+                if parameter_cache.enabled or parameter_store.enabled else (None, 0)
+            if cache_key and (par := parameter_cache.get(cache_key)) is not None:
+                return par
+            if cache_key and (par := parameter_store.get(cache_key)) is not None:
+                parameter_cache.put(cache_key, par, nbytes)
+                return par
+            fileobj = self._open_as_fileobject(filename)
+            if file_kind is None and self._is_binary(fileobj):
                 return fileobj
-            string_list = fileobj.read().decode('UTF-8').split('\n')
-            fileobj.close()
+            with fileobj:
+                string_list = fileobj.read().decode('UTF-8').split('\n')
+            # the raw records are stored before the compact mode releases them
             par = Parameter(string_list, 
-                            name=key, scan_id=self._scan_id, reco_id=self._reco_id)
-            return par if par.is_parameter() else string_list
+                            name=key, scan_id=self._scan_id, reco_id=self._reco_id, compact=False)
+            if not par.is_parameter():
+                return string_list
+            if cache_key:
+                parameter_store.put(cache_key, par)
+            if par.compact_default:
+                par.compact()
+            if cache_key:
+                parameter_cache.put(cache_key, par, nbytes)
+            return par
         raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{key}'")
 
+    def get_parameter(self, name: str, keys: Optional[Iterable[str]] = None):
+        """Load a parameter file, optionally restricted to a whitelist of parameter keys.
+
+        Without keys, this is the same as attribute access. With keys, the other parameters are skipped without
+        decoding and the file is only read up to the last requested key, or up to the end of the header
+        preamble ('##TITLE' to '##OWNER') for an empty whitelist. Such partial objects are not cached, but a
+        parameter file that is already cached is returned complete without reading the file.
+
+        Args:
+            name (str): The name of the parameter file, e.g. 'acqp', 'method' or 'visu_pars'.
+            keys (Optional[Iterable[str]]): The parameter keys to load, without the '$' prefix.
+
+        Returns:
+            Parameter: The parameter object.
+
+        Raises:
+            FileNotFoundError: If the parameter file does not exist.
+
+        Examples:
+            >>> scan.get_parameter('acqp', keys=['ACQ_scan_name']).ACQ_scan_name
+            >>> study.get_parameter('subject', keys=[]).header['TITLE']
+        """
+        if not (file := [f for f in self.contents['files'] if (f == name or f.replace('.', '_') == name)]):
+            raise FileNotFoundError(f"The required file '{name}' does not exist. "
+                                    "Please check the dataset and ensure the file is in the expected location.")
+        if keys is None:
+            return getattr(self, name)
+        filename = file.pop()
+        if parameter_cache.enabled:
+            cache_key, _ = self._get_cache_key(filename)
+            if cache_key and (par := parameter_cache.get(cache_key)) is not None:
+                return par
+        with self._open_as_fileobject(filename) as fileobj:
+            return Parameter(self._iter_lines(fileobj), name=name, scan_id=self._scan_id, reco_id=self._reco_id,
+                             keys=keys)
+
+    @staticmethod
+    def _iter_lines(fileobj: PvFileBuffer, chunk_size: int = 8192):
+        """Reads a file by chunks and yields its lines decoded as UTF-8, as `read().decode().split('\\n')` gives.
+
+        Args:
+            fileobj (BufferedReader): The file object to read.
+            chunk_size (int): The number of bytes to read at once.
+
+        Yields:
+            str: The lines of the file, without line terminators.
+        """
+        pending = b''
+        while chunk := fileobj.read(chunk_size):
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line.decode('UTF-8')
+        yield pending.decode('UTF-8')
+
+    def fingerprint(self, mtime: bool = True, sample: int = 0, block_size: int = 65536) -> str:
+        """Computes a fingerprint identifying the content of this object and of its children.
+
+        Each file of the object contributes its name, size and modification time, and parameter files also
+        contribute their CRC-32, which is taken from the central directory of zip archives and computed by
+        reading the file otherwise. The fingerprints of the child objects (the scans of a study, the
+        reconstructions of a scan) are combined in turn. Binary files (2dseq, fid, ...) are not read unless
+        blocks of them are sampled.
+
+        Files enter the fingerprint by their names within each object, and modification times are compared at
+        the resolution of zip archives, so a study folder and a zip or tar archive of it that preserves the
+        modification times give the same fingerprint.
+
+        Args:
+            mtime (bool): If False, modification times are left out, so copies that did not preserve them give
+                the same fingerprint.
+            sample (int): The number of blocks, evenly spaced from start to end, hashed from each binary file.
+                Sampling a deflated archive member decompresses it.
+            block_size (int): The size of the sampled blocks in bytes.
+
+        Returns:
+            str: The fingerprint, a hexadecimal SHA-1 digest.
+
+        Examples:
+            >>> study.fingerprint() == PvStudy('study.zip').fingerprint()
+            >>> scan.fingerprint(sample=4)
+        """
+        storage = self._get_storage(self._rootpath or self._path)
+        contents = self.contents or {'files': [], 'file_sizes': []}
+        digest = hashlib.sha1()
+        for filename, size in sorted(zip(contents['files'], contents['file_sizes'])):
+            member = self._get_member(filename)
+            record = [filename, size, storage.mtime(member) if mtime else None]
+            if (file_kind := self._get_file_kind(filename)) == PARAMETER_FILE:
+                record.append(storage.crc32(member))
+            elif file_kind == BINARY_FILE and sample:
+                record.append(self._sample_blocks(storage, member, size, sample, block_size))
+            digest.update(repr(record).encode('UTF-8'))
+        for child_id, child in self._iter_children():
+            digest.update(repr([child_id, child.fingerprint(mtime, sample, block_size)]).encode('UTF-8'))
+        return digest.hexdigest()
+
+    def _iter_children(self) -> Iterator[Tuple[int, BaseMethods]]:
+        """Yields the IDs and objects of the children combined in the fingerprint. Overridden by containers."""
+        return iter(())
+
+    @staticmethod
+    def _sample_blocks(storage: BaseStorage, member, size: int, sample: int, block_size: int):
+        """Hashes blocks of a file evenly spaced from its start to its end, or the whole file if it is small.
+
+        Returns:
+            str: The hexadecimal SHA-1 digest of the blocks.
+        """
+        digest = hashlib.sha1()
+        with storage.open(member) as f:
+            if size <= sample * block_size:
+                digest.update(f.read())
+            else:
+                step = (size - block_size) / max(sample - 1, 1)
+                for i in range(sample):
+                    f.seek(int(i * step))
+                    digest.update(f.read(block_size))
+        return digest.hexdigest()
+
     @property
     def contents(self):
         """Access the contents dictionary holding directory and file details.
@@ -300,6 +533,25 @@ class BaseMethods(BaseBufferHandler):
             raise FileNotFoundError("The required file '2dseq' does not exist. "
                                     "Please check the dataset and ensure the file is in the expected location.")
         
+    @staticmethod
+    def _get_file_kind(filename: str):
+        """Classify a file by its Paravision filename.
+
+        Known parameter files are read in a single pass and known binary files are returned unread, so the
+        content only has to be sniffed for binary data when the filename is unknown.
+
+        Args:
+            filename (str): The name of the file.
+
+        Returns:
+            str or None: 'parameter' or 'binary' for known Paravision files, otherwise None.
+        """
+        if filename in PARAMETER_FILENAMES:
+            return PARAMETER_FILE
+        if ptrn_binary_filename.match(filename):
+            return BINARY_FILE
+        return None
+
     @staticmethod
     def _is_binary(fileobj: PvFileBuffer, bytes: int = 512):
         """Determine if a file is binary by reading a block of data.
@@ -0,0 +1,174 @@
+"""Provides an in-memory cache of parsed parameter files for pvobj attribute access.
+
+Analyzers and the data layer access the same parameter files (acqp, method, visu_pars, ...) repeatedly.
+The `ParameterCache` memoizes the parsed `Parameter` objects, keyed by the dataset, scan and reconstruction
+identifiers, the filename and a signature of the source file (modification time and size, or the zip member
+CRC), so each parameter file is parsed once for as long as it remains unchanged and in the cache.
+
+Classes:
+    ParameterCache: A size-bounded LRU cache of parsed Parameter objects with hit/miss counters.
+
+Attributes:
+    parameter_cache (ParameterCache): The cache instance shared by all pvobj objects in this process.
+"""
+
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from typing import Optional, Tuple, Any
+    from .parameters import Parameter
+    CacheKey = Tuple[str, Optional[int], Optional[int], str, Tuple[Any, ...]]
+
+
+class ParameterCache:
+    """A least-recently-used cache of parsed Parameter objects.
+
+    The cache is bounded by both the number of entries and an approximate byte budget, accounted as the size
+    of the source files. Cached objects are shared among all callers and must be treated as read-only.
+    All operations are thread-safe.
+
+    Args:
+        max_entries (int): The maximum number of cached parameter objects. 0 disables the cache.
+        max_bytes (int): The maximum total size of the cached source files, in bytes.
+
+    Attributes:
+        hits (int): The number of lookups answered from the cache.
+        misses (int): The number of lookups that required parsing.
+        evictions (int): The number of entries dropped to stay within the budget.
+    """
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 256 * 1024 ** 2):
+        self._entries: OrderedDict[CacheKey, Tuple[Parameter, int]] = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.RLock()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.reset_stats()
+
+    @property
+    def enabled(self) -> bool:
+        """True if the cache is allowed to hold any entry."""
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    @property
+    def nbytes(self) -> int:
+        """The total size of the source files of all cached entries, in bytes."""
+        return self._nbytes
+
+    def get(self, key: CacheKey) -> Optional[Parameter]:
+        """Looks up a parsed parameter object and marks it as recently used.
+
+        Args:
+            key (tuple): The cache key, (dataset, scan_id, reco_id, filename, signature).
+
+        Returns:
+            Parameter or None: The cached object, or None if it is not cached.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key: CacheKey, value: Parameter, nbytes: int = 0):
+        """Stores a parsed parameter object, evicting the least recently used entries if needed.
+
+        Args:
+            key (tuple): The cache key, (dataset, scan_id, reco_id, filename, signature).
+            value (Parameter): The parsed parameter object.
+            nbytes (int): The size of the source file, used for the byte budget.
+        """
+        if not self.enabled or nbytes > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (value, nbytes)
+            self._nbytes += nbytes
+            self._evict()
+
+    def resize(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        """Changes the budget of the cache, evicting entries that no longer fit.
+
+        Args:
+            max_entries (int, optional): The new maximum number of entries.
+            max_bytes (int, optional): The new maximum total size in bytes.
+        """
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+
+    def invalidate(self,
+                   dataset: Optional[str] = None,
+                   scan_id: Optional[int] = None,
+                   reco_id: Optional[int] = None,
+                   filename: Optional[str] = None) -> int:
+        """Drops the entries matching all of the given fields. Without arguments, the cache is cleared.
+
+        Args:
+            dataset (str, optional): The path of the dataset.
+            scan_id (int, optional): The scan ID.
+            reco_id (int, optional): The reconstruction ID.
+            filename (str, optional): The name of the parameter file.
+
+        Returns:
+            int: The number of dropped entries.
+        """
+        fields = (None if dataset is None else str(dataset), scan_id, reco_id, filename)
+        with self._lock:
+            matched = [key for key in self._entries
+                       if all(f is None or f == k for f, k in zip(fields, key))]
+            for key in matched:
+                self._pop(key)
+        return len(matched)
+
+    def clear(self):
+        """Drops all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def reset_stats(self):
+        """Resets the hit, miss and eviction counters."""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        """Summarizes the state of the cache.
+
+        Returns:
+            dict: The counters, the number of entries and the accounted size in bytes.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self), 'nbytes': self._nbytes}
+
+    def _pop(self, key: CacheKey):
+        if key in self._entries:
+            _, nbytes = self._entries.pop(key)
+            self._nbytes -= nbytes
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._nbytes > self.max_bytes):
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._nbytes -= nbytes
+            self.evictions += 1
+
+    def __contains__(self, key: CacheKey):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(entries={len(self)}, nbytes={self._nbytes}, "
+                f"hits={self.hits}, misses={self.misses})")
+
+
+parameter_cache = ParameterCache()
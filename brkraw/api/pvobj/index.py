@@ -0,0 +1,188 @@
+"""Provides a persistent on-disk index of the contents of archived PvDatasets.
+
+Opening an archived study requires reading the member table of the archive (the central directory of a zip
+file, or every header of a tar file) and rebuilding the contents tree, although archived studies never change.
+The `ContentsIndex` stores the contents tree, the file sizes and the member table (including the member
+offsets) of each archive in a small JSON file under the user cache directory, keyed by the path, size and
+modification time of the archive. Re-opening a known study is then a single small file read, and any change to
+the archive invalidates its entry.
+
+The index is disabled by default, so nothing is written to disk unless it is turned on, either with
+`BRKRAW_INDEX=1` or persistently through `brkraw index --enable`, which places a marker file in the index
+directory (`brkraw index --disable` removes it). `BRKRAW_INDEX=0` disables the index regardless of the marker.
+The index directory defaults to `$XDG_CACHE_HOME/brkraw/index` (or `~/.cache/brkraw/index`) and can be set
+with the `BRKRAW_INDEX_DIR` environment variable.
+
+Classes:
+    ContentsIndex: Loads, stores and clears the contents index entries of archived datasets.
+
+Attributes:
+    contents_index (ContentsIndex): The index instance used by PvStudy.
+"""
+
+from __future__ import annotations
+import os
+import json
+import hashlib
+import tarfile
+import tempfile
+from pathlib import Path
+from zipfile import ZipInfo
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from typing import Optional, Tuple, List, Any
+    from .pool import BaseHandlePool
+
+
+class ContentsIndex:
+    """Manages the persistent contents index of archived datasets.
+
+    Args:
+        root (Path, optional): The index directory. Defaults to the `BRKRAW_INDEX_DIR` environment variable
+            or the user cache directory.
+    """
+    version = 2
+    _enabled_marker = 'ENABLED'
+
+    def __init__(self, root: Optional[Path] = None):
+        self._root = Path(root) if root else None
+
+    @property
+    def root(self) -> Path:
+        """The index directory."""
+        if self._root:
+            return self._root
+        if env := os.environ.get('BRKRAW_INDEX_DIR'):
+            return Path(env).expanduser()
+        cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join('~', '.cache')
+        return Path(cache_home).expanduser() / 'brkraw' / 'index'
+
+    @property
+    def enabled(self) -> bool:
+        """True if the index is enabled by the `BRKRAW_INDEX` environment variable, or else by the marker file."""
+        if env := os.environ.get('BRKRAW_INDEX'):
+            return env.lower() not in ('0', 'false', 'no', 'off')
+        return (self.root / self._enabled_marker).exists()
+
+    def enable(self):
+        """Enables the index persistently by placing a marker file in the index directory."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / self._enabled_marker).touch()
+
+    def disable(self):
+        """Removes the persistent switch enabling the index. Existing entries are kept until cleared."""
+        (self.root / self._enabled_marker).unlink(missing_ok=True)
+
+    def clear(self) -> int:
+        """Removes all index entries, including the checkpoint indexes of deflated members (see `zran`).
+
+        Returns:
+            int: The number of removed entries.
+        """
+        removed = 0
+        if self.root.is_dir():
+            for pattern in ('*.json', '*.zran'):
+                for entry in self.root.glob(pattern):
+                    entry.unlink(missing_ok=True)
+                    removed += 1
+        return removed
+
+    def __len__(self):
+        return len(list(self.root.glob('*.json'))) if self.root.is_dir() else 0
+
+    @staticmethod
+    def _get_signature(path: Path) -> dict:
+        stat = os.stat(path)
+        return {'path': str(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def _get_entry_path(self, path: Path) -> Path:
+        return self.root / f"{hashlib.sha1(str(path).encode('UTF-8')).hexdigest()}.json"
+
+    def load(self, path: Path) -> Optional[Tuple[dict, str, List[Any]]]:
+        """Loads the contents tree and member table of an archive, if indexed and unchanged.
+
+        Args:
+            path (Path): The resolved path to the archive.
+
+        Returns:
+            tuple or None: The contents dictionary, the archive format ('zip' or 'tar') and the member table,
+                or None if no valid entry exists.
+        """
+        if not self.enabled:
+            return None
+        try:
+            with open(self._get_entry_path(path), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('version') != self.version or entry.get('signature') != self._get_signature(path):
+            return None
+        contents = {dirpath: {'dirs': set(c['dirs']), 'files': c['files'],
+                              'file_indexes': c['file_indexes'], 'file_sizes': c['file_sizes']}
+                    for dirpath, c in entry['contents'].items()}
+        decode = getattr(self, f"_decode_{entry['kind']}info")
+        return contents, entry['kind'], [decode(m) for m in entry['members']]
+
+    def save(self, path: Path, contents: dict, pool: BaseHandlePool):
+        """Stores the contents tree and member table of an archive.
+
+        The entry is written to a temporary file and moved into place, so concurrent readers never observe a
+        partially written entry. Failures to write the index are ignored.
+
+        Args:
+            path (Path): The resolved path to the archive.
+            contents (dict): The contents dictionary returned by the `list` method of the pool.
+            pool (BaseHandlePool): The handle pool of the archive, providing its format and member table.
+        """
+        if not self.enabled:
+            return
+        encode = getattr(self, f"_encode_{pool.kind}info")
+        entry = {'version': self.version,
+                 'signature': self._get_signature(path),
+                 'kind': pool.kind,
+                 'contents': {dirpath: {'dirs': sorted(c['dirs']), 'files': c['files'],
+                                        'file_indexes': c['file_indexes'], 'file_sizes': list(c['file_sizes'])}
+                              for dirpath, c in contents.items()},
+                 'members': [encode(info) for info in pool.infolist]}
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f, separators=(',', ':'))
+            os.replace(tmp_path, self._get_entry_path(path))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _encode_zipinfo(info: ZipInfo) -> list:
+        return [info.filename, list(info.date_time), info.compress_type, info.flag_bits,
+                info.header_offset, info.compress_size, info.file_size, info.CRC]
+
+    @staticmethod
+    def _decode_zipinfo(member: list) -> ZipInfo:
+        filename, date_time, compress_type, flag_bits, header_offset, compress_size, file_size, crc = member
+        info = ZipInfo(filename, tuple(date_time))
+        info.compress_type = compress_type
+        info.flag_bits = flag_bits
+        info.header_offset = header_offset
+        info.compress_size = compress_size
+        info.file_size = file_size
+        info.CRC = crc
+        return info
+
+    @staticmethod
+    def _encode_tarinfo(info: tarfile.TarInfo) -> list:
+        return [info.name, info.offset, info.offset_data, info.size, info.mtime]
+
+    @staticmethod
+    def _decode_tarinfo(member: list) -> tarfile.TarInfo:
+        name, offset, offset_data, size, mtime = member
+        info = tarfile.TarInfo(name)
+        info.offset = offset
+        info.offset_data = offset_data
+        info.size = size
+        info.mtime = mtime
+        return info
+
+
+contents_index = ContentsIndex()
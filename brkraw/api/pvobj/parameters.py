@@ -5,28 +5,37 @@ It specifically handles the extraction and management of parameter data and head
 that represent parameter dictionaries in Paravision datasets. 
 These capabilities are critical for accessing and manipulating the underlying data in a structured and interpretable format.
 
+Parameter values are decoded lazily: loading a file only records the line span of each parameter, and a value
+is decoded the first time it is accessed. Most callers only need a few of the hundreds of keys in a file.
+
+Lazy decoding keeps the raw text of the file alive as long as the object. Services holding the parameters of
+many scans in memory can use the compact mode instead (`compact=True`, or the `BRKRAW_COMPACT_PARAMETERS`
+environment variable for every Parameter): all values are decoded when the file is loaded and the raw text is
+released, numeric lists are stored as numpy arrays, and keys, short strings and numbers are interned so equal
+values share one object across files.
+
 Classes:
     Parameter: A class designed to parse and manage parameter dictionaries, providing access to parameters and headers, 
                processing content data, and setting parameter values based on input data.
 
 Dependencies:
-    re: Regular expression operations for parsing and processing text.
-    numpy: Provides support for large, multi-dimensional arrays and matrices, 
-           along with a large collection of high-level mathematical functions to operate on these arrays.
     OrderedDict: A dictionary subclass that remembers the order in which its contents are added, 
                  used for maintaining an ordered set of parameters.
 """
 
 from __future__ import annotations
-import re
+import os
+import sys
 import numpy as np
 from collections import OrderedDict
-from .parser import Parser, ptrn_comment, PARAMETER, HEADER
+from .parser import Parser, PARAMETER, HEADER
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from typing import Optional
-    from typing import List
-    from numpy.typing import NDArray
+    from typing import List, Iterable, Any
+
+# the numbers interned by compact parameters, keyed by (type, value) as 1 == 1.0
+_interned_scalars = {}
 
 
 class Parameter:
@@ -36,30 +45,51 @@ class Parameter:
     representations of parameter dictionaries, manage parameter and header information, and process the contents of the data.
 
     Args:
-        stringlist (List[str]): A list of strings containing parameter entries.
+        stringlist (Iterable[str]): A list of strings containing parameter entries, or an iterator reading them.
         name (str): The name identifying the parser object.
         scan_id (Optional[int]): The scan ID associated with the parameter data.
         reco_id (Optional[int]): The reconstruction ID associated with the parameter data.
+        keys (Optional[Iterable[str]]): The parameter keys to load. Other parameters are skipped without
+            decoding, and an iterator of lines is only consumed up to the last requested key.
+        compact (Optional[bool]): If True, decode all values at once, release the raw text and store the values
+            in compact form (see `compact_value`). Defaults to `compact_default`.
 
     Attributes:
-        _parameters (OrderedDict): Stores parameter values.
+        compact_default (bool): The default of the compact mode, set by the `BRKRAW_COMPACT_PARAMETERS`
+            environment variable.
+        max_interned_length (int): The length of the longest strings interned by the compact mode.
+        max_interned_scalars (int): The number of distinct numbers interned by the compact mode in a process.
+        _parameters (OrderedDict): Stores the decoded parameter values.
+        _records (OrderedDict): Stores the (value, start, stop) record of each parameter, in file order.
         _header (OrderedDict): Stores header information.
         _name (str): Name of the parser object.
         _repr_items (List[str]): List of string representations for object description.
     """
+    # '__dict__' keeps ad-hoc attributes working, and is only allocated when one is set
+    __slots__ = ('_name', '_repr_items', '_params_key_struct', '_contents', '_header', '_parameters', '_records',
+                 '_ordered', '__dict__', '__weakref__')
+    compact_default = os.environ.get('BRKRAW_COMPACT_PARAMETERS', '') not in ('', '0')
+    max_interned_length = 32
+    max_interned_scalars = 65536
+
     def __init__(self, 
-                 stringlist: List[str], 
+                 stringlist: Iterable[str], 
                  name: str, 
                  scan_id: Optional[int] = None, 
-                 reco_id: Optional[int] = None):
+                 reco_id: Optional[int] = None,
+                 keys: Optional[Iterable[str]] = None,
+                 compact: Optional[bool] = None):
         """
         Initialize the Parameter object with the given stringlist, name, scan_id, and reco_id.
 
         Args:
-            stringlist: A list of strings containing the parameter dictionaries.
+            stringlist: A list of strings containing the parameter dictionaries, or an iterator reading them.
             name: The name of the Parser object.
             scan_id: The scan ID associated with the Parser object.
             reco_id: The reco ID associated with the Parser object.
+            keys: The parameter keys to load, or None to load all parameters. Headers are always loaded,
+                and an empty list only loads the headers.
+            compact: If True, store the parameters in compact form. Defaults to `compact_default`.
 
         Examples:
             >>> stringlist = ["param1", "param2"]
@@ -68,13 +98,129 @@ class Parameter:
             >>> reco_id = 67890
             >>> parser = Parser(stringlist, name, scan_id, reco_id)
         """
+        self._set_name(name, scan_id, reco_id)
+        if isinstance(stringlist, list):
+            self._set_param(Parser.tokenize(stringlist, keys), stringlist)
+        else:
+            contents = []
+            self._set_param(Parser.tokenize(self._buffer_lines(stringlist, contents), keys), contents)
+        if self.compact_default if compact is None else compact:
+            self.compact()
+
+    @classmethod
+    def from_decoded(cls,
+                     header: OrderedDict,
+                     parameters: OrderedDict,
+                     name: str,
+                     scan_id: Optional[int] = None,
+                     reco_id: Optional[int] = None,
+                     compact: Optional[bool] = None):
+        """Create a Parameter object from already decoded headers and parameters, e.g. from the ParameterStore.
+
+        Args:
+            header (OrderedDict): The decoded headers.
+            parameters (OrderedDict): The decoded parameters, in file order.
+            name (str): The name of the parser object.
+            scan_id (Optional[int]): The scan ID associated with the parameter data.
+            reco_id (Optional[int]): The reconstruction ID associated with the parameter data.
+            compact (Optional[bool]): If True, store the parameters in compact form. Defaults to `compact_default`.
+
+        Returns:
+            Parameter: The parameter object, with all values decoded.
+        """
+        self = cls.__new__(cls)
+        self._set_name(name, scan_id, reco_id)
+        self._params_key_struct = None
+        self._contents = None
+        self._header = header
+        self._parameters = parameters
+        self._records = OrderedDict.fromkeys(parameters)
+        self._ordered = True
+        if cls.compact_default if compact is None else compact:
+            self.compact()
+        return self
+
+    def _set_name(self, name: str, scan_id: Optional[int], reco_id: Optional[int]):
+        """Set the name of the object and the identifiers shown by its representation."""
         self._name = name
         self._repr_items = []
         if scan_id:
             self._repr_items.append(f'scan_id={scan_id}')
         if reco_id:
             self._repr_items.append(f'reco_id={reco_id}')
-        self._set_param(*Parser.load_param(stringlist))
+
+    def compact(self):
+        """Decode all values, release the raw text and the records, and store the values in compact form.
+
+        The conversion is done in place, so objects already shared (e.g. by the parameter cache) are compacted too.
+
+        Returns:
+            Parameter: The object itself.
+        """
+        intern = sys.intern
+        self._parameters = OrderedDict((intern(key), self.compact_value(self._get_value(key))) 
+                                       for key in self._records)
+        self._header = OrderedDict((intern(key), self.compact_value(value)) for key, value in self._header.items())
+        # all keys are decoded, so the parameters themselves list the keys
+        self._records = self._parameters
+        self._ordered = True
+        self._contents = None
+        self._params_key_struct = None
+        return self
+
+    @classmethod
+    def compact_value(cls, value: Any):
+        """Convert a decoded value to its compact form.
+
+        Lists of numbers become 1-D numpy arrays (int64, or float64 if any element is a float). Other lists and
+        tuples are converted element by element. Strings of up to `max_interned_length` characters and numbers
+        are interned, so equal values of different files share one object.
+
+        Args:
+            value: The decoded value.
+
+        Returns:
+            The compact value.
+        """
+        if isinstance(value, str):
+            return sys.intern(value) if len(value) <= cls.max_interned_length else value
+        if type(value) is int or type(value) is float:
+            return cls._compact_number(value)
+        if isinstance(value, list):
+            return cls._compact_list(value)
+        if isinstance(value, tuple):
+            return tuple(cls.compact_value(item) for item in value)
+        return value
+
+    @classmethod
+    def _compact_number(cls, value: Any):
+        """Intern a number, up to `max_interned_scalars` distinct numbers per process."""
+        if not value or value != value:
+            # zero is 0.0 and -0.0 alike, and NaN is not equal to itself
+            return value
+        if (interned := _interned_scalars.get((type(value), value))) is None:
+            if len(_interned_scalars) >= cls.max_interned_scalars:
+                return value
+            interned = _interned_scalars[(type(value), value)] = value
+        return interned
+
+    @classmethod
+    def _compact_list(cls, value: list):
+        """Convert a list of numbers to a numpy array, or the elements of any other list to their compact form."""
+        if value and all(type(item) is int or type(item) is float for item in value):
+            try:
+                if (array := np.array(value)).dtype != object:
+                    return array
+            except OverflowError:
+                pass
+        return [cls.compact_value(item) for item in value]
+
+    @staticmethod
+    def _buffer_lines(lines: Iterable[str], contents: List[str]):
+        """Yield the lines of an iterator, keeping the consumed lines in contents."""
+        for line in lines:
+            contents.append(line)
+            yield line
 
     @property
     def name(self):
@@ -89,11 +235,14 @@ class Parameter:
 
     @property
     def parameters(self):
-        """Retrieve the parameters processed by the parser.
+        """Retrieve the parameters processed by the parser. All values are decoded on first access.
 
         Returns:
             OrderedDict: A dictionary containing the parameters of the data.
         """
+        if len(self._parameters) < len(self._records) or not self._ordered:
+            self._parameters = OrderedDict((key, self._get_value(key)) for key in self._records)
+            self._ordered = True
         return self._parameters
 
     @property
@@ -107,57 +256,74 @@ class Parameter:
 
     def _process_contents(self, 
                           contents: List[str], 
-                          addr: int, 
-                          addr_diff: NDArray, 
-                          index: int, 
+                          start: int, 
+                          stop: int, 
                           value: str):
-        """Process the data contents based on parameter addresses and differences.
+        """Process the data contents of a record from its continuation lines.
 
         Args:
             contents (List[str]): The full list of content strings.
-            addr (int): The current parameter's address in contents.
-            addr_diff (numpy.ndarray): An array of address differences between parameters.
-            index (int): The index of the current parameter.
+            start (int): The index of the first continuation line of the record.
+            stop (int): The index after the last continuation line of the record.
             value (str): The initial value of the parameter.
 
         Returns:
             tuple: A tuple containing the processed data as a string and its shape or format as int.
         """
-        if addr_diff[index] > 1:
-            c_lines = contents[(addr + 1):(addr + addr_diff[index])]
-            data = " ".join([line.strip() for line in c_lines if not re.match(ptrn_comment, line)])
+        if stop > start:
+            data = Parser.join_lines(contents, start, stop)
             return (data, value) if data else (Parser.convert_string_to(value), -1)
         return Parser.convert_string_to(value), -1
 
     def _set_param(self, 
-                   params: List[tuple], 
-                   param_addr: List[int], 
+                   records: List[tuple], 
                    contents: List[str]):
-        """Initialize parameters and headers from parsed data.
+        """Initialize parameters and headers from the records of the tokenizer.
+
+        Headers are processed immediately, while parameters only keep their record until their value is
+        decoded by `_get_value`. The last record, which closes the file ('##END='), is not stored.
 
         Args:
-            params (List[tuple]): List containing parameter tuples (dtype, key, value).
-            param_addr (List[int]): List of addresses where parameters are located in the content.
+            records (List[tuple]): List containing the (dtype, key, value, start, stop) records of `Parser.tokenize`.
             contents (List[str]): The contents as a list of strings from which to extract data.
 
         Raises:
             ValueError: If an invalid data type (dtype) is encountered.
         """
-        addr_diff = np.diff(param_addr)
-        self._params_key_struct = params
+        self._params_key_struct = records
         self._contents = contents
         self._header = OrderedDict()
         self._parameters = OrderedDict()
-        for index, addr in enumerate(param_addr[:-1]):
-            dtype, key, value = params[addr]
-            data, shape = self._process_contents(contents, addr, addr_diff, index, value)
+        self._records = OrderedDict()
+        self._ordered = True
+        for dtype, key, value, start, stop in records[:-1]:
             if dtype is PARAMETER:
-                self._parameters[key] = Parser.convert_data_to(data, shape)
+                self._records[key] = (value, start, stop)
             elif dtype is HEADER:
-                self._header[key] = data
+                self._header[key] = self._process_contents(contents, start, stop, value)[0]
             else:
                 raise ValueError("Invalid dtype encountered in '_set_param'")
 
+    def _get_value(self, key: str):
+        """Decode the value of a parameter on first access and keep it for later accesses.
+
+        Args:
+            key (str): The key of the parameter.
+
+        Returns:
+            The decoded value.
+
+        Raises:
+            KeyError: If the parameter does not exist.
+        """
+        if key in self._parameters:
+            return self._parameters[key]
+        value, start, stop = self._records[key]
+        data, shape = self._process_contents(self._contents, start, stop, value)
+        decoded = self._parameters[key] = Parser.convert_data_to(data, shape)
+        self._ordered = False
+        return decoded
+
     def __getitem__(self, key):
         """Allows dictionary-like access to parameters.
 
@@ -167,7 +333,7 @@ class Parameter:
         Returns:
             The value associated with the key in the parameters dictionary.
         """
-        return self.parameters[key]
+        return self._get_value(key)
     
     def __getattr__(self, key):
         """Allows attribute-like access to parameters.
@@ -178,7 +344,9 @@ class Parameter:
         Returns:
             The value associated with the key in the parameters dictionary.
         """
-        return self.parameters[key]
+        if key.startswith('_'):
+            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{key}'")
+        return self._get_value(key)
     
     def __repr__(self):
         """Provide a string representation of the Parameter object for debugging and logging.
@@ -189,15 +357,15 @@ class Parameter:
         return f"{self.name}({', '.join(self._repr_items)})"
 
     def keys(self):
-        """Get the keys of the parameters dictionary.
+        """Get the keys of the parameters dictionary, without decoding any value.
 
         Returns:
             KeysView: A view of the keys in the parameter dictionary.
         """
-        return self.parameters.keys()
+        return self._records.keys()
     
     def values(self):
-        """Get the values of the parameters dictionary.
+        """Get the values of the parameters dictionary. All values are decoded.
 
         Returns:
             ValuesView: A view of the values in the parameter dictionary.
@@ -205,7 +373,7 @@ class Parameter:
         return self.parameters.values()
     
     def items(self):
-        """Get the key and value pairs of the parameters dictionary.
+        """Get the key and value pairs of the parameters dictionary. All values are decoded.
 
         Returns:
             ItemView: A view of the values in the parameter dictionary.
@@ -222,7 +390,7 @@ class Parameter:
             The value associated with the key if it exists, otherwise None.
         """
         if key in self.keys():
-            return self.parameters[key]
+            return self._get_value(key)
         else:
             return None
         
@@ -5,6 +5,10 @@ data types found in parameter files, such as integers, floats, complex arrays, a
 The functionality is designed to support the manipulation and analysis of data from Paravision parameter files, 
 ensuring data integrity and accessibility.
 
+Parameter files are split into records by `Parser.tokenize` in a single pass over the lines, without running a
+regular expression per line. The conversion of values dispatches on their first character, so each value only
+goes through the patterns that can match it; all patterns are compiled once at import.
+
 Classes:
     Parser: A class that offers a comprehensive suite of methods for parsing parameter data, 
             supporting complex data structures and providing tools to convert and clean data efficiently.
@@ -13,7 +17,6 @@ Classes:
 import re
 import numpy as np
 from collections import OrderedDict, defaultdict
-from copy import copy
 
 # REGEX patterns
 ptrn_param          = r'^\#\#(?P<key>.*)\=(?P<value>.*)$'
@@ -31,6 +34,23 @@ ptrn_braces         = r'\((?P<contents>[^()]*)\)'
 # Paravision 360 related. @[number of repititions]([number]) ex) @5(0)
 ptrn_at_array       = r'@(\d*)\*\(([-]?\d*[.]?\d*[eE]?[-]?\d*?)\)'
 
+re_param           = re.compile(ptrn_param)
+re_array           = re.compile(ptrn_array)
+re_complex_array   = re.compile(ptrn_complex_array)
+re_float           = re.compile(ptrn_float)
+re_engnotation     = re.compile(ptrn_engnotation)
+re_integer         = re.compile(ptrn_integer)
+re_string          = re.compile(ptrn_string)
+re_bisstring       = re.compile(ptrn_bisstring)
+re_braces          = re.compile(ptrn_braces)
+re_at_array        = re.compile(ptrn_at_array)
+re_parenthesis     = re.compile(r'[()]')
+
+# characters of space-separated numeric arrays, deleted to check that a body is purely numeric
+numeric_chars      = str.maketrans('', '', '0123456789.e- ')
+# negative zero integer elements, which int() followed by float() turns into a positive zero
+re_negative_zero   = re.compile(r' -0+ ')
+
 # Conditional enum
 HEADER = 0
 PARAMETER = 1
@@ -42,14 +62,85 @@ class Parser:
     The Parser class uses regular expressions to identify and convert data types found in parameter files. It handles typical data formats including integers, floats, strings, and complex arrays, making them amenable for further processing and analysis.
 
     Methods:
+        tokenize(stringlist, keys): Splits a parameter file into (dtype, key, value, start, stop) records in a single pass.
         load_param(stringlist): Parses parameters from a list of strings, identifying headers and parameters.
         convert_string_to(string): Converts strings to appropriate data types based on their content.
         clean_up_elements_in_array(data): Cleans array elements by handling patterns and replacing them with repeated values.
+        split_braces(data): Splits a nested parenthesized array into its groups in a single pass.
+        convert_element(element): Converts an element of a complex array.
         process_complexarray(data): Converts complex nested array strings into structured dictionary formats.
+        parse_nested_array(data): Converts complex nested array strings into nested lists.
         parse_shape(shape): Interprets textual shape descriptions into tuple or list formats.
         parse_data(data): Converts string data into lists or single values depending on the structure.
+        split_numeric_array(data): Splits a purely numeric array into literal segments and @N*(value) runs.
+        split_runs(data): Splits a body at its @N*(value) runs.
+        is_numeric_literal(segment): Checks that a segment only holds integer and float literals.
+        parse_numeric_array(data, as_list): Decodes a purely numeric array, expanding runs with numpy.
         convert_data_to(data, shape): Transforms data into the specified shape or data type.
     """
+    @staticmethod
+    def _split_param_line(line):
+        """Splits a '##key=value' line into its key and value, as matched by `ptrn_param`.
+
+        Args:
+            line (str): A line of a JCAMP DX file.
+
+        Returns:
+            tuple or None: The key and the value, or None if the line does not define a parameter.
+        """
+        if not line.startswith('##'):
+            return None
+        if '\n' in line:
+            return regex_obj.group('key', 'value') if (regex_obj := re_param.match(line)) else None
+        if (sep := line.rfind('=')) < 2:
+            return None
+        return line[2:sep], line[sep + 1:]
+
+    @staticmethod
+    def tokenize(stringlist, keys=None):
+        """Splits the lines of a JCAMP DX file into parameter records in a single pass.
+
+        Each record describes one '##key=value' line and the continuation lines up to the next record. The
+        value of a parameter with continuation lines is its shape, and the continuation lines hold the data.
+
+        With a key whitelist, the records of other parameters are skipped, and the iteration over the lines stops
+        at the first parameter line following the last requested key (only its first occurrence is kept). The
+        record of that line, without continuation lines, ends the records like the '##END=' record. An empty
+        whitelist stops at the first parameter, after the header preamble.
+
+        Args:
+            stringlist (Iterable[str]): The lines of a JCAMP DX file, or an iterator reading them.
+            keys (Iterable[str], optional): The parameter keys to keep, without the '$' prefix. Headers are
+                always kept.
+
+        Returns:
+            list[tuple]: The records (dtype, key, value, start, stop), where dtype is HEADER or PARAMETER and
+                `stringlist[start:stop]` are the continuation lines of the record.
+        """
+        records = []
+        remaining = None if keys is None else set(keys)
+        split_param_line = Parser._split_param_line
+        line_num = -1
+        for line_num, line in enumerate(stringlist):
+            if splitted := split_param_line(line):
+                key, value = splitted
+                if records and records[-1][4] is None:
+                    records[-1][4] = line_num
+                if key.startswith('$'):
+                    if remaining is not None:
+                        if not remaining:
+                            records.append([PARAMETER, key[1:], value, line_num + 1, line_num + 1])
+                            break
+                        if key[1:] not in remaining:
+                            continue
+                        remaining.discard(key[1:])
+                    records.append([PARAMETER, key[1:], value, line_num + 1, None])
+                else:
+                    records.append([HEADER, key, value, line_num + 1, None])
+        if records and records[-1][4] is None:
+            records[-1][4] = line_num + 1
+        return [tuple(record) for record in records]
+
     @staticmethod
     def load_param(stringlist):
         """Parses parameters from a list of string representations of a JCAMP DX file.
@@ -65,21 +156,24 @@ class Parser:
         """
         params = OrderedDict()
         param_addresses = []
-        compiled_ptrn_param = re.compile(ptrn_param)
-        compiled_ptrn_key = re.compile(ptrn_key)
-
-        for line_num, line in enumerate(stringlist):
-            if regex_obj := compiled_ptrn_param.match(line):
-                key = regex_obj['key']
-                value = regex_obj['value']
-                if compiled_ptrn_key.match(key):
-                    key = re.sub(ptrn_key, r'\g<key>', key)
-                    params[line_num] = (PARAMETER, key, value)
-                else:
-                    params[line_num] = (HEADER, key, value)
-                param_addresses.append(line_num)
+        for dtype, key, value, start, _ in Parser.tokenize(stringlist):
+            params[start - 1] = (dtype, key, value)
+            param_addresses.append(start - 1)
         return params, param_addresses, stringlist
 
+    @staticmethod
+    def join_lines(stringlist, start, stop):
+        """Joins the continuation lines of a record, skipping comment lines.
+
+        Args:
+            stringlist (list[str]): The lines of the JCAMP DX file.
+            start (int): The index of the first continuation line.
+            stop (int): The index after the last continuation line.
+
+        Returns:
+            str: The stripped lines joined by single spaces.
+        """
+        return " ".join([line.strip() for line in stringlist[start:stop] if not line.startswith('$$')])
 
     @staticmethod
     def convert_string_to(string):
@@ -92,14 +186,15 @@ class Parser:
             int, float, str, or None: The converted value of the string, or None if the string is empty.
         """
         string = string.strip()
-        if re.match(ptrn_string, string):
-            string = re.sub(ptrn_string, r'\g<string>', string)
+        if string.startswith('<') and re_string.match(string):
+            string = string[1:-1]
         if not string:
             return None
-        if re.match(ptrn_float, string) or re.match(ptrn_engnotation, string):
-            return float(string)
-        elif re.match(ptrn_integer, string):
-            return int(string)
+        if string[0] in '-.' or string[0].isdecimal():
+            if re_float.match(string) or re_engnotation.match(string):
+                return float(string)
+            elif re_integer.match(string):
+                return int(string)
         return string
 
     @staticmethod
@@ -112,19 +207,15 @@ class Parser:
         Returns:
             list: The cleaned up array elements.
         """
-        elements = re.findall(ptrn_at_array, data)
+        if '@' not in data:
+            return data
+        elements = re_at_array.findall(data)
         elements = list(set(elements))
         for str_ptn in elements:
             num_cnt = int(str_ptn[0])
             num_repeat = float(str_ptn[1])
-            str_ptn = f"@{str_ptn[0]}*({str_ptn[1]})"
-
-            str_replace_old = str_ptn
-            str_replace_new = [num_repeat for _ in range(num_cnt)]
-            str_replace_new = str(str_replace_new)
-            str_replace_new = str_replace_new.replace(",", "")
-            str_replace_new = str_replace_new.replace("[", "")
-            str_replace_new = str_replace_new.replace("]", "")
+            str_replace_old = f"@{str_ptn[0]}*({str_ptn[1]})"
+            str_replace_new = " ".join([str(num_repeat)] * num_cnt)
             data = data.replace(str_replace_old, str_replace_new)
         return data
 
@@ -144,27 +235,112 @@ class Parser:
             elements = [e.split(',') for e in elements]
         return elements
 
+    @staticmethod
+    def split_braces(data):
+        """Splits a nested parenthesized array into its groups in a single pass, with a stack of open groups.
+
+        Each ')' closes the innermost open group, a ')' without an open group is ignored, and groups left open
+        at the end of the string are dropped, as the repeated removal of innermost groups does.
+
+        Args:
+            data (str): The complex array string to be split.
+
+        Returns:
+            list[list]: The closed groups in closing order, each as [height, parts], where the height is 1 for
+                innermost groups and 1 plus the largest height of the children otherwise, and the parts are the
+                text segments and child groups of the group, in order.
+        """
+        closed = []
+        stack = []
+        pos = 0
+        for matched in re_parenthesis.finditer(data):
+            start = matched.start()
+            if stack and start > pos:
+                stack[-1][1].append(data[pos:start])
+            pos = start + 1
+            if data[start] == '(':
+                stack.append([1, []])
+            elif stack:
+                group = stack.pop()
+                closed.append(group)
+                if stack:
+                    parent = stack[-1]
+                    parent[1].append(group)
+                    if group[0] >= parent[0]:
+                        parent[0] = group[0] + 1
+        return closed
+
+    @staticmethod
+    def convert_element(element):
+        """Converts a comma-separated element of a complex array, as `convert_data_to(element, -1)` does.
+
+        Args:
+            element (str): The element, without surrounding whitespace.
+
+        Returns:
+            object: The converted element, or None if the element is empty.
+        """
+        if '@' in element or '$' in element:
+            return Parser.convert_data_to(element, -1)
+        if element.startswith('<'):
+            if element.endswith('>') and '>' not in (string := element[1:-1]):
+                return Parser.convert_string_to(string)
+            return Parser.convert_data_to(element, -1)
+        if ' ' in element:
+            return Parser.convert_data_to(element, -1)
+        return Parser.convert_string_to(element)
+
     @staticmethod
     def process_complexarray(data):
         """Processes a string representation of a complex nested array and converts it into a structured dictionary format.
 
+        The groups of each level are the innermost groups once all groups of the lower levels are removed, in
+        order of appearance. The groups are found in a single pass by `split_braces`.
+
         Args:
             data (str): The complex array string to be processed.
 
         Returns:
             dict: A dictionary representing the structured levels of the array, categorized by depth.
         """
-        data_holder = copy(data)
-        parser = defaultdict(list)
-        level = 1
-        while re.search(ptrn_braces, data_holder):
-            for parsed in re.finditer(ptrn_braces, data_holder):
-                cont_parser = [Parser.convert_data_to(cont.strip(), -1) for cont in parsed.group('contents').split(',') if Parser.convert_data_to(cont.strip(), -1) is not None]
-                parser[f'level_{level}'].append(cont_parser)
-            data_holder = re.sub(ptrn_braces, '', data_holder)
-            level += 1
-        return dict(parser)
-    
+        levels = defaultdict(list)
+        convert_element = Parser.convert_element
+        for height, parts in Parser.split_braces(data):
+            contents = ''.join(part for part in parts if isinstance(part, str))
+            levels[height].append([converted for cont in contents.split(',')
+                                   if (converted := convert_element(cont.strip())) is not None])
+        return {f'level_{height}': levels[height] for height in range(1, len(levels) + 1)}
+
+    @staticmethod
+    def parse_nested_array(data):
+        """Parses a nested parenthesized array into nested lists that keep the structure of the array.
+
+        Unlike `process_complexarray`, which groups the elements by level, each group becomes a list of its
+        elements and child groups, e.g. '((1, <a>), (2, <b>))' gives [[1, 'a'], [2, 'b']].
+
+        Args:
+            data (str): The complex array string to be parsed.
+
+        Returns:
+            list: The outermost group as a list, or the list of the outermost groups if there are several.
+        """
+        convert_element = Parser.convert_element
+
+        def as_list(parts):
+            nested = []
+            for part in parts:
+                if isinstance(part, str):
+                    nested.extend(converted for cont in part.split(',')
+                                  if (converted := convert_element(cont.strip())) is not None)
+                else:
+                    nested.append(as_list(part[1]))
+            return nested
+
+        closed = Parser.split_braces(data)
+        children = {id(part) for _, parts in closed for part in parts if not isinstance(part, str)}
+        outermost = [as_list(group[1]) for group in closed if id(group) not in children]
+        return outermost[0] if len(outermost) == 1 else outermost
+
     @staticmethod
     def process_string(data, shape):
         """Process a string and return the parsed data based on its shape.
@@ -177,15 +353,15 @@ class Parser:
             tuple: A tuple containing the parsed data and an empty string, or the processed string.
         """
         shape = Parser.parse_shape(shape)
-        if elements := re.findall(ptrn_bisstring, data):
+        if '$Bis' in data and (elements := re_bisstring.findall(data)):
             data = Parser.process_bisarray(elements, shape)
             return data, -1
         else:
             data = Parser.clean_up_elements_in_array(data)
-        if re.match(ptrn_complex_array, data):
+        if data.startswith('((') and re_complex_array.match(data):
             data = Parser.process_complexarray(data)
-        elif re.match(ptrn_string, data):
-            data = re.sub(ptrn_string, r'\g<string>', data)
+        elif data.startswith('<') and re_string.match(data):
+            data = re_string.sub(r'\g<string>', data)
         else:
             data = Parser.parse_data(data)
         return data, shape
@@ -204,11 +380,133 @@ class Parser:
             ValueError: If the shape is invalid.
         """
         if shape != -1:
-            shape = re.sub(ptrn_array, r'\g<array>', shape)
+            shape = re_array.sub(r'\g<array>', shape)
             if ',' in shape:
                 return [Parser.convert_string_to(c) for c in shape.split(',')]
         return shape
 
+    @staticmethod
+    def split_numeric_array(data):
+        """Split a purely numeric, space-separated body into literal segments and PV360 @N*(value) runs.
+
+        Only bodies whose elements would all be decoded as int or float by `convert_string_to`, once the runs
+        are expanded by `clean_up_elements_in_array`, are accepted.
+
+        Args:
+            data (str): The body of the parameter.
+
+        Returns:
+            list or None: The segments in order, either a string of space-separated literal elements or a
+                (count, value) tuple for a run, or None if the body is not a numeric array of 2 elements or more.
+        """
+        if (segments := Parser.split_runs(data)) is None:
+            return None
+        num_elements = 0
+        for segment in segments:
+            if isinstance(segment, tuple):
+                num_elements += segment[0]
+            elif Parser.is_numeric_literal(segment):
+                num_elements += segment.count(' ') + 1
+            else:
+                return None
+        return segments if num_elements > 1 else None
+
+    @staticmethod
+    def split_runs(data):
+        """Split a body at its PV360 @N*(value) runs, without checking the elements between the runs.
+
+        Args:
+            data (str): The body of the parameter.
+
+        Returns:
+            list or None: The segments in order, either the text between runs or a (count, value) tuple for a
+                run, or None if a run is not a standalone run of at least one number.
+        """
+        segments = []
+        pos = 0
+        if '@' in data:
+            for matched in re_at_array.finditer(data):
+                start, end = matched.span()
+                if (start and data[start - 1] != ' ') or (end < len(data) and data[end] != ' '):
+                    return None
+                try:
+                    count, value = int(matched.group(1)), float(matched.group(2))
+                except ValueError:
+                    return None
+                if count < 1 or not re_float.match(literal := str(value)) and not re_engnotation.match(literal):
+                    # an expanded run with no element or with values such as '1e+20' are not numbers
+                    return None
+                if start > pos:
+                    segments.append(data[pos:start - 1])
+                segments.append((count, value))
+                pos = end + 1
+        if pos < len(data) or (pos and pos == len(data)):
+            # a trailing space after the last run gives an empty segment
+            segments.append(data[pos:])
+        return segments
+
+    @staticmethod
+    def is_numeric_literal(segment):
+        """True if a space-separated segment only holds elements decoded as int or float by `convert_string_to`.
+
+        Args:
+            segment (str): The elements, separated by single spaces.
+
+        Returns:
+            bool: True for a non-empty segment of integer and float literals.
+        """
+        if not segment or segment.translate(numeric_chars) or '  ' in segment or \
+                segment[0] == ' ' or segment[-1] == ' ':
+            return False
+        # elements such as '1.', '.5' or '-.5' are not numbers for convert_string_to
+        padded = f' {segment} '
+        return not (' .' in padded or '. ' in padded or '-.' in padded)
+
+    @staticmethod
+    def parse_numeric_array(data, as_list=False):
+        """Decode a purely numeric, space-separated array with numpy, without converting each element.
+
+        This applies to the long arrays of encoding steps, positions or gradient tables. Integer arrays are
+        decoded as int64 and arrays with any float element or run as float64, which is the dtype `np.asarray`
+        gives to the list of converted elements. Literal segments are decoded in one call each, and the
+        @N*(value) runs of PV360 are expanded with `np.repeat` without building their text.
+
+        Args:
+            data (str): The body of the parameter.
+            as_list (bool): If True, return a list of Python int and float elements instead of an array.
+
+        Returns:
+            np.ndarray, list or None: The 1-D array or the list of the elements, or None if the body is not a
+                numeric array.
+        """
+        if (' ' not in data and '@' not in data) or (segments := Parser.split_numeric_array(data)) is None:
+            return None
+        literals = [segment for segment in segments if isinstance(segment, str)]
+        if len(literals) < len(segments) or any('.' in segment or 'e' in segment for segment in literals):
+            # integer elements must convert to the same float as int() followed by float()
+            if any(re_negative_zero.search(f' {segment} ') or max(map(len, segment.split(' '))) > 18 
+                   for segment in literals):
+                return None
+            dtype = np.float64
+        else:
+            dtype = np.int64
+        try:
+            if as_list:
+                decoded = []
+                for segment in segments:
+                    if isinstance(segment, tuple):
+                        decoded.extend([segment[1]] * segment[0])
+                    elif '.' in segment or 'e' in segment:
+                        decoded.extend([float(c) if '.' in c or 'e' in c else int(c) for c in segment.split(' ')])
+                    else:
+                        decoded.extend(map(int, segment.split(' ')))
+                return decoded
+            arrays = [np.repeat(dtype(segment[1]), segment[0]) if isinstance(segment, tuple)
+                      else np.array(segment.split(' '), dtype=dtype) for segment in segments]
+            return arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+        except (ValueError, OverflowError):
+            return None
+
     @staticmethod
     def parse_data(data):
         """Parse the data based on its format.
@@ -219,7 +517,7 @@ class Parser:
         Returns:
             list or str: The parsed data.
         """
-        if matched := re.findall(ptrn_array, data):
+        if '(' in data and (matched := re_array.findall(data)):
             return Parser.parse_array_data(matched)
         elif ',' in data:
             return [Parser.convert_string_to(c) for c in data.split(',')]
@@ -252,6 +550,11 @@ class Parser:
         Returns:
             object: The converted data.
         """
+        if isinstance(data, str) and (' ' in data or '@' in data):
+            parsed_shape = Parser.parse_shape(shape)
+            is_array = isinstance(parsed_shape, list)
+            if (decoded := Parser.parse_numeric_array(data, as_list=not is_array)) is not None:
+                return decoded.reshape(parsed_shape) if is_array else decoded
         if isinstance(data, str):
             data, shape = Parser.process_string(data, shape)
         if isinstance(data, list):
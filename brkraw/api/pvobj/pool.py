@@ -0,0 +1,383 @@
+"""Provides shared handle pools for archived (zip and tar) PvDatasets.
+
+Opening an archive parses its whole member table (the central directory of a zip file, or every header of a
+tar file), which is expensive for archived studies containing thousands of members, particularly on network
+file systems. A handle pool keeps a single archive handle open for the lifetime of a PvStudy/PvScan/PvReco
+tree, together with a precomputed index-to-member table, so every member can be opened without re-reading
+the member table. Pools are thread-safe, so the members of one archive can be read from a thread pool.
+
+Handle pools are the storage backends of archived datasets (see `storage`): archive members are referenced by
+their position in the member table.
+
+Members stored without compression (ZIP_STORED members, which is the default of the backup tool, and all
+members of uncompressed tar files) are served through `FileWindow`, a seekable window onto the archive file
+itself. Reading such members costs the same as reading a plain file, and the window can be memory-mapped.
+When enabled, large deflated members are served through `ZipDeflatedMember`, which seeks through a checkpoint
+index of the deflate stream instead of decompressing the member from its start (see `zran`).
+
+Classes:
+    BaseHandlePool: Shares one open archive handle and its member table among all objects of a pvobj tree.
+    ZipHandlePool: The handle pool of zip archives.
+    TarHandlePool: The handle pool of tar archives, optionally compressed with gzip, bzip2 or xz.
+    ZipStoredMember: A FileWindow over the data of a zip member, as stored in the archive.
+
+Functions:
+    get_pool: Creates the handle pool matching the format of an archive.
+    split_member_name: Splits an archive member name into its directory path and filename.
+"""
+
+from __future__ import annotations
+import io
+import os
+import zlib
+import struct
+import zipfile
+import tarfile
+import posixpath
+import threading
+from . import zran
+from .storage import BaseStorage, FileWindow, RangeView, build_archive_contents, to_zip_time
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from typing import List, Optional, Dict, Union, Any, Tuple
+    from pathlib import Path
+    from zipfile import ZipInfo, ZipExtFile
+    from tarfile import TarInfo
+
+
+class BaseHandlePool(BaseStorage):
+    """Keeps open archive handles and shares them among pvobj instances.
+
+    Handles are opened lazily on first access and re-opened transparently after `close()` or when the
+    pool is used from a forked child process, as the file offset of an inherited descriptor is shared
+    with the parent process. The member table is kept after `close()`.
+
+    The pool is thread-safe. Archive formats whose handle serializes concurrent reads (`shared_handle`)
+    use one handle per process; the others get one handle per thread. File objects returned by `open`
+    must not be shared between threads.
+
+    Args:
+        path (Path): The path to the archive.
+        infolist (list, optional): The member table of the archive, if already known (e.g. from the
+            contents index). The archive is then only opened when a member has to be decompressed.
+
+    Attributes:
+        kind (str): The archive format, used as the key of the pool in the contents index.
+        shared_handle (bool): True if a single handle can be used from several threads.
+        path (Path): The path to the archive.
+    """
+    kind: str = None
+    shared_handle: bool = True
+
+    def __init__(self, path: 'Path', infolist: Optional[List[Any]] = None):
+        super().__init__(path)
+        self._handles: Dict[Tuple[int, Optional[int]], Any] = {}
+        self._infolist = infolist
+        self._lock = threading.RLock()
+
+    def _open_handle(self):
+        """Opens the archive. Implemented by subclasses."""
+        raise NotImplementedError
+
+    def _read_infolist(self, handle) -> List[Any]:
+        """Reads the member table from the open archive. Implemented by subclasses."""
+        raise NotImplementedError
+
+    def _get_owner(self) -> Tuple[int, Optional[int]]:
+        return os.getpid(), None if self.shared_handle else threading.get_ident()
+
+    @property
+    def handle(self):
+        """The open archive handle, (re-)opened on demand.
+
+        Returns:
+            The handle for the archive owned by the current process (and thread, if not shared).
+        """
+        owner = self._get_owner()
+        if (handle := self._handles.get(owner)) is None:
+            with self._lock:
+                if (handle := self._handles.get(owner)) is None:
+                    # a handle inherited through fork is left to the parent process
+                    handle = self._open_handle()
+                    if self._infolist is None:
+                        self._infolist = self._read_infolist(handle)
+                    self._handles[owner] = handle
+        return handle
+
+    @property
+    def infolist(self) -> List[Any]:
+        """The information objects of the archive members.
+
+        Returns:
+            list: The member table, indexed by the `file_indexes` stored in pvobj contents.
+        """
+        if self._infolist is None:
+            self.handle
+        return self._infolist
+
+    def getinfo(self, index: int):
+        """Returns the information of the member at the given index.
+
+        Args:
+            index (int): The position of the member in the member table.
+
+        Returns:
+            The member information.
+        """
+        return self.infolist[index]
+
+    @property
+    def closed(self) -> bool:
+        """True if the pool currently holds no open handle in this process."""
+        pid = os.getpid()
+        return not any(owner[0] == pid for owner in list(self._handles))
+
+    def close(self):
+        """Closes the handles of all threads. Member files opened before remain readable until they are closed."""
+        with self._lock:
+            pid = os.getpid()
+            for owner, handle in self._handles.items():
+                if owner[0] == pid:
+                    handle.close()
+            self._handles = {}
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(path='{self.path}', closed={self.closed})"
+
+
+class ZipHandlePool(BaseHandlePool):
+    """Keeps one open ZipFile handle per zip archive and shares it among pvobj instances.
+
+    Uncompressed, unencrypted members are opened as a `ZipStoredMember` window onto the archive file. Deflated
+    members of at least `ZipDeflatedMember.min_size` bytes are opened as a `ZipDeflatedMember`, which seeks
+    through a checkpoint index, if it is enabled and the zlib library can be loaded (see `zran.is_available`).
+    Other members are decompressed through the shared ZipFile handle, which locks the archive file around each
+    read, so members can be read from several threads at once.
+    """
+    kind = 'zip'
+
+    def __init__(self, path: 'Path', infolist: Optional[List[ZipInfo]] = None):
+        super().__init__(path, infolist)
+        self._data_offsets: Dict[int, int] = {}
+
+    def _open_handle(self):
+        return zipfile.ZipFile(self.path)
+
+    def _read_infolist(self, handle: zipfile.ZipFile):
+        return handle.infolist()
+
+    @property
+    def zipfile(self) -> zipfile.ZipFile:
+        """The open ZipFile handle, (re-)opened on demand."""
+        return self.handle
+
+    def list(self, dirpath: Optional[str] = None, recursive: bool = True):
+        """Builds the contents tree of the archive from its central directory. The archive is listed as a whole."""
+        return build_archive_contents((i, *os.path.split(item.filename), item.file_size)
+                                      for i, item in enumerate(self.infolist) if not item.is_dir())
+
+    def stat(self, index: int):
+        info = self.getinfo(index)
+        return (info.date_time, info.file_size, info.CRC), info.file_size
+
+    def mtime(self, index: int):
+        return tuple(self.getinfo(index).date_time)
+
+    def crc32(self, index: int):
+        """Returns the CRC-32 of a member, as recorded in the central directory."""
+        return self.getinfo(index).CRC
+
+    def open(self, index: int, offset: int = 0, size: Optional[int] = None) \
+            -> Union[ZipExtFile, ZipStoredMember, zran.ZipDeflatedMember, RangeView]:
+        """Opens the member at the given index, or a byte range of it.
+
+        Args:
+            index (int): The position of the member in the central directory.
+            offset (int): The position of the first byte of the range.
+            size (int, optional): The size of the range. Defaults to the rest of the member.
+
+        Returns:
+            ZipExtFile, ZipStoredMember or ZipDeflatedMember: A file object for reading the member.
+        """
+        info = self.getinfo(index)
+        if not info.flag_bits & 0x1:
+            if info.compress_type == zipfile.ZIP_STORED:
+                member = ZipStoredMember(self.path, info, self._data_offsets.get(index))
+                self._data_offsets[index] = member.offset
+                return self._get_range(member, info.file_size, offset, size)
+            if info.compress_type == zipfile.ZIP_DEFLATED and \
+                    info.file_size >= zran.ZipDeflatedMember.min_size and zran.is_available():
+                source = ZipStoredMember(self.path, info, self._data_offsets.get(index))
+                self._data_offsets[index] = source.offset
+                return self._get_range(zran.ZipDeflatedMember(self.path, info, source), info.file_size, offset, size)
+        return self._get_range(self.zipfile.open(info), info.file_size, offset, size)
+
+
+class TarHandlePool(BaseHandlePool):
+    """Keeps open TarFile handles per tar archive and shares them among pvobj instances.
+
+    Only regular files are kept in the member table. Members of uncompressed tar files are opened as a
+    `FileWindow` onto the archive file, as tar stores the data of each member contiguously. Members of
+    compressed tar files are read through a TarFile handle, which decompresses the stream up to the member.
+    As a TarFile does not serialize reads, each thread gets its own handle.
+
+    Attributes:
+        is_stream_compressed (bool): True if the whole tar stream is compressed (e.g. .tar.gz).
+    """
+    kind = 'tar'
+    shared_handle = False
+    _magics = (b'\x1f\x8b', b'BZh', b'\xfd7zXZ')
+
+    def __init__(self, path: 'Path', infolist: Optional[List[TarInfo]] = None):
+        super().__init__(path, infolist)
+        with open(path, 'rb') as f:
+            magic = f.read(6)
+        self.is_stream_compressed = any(magic.startswith(m) for m in self._magics)
+
+    def _open_handle(self):
+        return tarfile.open(self.path, 'r:*')
+
+    def _read_infolist(self, handle: tarfile.TarFile):
+        return [m for m in handle.getmembers() if m.isreg()]
+
+    @property
+    def tarfile(self) -> tarfile.TarFile:
+        """The open TarFile handle of the current thread, (re-)opened on demand."""
+        return self.handle
+
+    def list(self, dirpath: Optional[str] = None, recursive: bool = True):
+        """Builds the contents tree of the archive from its member table. The archive is listed as a whole."""
+        return build_archive_contents((i, *split_member_name(member.name), member.size)
+                                      for i, member in enumerate(self.infolist))
+
+    def stat(self, index: int):
+        info = self.getinfo(index)
+        return (info.mtime, info.size, info.offset_data), info.size
+
+    def mtime(self, index: int):
+        return to_zip_time(self.getinfo(index).mtime)
+
+    def open(self, index: int, offset: int = 0, size: Optional[int] = None) \
+            -> Union[FileWindow, io.BufferedReader, RangeView]:
+        """Opens the member at the given index, or a byte range of it.
+
+        Args:
+            index (int): The position of the member in the member table.
+            offset (int): The position of the first byte of the range.
+            size (int, optional): The size of the range. Defaults to the rest of the member.
+
+        Returns:
+            FileWindow or ExFileObject: A file object for reading the member.
+        """
+        info = self.getinfo(index)
+        if not self.is_stream_compressed:
+            return self._get_range(FileWindow(self.path, info.offset_data, info.size, info.name), info.size,
+                                   offset, size)
+        return self._get_range(self.tarfile.extractfile(info), info.size, offset, size)
+
+
+def get_pool(path: 'Path', kind: Optional[str] = None, infolist: Optional[List[Any]] = None) -> BaseHandlePool:
+    """Creates the handle pool of an archive.
+
+    Args:
+        path (Path): The path to the archive.
+        kind (str, optional): The archive format ('zip' or 'tar'). Detected from the file if not given.
+        infolist (list, optional): The member table of the archive, if already known.
+
+    Returns:
+        BaseHandlePool: The handle pool matching the archive format.
+
+    Raises:
+        ValueError: If the file is neither a zip nor a tar archive.
+    """
+    if kind is None:
+        if zipfile.is_zipfile(path):
+            kind = ZipHandlePool.kind
+        elif tarfile.is_tarfile(path):
+            kind = TarHandlePool.kind
+    for pool_class in (ZipHandlePool, TarHandlePool):
+        if pool_class.kind == kind:
+            return pool_class(path, infolist)
+    raise ValueError(f"The path '{path}' is not a supported archive.")
+
+
+def split_member_name(name: str) -> Tuple[str, str]:
+    """Splits an archive member name into its normalized directory path and filename.
+
+    Args:
+        name (str): The member name, using '/' as separator.
+
+    Returns:
+        tuple: The directory path ('' for the archive root) and the filename.
+    """
+    dirpath, filename = posixpath.split(posixpath.normpath(name))
+    return ('' if dirpath == '.' else dirpath), filename
+
+
+class ZipStoredMember(FileWindow):
+    """A FileWindow over the data of a zip member, as stored in the archive.
+
+    For uncompressed (ZIP_STORED) members, this is the content of the member, and reads in order from its start
+    verify its CRC when they reach its end, as `ZipExtFile` does. For deflated members, it is the compressed
+    stream, read by `ZipDeflatedMember`.
+
+    Args:
+        path (Path): The path to the zip archive.
+        info (ZipInfo): The information of the member.
+        offset (int, optional): The position of the member data in the archive, if already known.
+            Otherwise it is computed from the local file header.
+    """
+    _local_header = struct.Struct('<4s2B4HL2L2H')
+
+    def __init__(self, path: 'Path', info: ZipInfo, offset: Optional[int] = None):
+        super().__init__(path, offset, info.compress_size, info.filename)
+        if offset is None:
+            try:
+                self.offset = self.get_data_offset(self._fp, info)
+            except ValueError:
+                self._fp.close()
+                raise
+        self._expected_crc = info.CRC if info.compress_type == zipfile.ZIP_STORED else None
+        self._crc = 0
+        self._crc_pos = 0
+
+    def readinto(self, b):
+        pos = self._pos
+        size = super().readinto(b)
+        self._check_crc(pos, memoryview(b)[:size])
+        return size
+
+    def read(self, size: int = -1):
+        pos = self._pos
+        data = super().read(size)
+        self._check_crc(pos, data)
+        return data
+
+    def _check_crc(self, pos: int, data):
+        """Updates the CRC of the data read in order from the start, and verifies it at the end of the member."""
+        if self._expected_crc is None or pos != self._crc_pos:
+            return
+        self._crc = zlib.crc32(data, self._crc)
+        self._crc_pos += len(data)
+        if self._crc_pos == self.size and self._crc != self._expected_crc:
+            raise zipfile.BadZipFile(f"Bad CRC-32 for file {self.name!r}")
+
+    @classmethod
+    def get_data_offset(cls, fp, info: ZipInfo) -> int:
+        """Computes the position of the member data in the archive from its local file header.
+
+        Args:
+            fp: A seekable file object over the archive.
+            info (ZipInfo): The information of the member.
+
+        Returns:
+            int: The position of the first byte of the member data.
+
+        Raises:
+            ValueError: If the local file header is invalid.
+        """
+        fp.seek(info.header_offset)
+        header = cls._local_header.unpack(fp.read(cls._local_header.size))
+        if header[0] != b'PK\x03\x04':
+            raise ValueError(f"Bad local file header for member '{info.filename}'.")
+        return info.header_offset + cls._local_header.size + header[-2] + header[-1]
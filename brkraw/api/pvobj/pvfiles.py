@@ -11,6 +11,7 @@ from .base import BaseMethods
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from pathlib import Path
+    from typing import Optional, Iterable
 
 class PvFiles(BaseMethods):
     """Manages arbitrary files within a Paravision dataset, providing flexible file handling capabilities.
@@ -62,6 +63,14 @@ class PvFiles(BaseMethods):
             return open(file_path, 'rb')
         raise KeyError(f'Failed to find filename "{key}" from input files.\n [{self.contents.get("files")}]')
         
+    def _get_cache_key(self, key: str):
+        """Disables the parameter cache for loosely organized files, which have no dataset identity.
+
+        Returns:
+            tuple: An empty cache key and a zero size.
+        """
+        return None, 0
+
     def _search_file_path(self, key: str):
         """Searches for a file path that includes the specified key.
 
@@ -76,13 +85,16 @@ class PvFiles(BaseMethods):
         else:
             return False
         
-    def get_visu_pars(self, _:None=None):
+    def get_visu_pars(self, _:None=None, keys: Optional[Iterable[str]] = None):
         """A mock function to mimic getting 'visu_pars', typically used for testing or compatibility.
 
+        Args:
+            keys (Optional[Iterable[str]]): The parameter keys to load, as in `get_parameter`.
+
         Returns:
             str: The contents of 'visu_pars' if it exists, mimics behavior of similar functions in related classes.
         """
-        return getattr(self, 'visu_pars')
+        return self.get_parameter('visu_pars', keys)
         
     @property
     def path(self):
@@ -21,6 +21,7 @@ if TYPE_CHECKING:
     from typing import Tuple, Dict
     from typing import Optional
     from pathlib import Path
+    from .pool import BaseHandlePool
 
 
 class PvReco(BaseMethods):
@@ -41,9 +42,10 @@ class PvReco(BaseMethods):
         reco_id (int): The ID of the reconstruction.
         pathes (Tuple[Path, Path]): Contains the root path and specific reconstruction path.
         contents (Optional[Dict], optional): Initial content data for the reconstruction.
+        pool (Optional[BaseHandlePool], optional): The archive handle pool shared by the parent scan.
     """
     def __init__(self, scan_id: int, reco_id: int, pathes: Tuple['Path', 'Path'], 
-                 contents: Optional['Dict']=None):
+                 contents: Optional['Dict']=None, pool: Optional['BaseHandlePool']=None):
         """Initializes the PvReco object with specified identifiers, paths, and optional contents.
 
         Args:
@@ -51,6 +53,7 @@ class PvReco(BaseMethods):
             reco_id (int): The unique identifier for this reconstruction within its scan.
             pathes (Tuple[Path, Path]): A tuple containing the root path and the specific path for this reconstruction.
             contents (Dict, optional): A dictionary representing the initial contents of the reconstruction.
+            pool (BaseHandlePool, optional): The archive handle pool shared by the parent scan.
 
         Raises:
             FileNotFoundError: If the provided paths do not exist or are not accessible.
@@ -58,6 +61,7 @@ class PvReco(BaseMethods):
         """
         self._scan_id = scan_id
         self._reco_id = reco_id
+        self._pool = pool
         self._rootpath = self._resolve(pathes[0])
         self._path = self._resolve(pathes[1])
         self._contents = contents
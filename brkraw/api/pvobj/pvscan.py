@@ -10,13 +10,15 @@ Classes:
 
 from __future__ import annotations
 import os
+import threading
 from collections import OrderedDict
 from .base import BaseMethods
 from .pvreco import PvReco
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
-    from typing import Optional, Tuple, Dict
+    from typing import Optional, Tuple, Dict, Iterable
     from pathlib import Path
+    from .pool import BaseHandlePool
 
 class PvScan(BaseMethods):
     """Represents and manages an individual scan within a Paravision study dataset.
@@ -32,14 +34,15 @@ class PvScan(BaseMethods):
 
     Methods:
         update(contents): Updates the contents of the scan with new data.
-        set_reco(path, reco_id, contents): Initializes a PvReco object for a specific reconstruction.
+        set_reco(path, reco_id, contents): Registers a reconstruction, instantiated as PvReco on first access.
         get_reco(reco_id): Retrieves a PvReco object for a given reconstruction ID.
     """
     def __init__(self, 
                  scan_id: Optional[int], 
                  pathes: Tuple[Path, Path], 
                  contents: Optional[Dict]=None, 
-                 recos: Optional[OrderedDict]=None):
+                 recos: Optional[OrderedDict]=None,
+                 pool: Optional[BaseHandlePool]=None):
         """Initializes a PvScan object with the specified scan ID, paths, and optional contents and reconstructions.
 
         Args:
@@ -47,16 +50,20 @@ class PvScan(BaseMethods):
             pathes (tuple): A tuple containing the root path and the specific scan path.
             contents (dict, optional): The initial contents of the scan's dataset. Defaults to None.
             recos (OrderedDict, optional): A dictionary of PvReco objects. Defaults to None.
+            pool (BaseHandlePool, optional): The archive handle pool shared by the parent study. Defaults to None.
 
         Raises:
             FileNotFoundError: If the paths do not exist or are invalid.
             ValueError: If the paths are neither directories nor recognizable compressed file formats.
         """
         self._scan_id = scan_id
+        self._pool = pool
+        self._lock = threading.RLock()
         self._rootpath = self._resolve(pathes[0])
         self._path = self._resolve(pathes[1])
         self.update(contents)
         self._recos = OrderedDict(recos) if recos else OrderedDict()
+        self._reco_table = OrderedDict()
     
     def update(self, contents: Dict):
         """pdates the contents of the scan's dataset.
@@ -72,7 +79,7 @@ class PvScan(BaseMethods):
         self._contents = contents
     
     def set_reco(self, path: Path, reco_id: int, contents: Dict):
-        """Initializes and stores a PvReco object for a specific reconstruction within the scan.
+        """Registers a specific reconstruction within the scan. Its PvReco object is created by `get_reco`.
 
         Args:
             path (Path): The path to the reconstruction data.
@@ -82,7 +89,8 @@ class PvScan(BaseMethods):
         Returns:
             None
         """
-        self._recos[reco_id] = PvReco(self._scan_id, reco_id, (self._rootpath, path), contents)
+        self._recos.pop(reco_id, None)
+        self._reco_table[reco_id] = (path, contents)
     
     def get_reco(self, reco_id: int):
         """Retrieves the PvReco object associated with the specified reconstruction ID.
@@ -96,9 +104,20 @@ class PvScan(BaseMethods):
         Raises:
             KeyError: If the specified reconstruction ID does not exist within the scan.
         """
-        return self._recos[reco_id]
-
-    def get_visu_pars(self, reco_id: Optional[int] = None):
+        if (pvreco := self._recos.get(reco_id)) is None:
+            with self._lock:
+                if (pvreco := self._recos.get(reco_id)) is None:
+                    path, contents = self._reco_table[reco_id]
+                    pvreco = self._recos[reco_id] = PvReco(self._scan_id, reco_id, (self._rootpath, path), contents,
+                                                           pool=self._pool)
+        return pvreco
+
+    def _iter_children(self):
+        """Yields the reconstructions of the scan, combined in its fingerprint."""
+        for reco_id in self.avail:
+            yield reco_id, self.get_reco(reco_id)
+
+    def get_visu_pars(self, reco_id: Optional[int] = None, keys: Optional[Iterable[str]] = None):
         """Retrieves visualization parameters ('visu_pars') for the scan or a specific reconstruction.
 
         This method attempts to find and return the 'visu_pars' file. It looks for this file in the following order:
@@ -109,6 +128,8 @@ class PvScan(BaseMethods):
         Args:
             reco_id (Optional[int]): The ID of the reconstruction from which to retrieve 'visu_pars'. If None,
                                     the method searches across the scan and all its reconstructions.
+            keys (Optional[Iterable[str]]): The parameter keys to load, as in `get_parameter`. All parameters are
+                                    loaded if None.
 
         Returns:
             The visualization parameters as specified in 'visu_pars'.
@@ -118,14 +139,14 @@ class PvScan(BaseMethods):
                             or across any of the available reconstructions.
         """
         if reco_id:
-            return getattr(self.get_reco(reco_id), 'visu_pars')
+            return self.get_reco(reco_id).get_parameter('visu_pars', keys)
         elif 'visu_pars' in self.contents['files']:
-            return getattr(self, 'visu_pars')
+            return self.get_parameter('visu_pars', keys)
         elif len(self.avail):
             recoobjs = [self.get_reco(rid) for rid in self.avail]
             for recoobj in recoobjs:
                 if 'visu_pars' in recoobj.contents['files']:
-                    return getattr(recoobj, 'visu_pars')
+                    return recoobj.get_parameter('visu_pars', keys)
         raise FileNotFoundError
     
     @property
@@ -147,4 +168,4 @@ class PvScan(BaseMethods):
         Returns:
             list: A sorted list of available reconstruction IDs.
         """
-        return sorted(list(self._recos))
\ No newline at end of file
+        return sorted(set(self._recos) | set(self._reco_table))
\ No newline at end of file
@@ -12,12 +12,20 @@ Classes:
 from __future__ import annotations
 import re
 import zipfile
+import tarfile
+import threading
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from .base import BaseMethods
+from .pool import ZipHandlePool, TarHandlePool, get_pool
+from .storage import DirStorage, is_url
+from .remote import HttpZipStorage
+from .index import contents_index
 from .pvscan import PvScan
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from pathlib import Path
+    from typing import Callable, Optional, Iterable, Any
 
 
 class PvStudy(BaseMethods):
@@ -25,6 +33,8 @@ class PvStudy(BaseMethods):
 
     Inherits from BaseMethods to utilize general methods for file handling and dataset validation.
     Manages multiple scans and their respective data, supporting both compressed and uncompressed formats.
+    A PvStudy can be shared between threads: scans are instantiated once, and archive handles and the parameter
+    cache are thread-safe. File objects returned by the pvobj tree must not be shared between threads.
 
     Attributes:
         is_compressed (bool): Indicates whether the dataset is compressed, affecting how files are accessed and processed.
@@ -34,18 +44,25 @@ class PvStudy(BaseMethods):
 
     Methods:
         get_scan(scan_id): Retrieves a PvScan object for a given scan ID, facilitating detailed access to specific scans.
+        map_scans(func, scan_ids, workers): Applies a function to scans concurrently from a thread pool.
+        fingerprint(mtime, sample, block_size): Computes a fingerprint of the study content.
     """
-    def __init__(self, path: Path, debug: bool=False):
+    def __init__(self, path: Path, debug: bool=False, shallow: bool=False):
         """Initializes a PvStudy object with the specified path and debug settings.
 
         Args:
-            path (Path): The filesystem path to the dataset.
+            path (Path): The filesystem path to the dataset, or the URL of a zip archived dataset on an HTTP server
+                supporting range requests.
             debug (bool, optional): If set to True, enables debug mode which may affect logging and error reporting.
+            shallow (bool, optional): If set to True, only the top level of an uncompressed study is indexed when
+                opened, and each scan directory is indexed on its first access. The path must point to the study folder.
 
         Raises:
             FileNotFoundError: If the path does not exist or is invalid.
             ValueError: If the path is neither a directory nor a recognizable compressed file format.
         """
+        self._shallow = shallow
+        self._lock = threading.RLock()
         if not debug:    
             self._check_dataset_validity(self._resolve(path))
             self._construct()
@@ -54,21 +71,45 @@ class PvStudy(BaseMethods):
     def _check_dataset_validity(self, path: Path):
         """Validates the provided path to ensure it points to a viable dataset.
 
+        Directories, zip archives and tar archives (optionally compressed with gzip, bzip2 or xz) are supported,
+        as well as zip archives served over HTTP. If the persistent contents index is enabled, the contents of
+        local archives are taken from it when the archive is unchanged since it was indexed, and indexed otherwise.
+
         Args:
             path (Path): The path to validate.
 
         Raises:
             FileNotFoundError: If the path does not exist.
-            ValueError: If the path is neither a directory nor a valid compressed file.
+            ValueError: If the path is neither a directory nor a valid zip or tar file.
+            OSError: If a remote archive cannot be read.
         """
         self._path = path
+        # the scans and reconstructions share the storage backend, which only the study closes
+        self._owns_pool = True
+        if is_url(self._path):
+            self._pool = HttpZipStorage(self._path)
+            self._contents = self._pool.list()
+            self.is_compressed = True
+            return
         if not self._path.exists():
             raise FileNotFoundError(f"The path '{self._path}' does not exist.")
         if self._path.is_dir():
-            self._contents = self._fetch_dir(self._path)
+            self._pool = DirStorage(self._path)
+            self._contents = self._pool.list(recursive=not self._shallow)
             self.is_compressed = False
+        elif indexed := contents_index.load(self._path):
+            self._contents, kind, infolist = indexed
+            self._pool = get_pool(self._path, kind, infolist)
+            self.is_compressed = True
         elif self._path.is_file() and zipfile.is_zipfile(self._path):
-            self._contents = self._fetch_zip(self._path)
+            self._pool = ZipHandlePool(self._path)
+            self._contents = self._pool.list()
+            contents_index.save(self._path, self._contents, self._pool)
+            self.is_compressed = True
+        elif self._path.is_file() and tarfile.is_tarfile(self._path):
+            self._pool = TarHandlePool(self._path)
+            self._contents = self._pool.list()
+            contents_index.save(self._path, self._contents, self._pool)
             self.is_compressed = True
         else:
             raise ValueError(f"The path '{self._path}' does not meet the required criteria.")
@@ -77,20 +118,47 @@ class PvStudy(BaseMethods):
         """Organizes the dataset contents by parsing directories and files, structuring them for easy access.
 
         Processes directories to segregate scans and their respective data, handling both uncompressed and compressed datasets.
+        Only a compact table mapping each scan ID to its path, its contents and the paths and contents of its
+        reconstructions is built here; the PvScan and PvReco objects are instantiated on first access.
         """
+        self._table = OrderedDict()
         self._scans = OrderedDict()
         self._backup = OrderedDict()
+        self._unindexed = OrderedDict()
+        self._clear_contents(self._process_contents(self._contents))
+        if self._shallow and (root := self._contents.get('.')):
+            for dirname in root['dirs']:
+                if dirname.isdigit() and int(dirname) not in self._table:
+                    self._unindexed[int(dirname)] = dirname
+
+    def _process_contents(self, contents):
+        """Creates the child objects for the scan and reconstruction directories found in the given contents.
+
+        Args:
+            contents (dict): The directory structure, keyed by paths relative to the dataset root.
 
+        Returns:
+            list: The paths that were processed and can be removed from the study contents.
+        """
         to_remove = []
-        for path, contents in self._contents.items():
+        for path, subcontents in contents.items():
             if not path:
-                self._root = contents
+                self._root = subcontents
                 to_remove.append(path)
-            elif not contents['files']:
+            elif not subcontents['files']:
                 to_remove.append(path)
             elif matched := re.match(r'(?:.*/)?(\d+)/(\D+)/(\d+)$', path) or re.match(r'(?:.*/)?(\d+)$', path):
-                to_remove.append(self._process_childobj(matched, (path, contents)))
-        self._clear_contents(to_remove)
+                to_remove.append(self._process_childobj(matched, (path, subcontents)))
+        return to_remove
+
+    def _index_scan(self, scan_id: int):
+        """Indexes the directory of a scan that was skipped when the study was opened in shallow mode.
+
+        Args:
+            scan_id (int): The unique identifier for the scan.
+        """
+        dirname = self._unindexed.pop(scan_id)
+        self._process_contents(self._pool.list(dirname))
 
     def _process_childobj(self, matched, item):
         """The `_process_childobj` method processes a child object based on the provided arguments and updates the internal state of the object.
@@ -105,17 +173,32 @@ class PvStudy(BaseMethods):
         """
         path, contents = item
         scan_id = int(matched.group(1))
-        if scan_id not in self._scans:
-            self._scans[scan_id] = PvScan(scan_id, (self.path, path))
+        if scan_id not in self._table:
+            self._table[scan_id] = [path, None, OrderedDict()]
         if len(matched.groups()) == 1 and 'pdata' in contents['dirs']:
-            self._scans[scan_id].update(contents)
+            self._table[scan_id][1] = contents
         elif len(matched.groups()) == 3 and matched.group(2) == 'pdata':
             reco_id = int(matched.group(3))
-            self._scans[scan_id].set_reco(path, reco_id, contents)
+            self._table[scan_id][2][reco_id] = (path, contents)
         else:
             self._backup[path] = contents
         return path
 
+    def _construct_scan(self, scan_id: int):
+        """Instantiates the PvScan object of a scan from the contents table.
+
+        Args:
+            scan_id (int): The unique identifier for the scan.
+
+        Returns:
+            PvScan: The scan object, with its reconstructions registered but not yet instantiated.
+        """
+        path, contents, recos = self._table[scan_id]
+        pvscan = PvScan(scan_id, (self.path, path), contents, pool=self._pool)
+        for reco_id, (reco_path, reco_contents) in recos.items():
+            pvscan.set_reco(reco_path, reco_id, reco_contents)
+        return pvscan
+
     @property
     def contents(self):
         """Retrieves the contents of the study that include 'subject' in their files list.
@@ -168,7 +251,7 @@ class PvStudy(BaseMethods):
         Returns:
             list: A sorted list of available scan IDs.
         """
-        return sorted(list(self._scans))
+        return sorted(list(self._table) + list(self._unindexed))
     
     def get_scan(self, scan_id: int):
         """Retrieves the scan object associated with the specified scan ID.
@@ -182,7 +265,40 @@ class PvStudy(BaseMethods):
         Raises:
             KeyError: If there is no scan associated with the provided ID.
         """
-        return self._scans[scan_id]
+        if (pvscan := self._scans.get(scan_id)) is None:
+            with self._lock:
+                if scan_id in self._unindexed:
+                    self._index_scan(scan_id)
+                if (pvscan := self._scans.get(scan_id)) is None:
+                    pvscan = self._scans[scan_id] = self._construct_scan(scan_id)
+        return pvscan
+
+    def _iter_children(self):
+        """Yields the scans of the study, combined in its fingerprint."""
+        for scan_id in self.avail:
+            yield scan_id, self.get_scan(scan_id)
+
+    def map_scans(self, func: Callable[[PvScan], Any], scan_ids: Optional[Iterable[int]] = None,
+                  workers: Optional[int] = None):
+        """Applies a function to scans of the study concurrently, using a pool of threads.
+
+        Reading Paravision files is mostly I/O bound and decompression releases the GIL, so reading many scans
+        of one study (e.g. on network storage or from a deflated archive) benefits from concurrent reads.
+
+        Args:
+            func (Callable): The function to apply, called with the PvScan object of each scan.
+            scan_ids (Iterable[int], optional): The IDs of the scans to process. Defaults to all available scans.
+            workers (int, optional): The maximum number of threads. Defaults to the ThreadPoolExecutor default.
+
+        Returns:
+            OrderedDict: The results of the function, keyed by scan ID in the order of `scan_ids`.
+
+        Raises:
+            Exception: The first exception raised by the function, in the order of `scan_ids`.
+        """
+        scan_ids = self.avail if scan_ids is None else list(scan_ids)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return OrderedDict(zip(scan_ids, executor.map(lambda scan_id: func(self.get_scan(scan_id)), scan_ids)))
     
     def __dir__(self):
         """Customizes the directory listing to include specific attributes and methods.
@@ -190,4 +306,4 @@ class PvStudy(BaseMethods):
         Returns:
             list: A list of attribute names and methods available in this object.
         """
-        return super().__dir__() + ['path', 'avail', 'get_scan']
+        return super().__dir__() + ['path', 'avail', 'get_scan', 'map_scans', 'fingerprint']
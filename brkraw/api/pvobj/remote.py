@@ -0,0 +1,204 @@
+"""Provides the storage backend of zip archived PvDatasets served over HTTP.
+
+Studies kept on an HTTP file server can be listed and read without downloading the archive: the central
+directory is read with a few range requests at the end of the archive, and each member is read with range
+requests for the bytes actually needed. Uncompressed (ZIP_STORED) members are served as a window onto the
+remote archive, so reading a frame of a 2dseq only transfers that frame; other members are decompressed
+through a ZipFile reading the remote archive.
+
+The server must support range requests (RFC 7233), i.e. answer a request with a `Range` header with
+`206 Partial Content` and a `Content-Range` header.
+
+Classes:
+    HttpFile: A read-only, seekable file object over a byte range of a remote file, read with range requests.
+    HttpZipStorage: The storage backend of zip archives served over HTTP.
+
+Functions:
+    get_remote_size: Returns the size of a remote file.
+"""
+
+from __future__ import annotations
+import io
+import re
+import zipfile
+import urllib.request
+import urllib.error
+from .pool import ZipHandlePool, ZipStoredMember
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from typing import Optional, List
+    from zipfile import ZipInfo
+
+ptrn_content_range = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+
+
+def _request_range(url: str, start: int, stop: int, timeout: Optional[float] = None) -> bytes:
+    """Reads the bytes [start, stop) of a remote file with a range request.
+
+    Raises:
+        OSError: If the request fails or the server does not honor the range.
+    """
+    request = urllib.request.Request(url, headers={'Range': f'bytes={start}-{stop - 1}'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            matched = ptrn_content_range.match(response.headers.get('Content-Range', ''))
+            if response.status != 206 or not matched or int(matched.group(1)) != start:
+                raise OSError(f"The server of '{url}' does not support range requests.")
+            return response.read()
+    except urllib.error.HTTPError as e:
+        raise OSError(f"Failed to read '{url}': {e}") from e
+    except urllib.error.URLError as e:
+        raise OSError(f"Failed to read '{url}': {e.reason}") from e
+
+
+def get_remote_size(url: str, timeout: Optional[float] = None) -> int:
+    """Returns the size of a remote file, from the `Content-Range` of a one byte range request.
+
+    Args:
+        url (str): The URL of the file.
+        timeout (float, optional): The timeout of the request in seconds.
+
+    Returns:
+        int: The size of the file in bytes.
+
+    Raises:
+        OSError: If the request fails or the server does not support range requests.
+    """
+    request = urllib.request.Request(url, headers={'Range': 'bytes=0-0'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            matched = ptrn_content_range.match(response.headers.get('Content-Range', ''))
+            if response.status != 206 or not matched or matched.group(3) == '*':
+                raise OSError(f"The server of '{url}' does not support range requests.")
+            return int(matched.group(3))
+    except urllib.error.HTTPError as e:
+        if e.code == 416:
+            # an empty file has no satisfiable range
+            return 0
+        raise OSError(f"Failed to read '{url}': {e}") from e
+    except urllib.error.URLError as e:
+        raise OSError(f"Failed to read '{url}': {e.reason}") from e
+
+
+class HttpFile(io.RawIOBase):
+    """A read-only, seekable file object over a byte range of a remote file, read with HTTP range requests.
+
+    Reads are served from a read-ahead buffer of `block_size` bytes, so small sequential reads (e.g. while
+    parsing a parameter file or the central directory of a zip archive) do not issue one request each.
+    Reads larger than the block are requested at once, and are not buffered.
+
+    Args:
+        url (str): The URL of the file.
+        offset (int): The position of the first byte of the range within the file.
+        size (int, optional): The size of the range in bytes. Defaults to the rest of the file.
+        name (str, optional): The name of the member represented by the range.
+        timeout (float, optional): The timeout of each request in seconds.
+
+    Attributes:
+        name (str): The name of the member represented by the range.
+        offset (int): The position of the first byte of the range within the remote file.
+        size (int): The size of the range in bytes.
+    """
+    block_size = 256 * 1024
+
+    def __init__(self, url: str, offset: int = 0, size: Optional[int] = None, name: Optional[str] = None,
+                 timeout: Optional[float] = None):
+        self.url = url
+        self.name = name or url
+        self.offset = offset
+        self.size = get_remote_size(url, timeout) - offset if size is None else size
+        self._timeout = timeout
+        self._pos = 0
+        self._block = b''
+        self._block_start = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def readall(self):
+        return self.read()
+
+    def read(self, size: int = -1):
+        if size is None or size < 0:
+            size = max(self.size - self._pos, 0)
+        size = min(size, max(self.size - self._pos, 0))
+        if not size:
+            return b''
+        start = self._pos - self._block_start
+        if 0 <= start and self._pos + size <= self._block_start + len(self._block):
+            data = self._block[start:start + size]
+        elif size > self.block_size:
+            # large reads are returned without replacing the read-ahead buffer, so it never holds more than a block
+            data = _request_range(self.url, self.offset + self._pos, self.offset + self._pos + size, self._timeout)
+        else:
+            stop = min(self._pos + self.block_size, self.size)
+            block = _request_range(self.url, self.offset + self._pos, self.offset + stop, self._timeout)
+            self._block, self._block_start = block, self._pos
+            data = block[:size]
+        self._pos += len(data)
+        return data
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = pos
+        elif whence == io.SEEK_CUR:
+            self._pos += pos
+        elif whence == io.SEEK_END:
+            self._pos = self.size + pos
+        else:
+            raise ValueError(f"Invalid whence ({whence})")
+        if self._pos < 0:
+            raise ValueError("Negative seek position")
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        self._block = b''
+        super().close()
+
+
+class HttpZipStorage(ZipHandlePool):
+    """The storage backend of zip archives served over HTTP.
+
+    The ZipFile handle reads the remote archive through an `HttpFile`, so the central directory is fetched with
+    range requests when the study is opened, and compressed members are decompressed from range requests.
+    Uncompressed, unencrypted members are opened as an `HttpFile` window onto their data in the archive.
+
+    Args:
+        url (str): The URL of the zip archive.
+        infolist (list, optional): The member table of the archive, if already known.
+        timeout (float, optional): The timeout of each request in seconds.
+    """
+    def __init__(self, url: str, infolist: Optional[List[ZipInfo]] = None, timeout: Optional[float] = None):
+        super().__init__(url, infolist)
+        self._timeout = timeout
+
+    def _open_handle(self):
+        return zipfile.ZipFile(HttpFile(self.path, timeout=self._timeout))
+
+    def open(self, index: int, offset: int = 0, size: Optional[int] = None):
+        info = self.getinfo(index)
+        if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+            if (data_offset := self._data_offsets.get(index)) is None:
+                # a window ending with the local file header, so only the header is requested
+                header_end = info.header_offset + ZipStoredMember._local_header.size
+                with HttpFile(self.path, 0, header_end, timeout=self._timeout) as archive:
+                    data_offset = self._data_offsets[index] = ZipStoredMember.get_data_offset(archive, info)
+            # the range is requested directly, without reading ahead of it
+            offset = min(offset, info.file_size)
+            size = info.file_size - offset if size is None else min(size, info.file_size - offset)
+            return HttpFile(self.path, data_offset + offset, size, info.filename, timeout=self._timeout)
+        return self._get_range(self.zipfile.open(info), info.file_size, offset, size)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(url='{self.path}', closed={self.closed})"
@@ -0,0 +1,483 @@
+"""Provides the storage backends through which pvobj objects list, stat and read the files of a PvDataset.
+
+A storage backend hides where the files of a dataset live: a directory on a local file system, a local zip or
+tar archive (see `pool`), or a zip archive served over HTTP (see `remote`). All pvobj objects of a study share
+the backend of the study, and only use three operations:
+
+    - `list` builds the contents tree of the dataset (the directories, files, member references and sizes).
+    - `stat` returns a signature identifying the content of a file, and its size.
+    - `open` opens a file, or a byte range of it, as a read-only, seekable file object.
+
+Content fingerprints (see `BaseMethods.fingerprint`) also use `mtime` and `crc32`, which return the modification
+time and checksum of a file in the same form for every backend.
+
+Files are addressed by the member reference stored in the contents tree: the position of the member in the
+member table for archives (`file_indexes`), or the path relative to the dataset root for directories.
+
+Classes:
+    BaseStorage: The interface of the storage backends.
+    DirStorage: The backend of uncompressed datasets in a local directory.
+    FileWindow: A read-only, seekable file object over a contiguous byte range of a file.
+    FileSizes: A lazily evaluated list of file sizes for directory listings.
+    RangeView: A read-only, seekable file object over a byte range of another file object.
+
+Functions:
+    is_url: True if a dataset path is the URL of a remote dataset.
+    scan_dir: Lists a directory tree into a contents dictionary.
+    build_archive_contents: Builds the contents dictionary of an archive from its file members.
+    get_storage: Creates the storage backend matching a dataset path.
+    to_zip_time: Converts a timestamp to the date_time tuple of a zip member.
+"""
+
+from __future__ import annotations
+import io
+import os
+import posixpath
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from collections.abc import Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from typing import Optional, List, Tuple, Any, Union, Iterable
+
+
+def is_url(path: Any) -> bool:
+    """True if a dataset path is the URL of a remote dataset (http:// or https://).
+
+    Args:
+        path: The dataset path.
+
+    Returns:
+        bool: True for URLs.
+    """
+    return isinstance(path, str) and path.lower().startswith(('http://', 'https://'))
+
+
+def to_zip_time(timestamp: float) -> Tuple[int, ...]:
+    """Converts a timestamp to the date_time tuple of a zip member: the local time, with even seconds.
+
+    Args:
+        timestamp (float): The time in seconds since the epoch.
+
+    Returns:
+        tuple: The year, month, day, hour, minute and second.
+    """
+    year, month, day, hour, minute, second = time.localtime(timestamp)[:6]
+    return year, month, day, hour, minute, second - second % 2
+
+
+class FileSizes(Sequence):
+    """A list of file sizes that is only evaluated on first access.
+
+    The sizes are read from the cached stat results of `os.DirEntry` objects, so directory listings do not pay
+    for a stat call per file unless the sizes are actually needed.
+
+    Args:
+        entries (List[os.DirEntry]): The directory entries of the files.
+    """
+    def __init__(self, entries: List[os.DirEntry]):
+        self._entries = entries
+        self._sizes: Optional[List[int]] = None
+
+    @property
+    def sizes(self) -> List[int]:
+        if self._sizes is None:
+            self._sizes = [e.stat().st_size for e in self._entries]
+            self._entries = None
+        return self._sizes
+
+    def __getitem__(self, index):
+        return self.sizes[index]
+
+    def __len__(self):
+        return len(self._entries) if self._sizes is None else len(self._sizes)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(self.sizes)
+
+
+def scan_dir(path: Path, recursive: bool = True, prefix: Optional[str] = None):
+    """Lists a directory tree into a contents dictionary.
+
+    The directory tree is listed with `os.scandir`, so no additional stat call is made per file.
+    File sizes are only looked up when the 'file_sizes' entry is first accessed.
+
+    Args:
+        path: The path to the directory.
+        recursive: If False, only the given directory itself is listed.
+        prefix: The relative path of the given directory within the dataset, prepended to the keys.
+
+    Returns:
+        dict: A dictionary representing the directory structure.
+            The keys are the relative paths of the directories, and the values are dictionaries with the following keys:
+            - 'dirs': A list of directory names.
+            - 'files': A list of file names.
+            - 'file_indexes': An empty list.
+            - 'file_sizes': A lazily evaluated list of file sizes.
+    """
+    contents = OrderedDict()
+    stack = [(os.path.normpath(Path(path).absolute()), prefix or '.')]
+    while stack:
+        dirpath, relative_path = stack.pop()
+        dirnames, filenames, file_entries, subdirs = [], [], [], []
+        with os.scandir(dirpath) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    dirnames.append(entry.name)
+                    if recursive and not entry.is_symlink():
+                        subdirs.append((entry.path, os.path.normpath(os.path.join(relative_path, entry.name))))
+                else:
+                    filenames.append(entry.name)
+                    file_entries.append(entry)
+        contents[relative_path] = {'dirs': dirnames, 'files': filenames,
+                                   'file_indexes': [], 'file_sizes': FileSizes(file_entries)}
+        stack.extend(reversed(subdirs))
+    return contents
+
+
+def build_archive_contents(members: Iterable[Tuple[int, str, str, int]]):
+    """Builds the contents dictionary of an archive from its file members.
+
+    Args:
+        members: An iterable of (index, directory path, filename, size) tuples.
+
+    Returns:
+        dict: The directory structure. The keys are the directory paths, and the values are dictionaries with
+            the following keys:
+            - 'dirs': A set of directory names.
+            - 'files': A list of file names.
+            - 'file_indexes': A list of file indexes.
+            - 'file_sizes': A list of file sizes.
+    """
+    contents = defaultdict(lambda: {'dirs': set(), 'files': [], 'file_indexes': [], 'file_sizes': []})
+    for i, dirpath, filename, file_size in members:
+        contents[dirpath]['files'].append(filename)
+        contents[dirpath]['file_indexes'].append(i)
+        contents[dirpath]['file_sizes'].append(file_size)
+        while dirpath:
+            dirpath, dirname = os.path.split(dirpath)
+            if dirname:
+                contents[dirpath]['dirs'].add(dirname)
+    return contents
+
+
+class BaseStorage:
+    """The interface of the storage backends of PvDatasets.
+
+    Backends are thread-safe, but the file objects returned by `open` must not be shared between threads.
+
+    Attributes:
+        kind (str): The storage format, e.g. 'dir', 'zip' or 'tar'.
+        path (Union[Path, str]): The path to the dataset, or its URL.
+    """
+    kind: str = None
+
+    def __init__(self, path: Union[Path, str]):
+        self.path = path
+
+    def list(self, dirpath: Optional[str] = None, recursive: bool = True) -> dict:
+        """Builds the contents tree of the dataset. Implemented by subclasses.
+
+        Args:
+            dirpath (str, optional): The relative path of a directory to list instead of the whole dataset.
+                Only supported by backends that can list a directory on its own.
+            recursive (bool): If False, only the listed directory itself is included.
+
+        Returns:
+            dict: The contents dictionary, keyed by directory paths relative to the dataset root.
+        """
+        raise NotImplementedError
+
+    def stat(self, member: Union[int, str]) -> Tuple[Tuple[Any, ...], int]:
+        """Returns a signature identifying the content of a file, and its size. Implemented by subclasses.
+
+        Args:
+            member (int or str): The member reference of the file.
+
+        Returns:
+            tuple: The signature and the size of the file in bytes.
+        """
+        raise NotImplementedError
+
+    def mtime(self, member: Union[int, str]) -> Tuple[int, ...]:
+        """Returns the modification time of a file at the resolution of zip archives. Implemented by subclasses.
+
+        Args:
+            member (int or str): The member reference of the file.
+
+        Returns:
+            tuple: The date_time tuple of the file, see `to_zip_time`.
+        """
+        raise NotImplementedError
+
+    def crc32(self, member: Union[int, str]) -> int:
+        """Returns the CRC-32 of a file, computed by reading the file unless the backend records it.
+
+        Args:
+            member (int or str): The member reference of the file.
+
+        Returns:
+            int: The checksum, as `zlib.crc32` gives.
+        """
+        crc = 0
+        with self.open(member) as f:
+            while chunk := f.read(1024 * 1024):
+                crc = zlib.crc32(chunk, crc)
+        return crc
+
+    def open(self, member: Union[int, str], offset: int = 0, size: Optional[int] = None):
+        """Opens a file, or a byte range of it. Implemented by subclasses.
+
+        Args:
+            member (int or str): The member reference of the file.
+            offset (int): The position of the first byte of the range.
+            size (int, optional): The size of the range. Defaults to the rest of the file.
+
+        Returns:
+            A read-only, seekable file object over the range, positioned at its start.
+        """
+        raise NotImplementedError
+
+    def read(self, member: Union[int, str], offset: int = 0, size: Optional[int] = None) -> bytes:
+        """Reads a file, or a byte range of it.
+
+        Args:
+            member (int or str): The member reference of the file.
+            offset (int): The position of the first byte to read.
+            size (int, optional): The number of bytes to read. Defaults to the rest of the file.
+
+        Returns:
+            bytes: The data.
+        """
+        with self.open(member, offset, size) as f:
+            return f.read()
+
+    @staticmethod
+    def _get_range(fileobj, file_size: int, offset: int = 0, size: Optional[int] = None):
+        """Restricts an open file object to a byte range, if a range is requested.
+
+        A `FileWindow` is narrowed in place, so the range can still be memory-mapped. Other file objects are
+        wrapped in a `RangeView`.
+        """
+        if not offset and (size is None or size >= file_size):
+            return fileobj
+        size = max(file_size - offset, 0) if size is None else min(size, max(file_size - offset, 0))
+        if isinstance(fileobj, FileWindow):
+            fileobj.offset += offset
+            fileobj.size = size
+            return fileobj
+        return RangeView(fileobj, offset, size)
+
+    @property
+    def closed(self) -> bool:
+        """True if the backend currently holds no open handle."""
+        return True
+
+    def close(self):
+        """Closes the handles held by the backend. File objects opened before remain readable."""
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(path='{self.path}')"
+
+
+class DirStorage(BaseStorage):
+    """The storage backend of uncompressed datasets in a local directory.
+
+    Members are referenced by their path relative to the dataset root. Byte ranges are opened as a
+    `FileWindow`, which can be memory-mapped as the file itself.
+    """
+    kind = 'dir'
+
+    def list(self, dirpath: Optional[str] = None, recursive: bool = True):
+        path = Path(self.path, dirpath) if dirpath else Path(self.path)
+        return scan_dir(path, recursive=recursive, prefix=dirpath)
+
+    def stat(self, member: str):
+        stat = os.stat(os.path.join(self.path, member))
+        return (stat.st_mtime_ns, stat.st_size), stat.st_size
+
+    def mtime(self, member: str):
+        return to_zip_time(os.stat(os.path.join(self.path, member)).st_mtime)
+
+    def open(self, member: str, offset: int = 0, size: Optional[int] = None):
+        path = os.path.join(self.path, member)
+        if not offset and size is None:
+            return open(path, 'rb')
+        file_size = os.path.getsize(path)
+        return self._get_range(FileWindow(path, 0, file_size, posixpath.basename(member)), file_size, offset, size)
+
+
+class FileWindow(io.RawIOBase):
+    """A read-only file object over a contiguous byte range of a file.
+
+    The range is read through a dedicated handle, so seeking is free and the data can be memory-mapped with
+    `np.memmap(window, offset=window.offset, ...)`.
+
+    Args:
+        path (Path): The path to the file.
+        offset (int): The position of the first byte of the range within the file.
+        size (int): The size of the range in bytes.
+        name (str): The name of the member represented by the range.
+
+    Attributes:
+        name (str): The name of the member within the archive.
+        offset (int): The position of the first byte of the member data within the archive file.
+        size (int): The size of the member in bytes.
+    """
+    def __init__(self, path: 'Path', offset: int, size: int, name: str):
+        self._fp = open(path, 'rb')
+        self.name = name
+        self.size = size
+        self.offset = offset
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def fileno(self):
+        """Returns the descriptor of the archive file. Positions in the archive are shifted by `offset`."""
+        return self._fp.fileno()
+
+    def readinto(self, b):
+        size = min(len(b), self.size - self._pos)
+        if size <= 0:
+            return 0
+        self._fp.seek(self.offset + self._pos)
+        size = self._fp.readinto(memoryview(b)[:size])
+        self._pos += size
+        return size
+
+    def readall(self):
+        return self.read(max(self.size - self._pos, 0))
+
+    def read(self, size: int = -1):
+        if size is None or size < 0:
+            size = max(self.size - self._pos, 0)
+        size = min(size, max(self.size - self._pos, 0))
+        self._fp.seek(self.offset + self._pos)
+        data = self._fp.read(size)
+        self._pos += len(data)
+        return data
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = pos
+        elif whence == io.SEEK_CUR:
+            self._pos += pos
+        elif whence == io.SEEK_END:
+            self._pos = self.size + pos
+        else:
+            raise ValueError(f"Invalid whence ({whence})")
+        if self._pos < 0:
+            raise ValueError("Negative seek position")
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._fp.close()
+        super().close()
+
+
+class RangeView(io.RawIOBase):
+    """A read-only, seekable file object over a byte range of another seekable file object.
+
+    Args:
+        fileobj: The file object. It is owned by the view and closed with it.
+        offset (int): The position of the first byte of the range within the file object.
+        size (int): The size of the range in bytes.
+
+    Attributes:
+        name (str): The name of the underlying file object.
+        size (int): The size of the range in bytes.
+    """
+    def __init__(self, fileobj, offset: int, size: int):
+        self._fileobj = fileobj
+        self.name = getattr(fileobj, 'name', None)
+        self.size = size
+        self._offset = offset
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def readall(self):
+        return self.read()
+
+    def read(self, size: int = -1):
+        if size is None or size < 0:
+            size = max(self.size - self._pos, 0)
+        size = min(size, max(self.size - self._pos, 0))
+        if not size:
+            return b''
+        self._fileobj.seek(self._offset + self._pos)
+        data = self._fileobj.read(size)
+        self._pos += len(data)
+        return data
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = pos
+        elif whence == io.SEEK_CUR:
+            self._pos += pos
+        elif whence == io.SEEK_END:
+            self._pos = self.size + pos
+        else:
+            raise ValueError(f"Invalid whence ({whence})")
+        if self._pos < 0:
+            raise ValueError("Negative seek position")
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._fileobj.close()
+        super().close()
+
+
+def get_storage(path: Union[Path, str], kind: Optional[str] = None,
+                infolist: Optional[List[Any]] = None) -> BaseStorage:
+    """Creates the storage backend matching a dataset path.
+
+    Args:
+        path (Path or str): The path to the dataset directory or archive, or the URL of a remote zip archive.
+        kind (str, optional): The archive format ('zip' or 'tar'), detected from the file if not given.
+        infolist (list, optional): The member table of the archive, if already known.
+
+    Returns:
+        BaseStorage: The storage backend.
+
+    Raises:
+        ValueError: If the path is neither a directory, a supported archive nor a URL.
+    """
+    if is_url(path):
+        from .remote import HttpZipStorage
+        return HttpZipStorage(path, infolist)
+    if kind is None and os.path.isdir(path):
+        return DirStorage(path)
+    from .pool import get_pool
+    return get_pool(path, kind, infolist)
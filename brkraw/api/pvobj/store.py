@@ -0,0 +1,297 @@
+"""Provides a persistent on-disk store of decoded parameter files, shared across processes.
+
+The `ParameterCache` only lives as long as a process, while the same archived studies are opened again and
+again by batch conversions, QC reports and viewers. The `ParameterStore` keeps the decoded contents of
+parameter files (the header and the parameters, with numpy arrays preserved) in a SQLite database under a
+cache root, keyed by the same dataset, scan, reconstruction, filename and source signature as the in-memory
+cache. Any change to a source file changes its signature, so stale entries are never returned. Storing a file
+decodes all its values once, and loading it back neither tokenizes nor decodes any text.
+
+The store is disabled unless a root is configured, with `parameter_store.configure(root=...)` or the
+`BRKRAW_STORE_DIR` environment variable. Its size is bounded by `BRKRAW_STORE_MAX_BYTES` (1 GiB by default),
+and the least recently used entries are evicted first (access times are refreshed at most once a minute).
+Writers of several processes and threads may share a root: SQLite serializes the transactions, and failures to
+read or write the store are ignored.
+
+Entries are JSON documents: strings and numbers are stored as such, and the types JSON lacks are tagged, with
+numpy arrays stored as their dtype, shape and raw bytes. Unlike pickle, loading an entry never executes code,
+so the store may be shared with other users.
+
+Classes:
+    ParameterStore: Loads, stores and evicts decoded parameter files in a SQLite database.
+
+Attributes:
+    parameter_store (ParameterStore): The store instance used by all pvobj objects.
+"""
+
+from __future__ import annotations
+import os
+import time
+import json
+import base64
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from pathlib import Path
+from collections import OrderedDict
+from .parameters import Parameter
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from typing import Any, Optional
+    from .cache import CacheKey
+
+
+class ParameterStore:
+    """Manages the persistent store of decoded parameter files.
+
+    Args:
+        root (Path, optional): The store directory. Defaults to the `BRKRAW_STORE_DIR` environment variable.
+        max_bytes (int, optional): The maximum total size of the stored entries, in bytes. Defaults to the
+            `BRKRAW_STORE_MAX_BYTES` environment variable, or 1 GiB.
+
+    Attributes:
+        hits (int): The number of lookups answered from the store by this process.
+        misses (int): The number of lookups that found no valid entry.
+    """
+    version = 3
+    filename = 'parameters.sqlite'
+    timeout = 30.0
+    atime_resolution = 60.0
+
+    def __init__(self, root: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self._root = Path(root) if root else None
+        self._max_bytes = max_bytes
+        self._local = threading.local()
+        self.reset_stats()
+
+    @property
+    def root(self) -> Optional[Path]:
+        """The store directory, or None if no directory is configured."""
+        if self._root:
+            return self._root
+        if env := os.environ.get('BRKRAW_STORE_DIR'):
+            return Path(env).expanduser()
+        return None
+
+    @property
+    def max_bytes(self) -> int:
+        """The maximum total size of the stored entries, in bytes."""
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return int(os.environ.get('BRKRAW_STORE_MAX_BYTES', 1024 ** 3))
+
+    @property
+    def enabled(self) -> bool:
+        """True if a store directory is configured and the budget allows any entry."""
+        return self.root is not None and self.max_bytes > 0
+
+    def configure(self, root: Optional[Path] = None, max_bytes: Optional[int] = None):
+        """Sets the store directory and budget. Arguments left to None fall back to the environment.
+
+        Args:
+            root (Path, optional): The store directory.
+            max_bytes (int, optional): The maximum total size of the stored entries, in bytes.
+        """
+        self._root = Path(root) if root else None
+        self._max_bytes = max_bytes
+        if self.enabled:
+            try:
+                with (connection := self._connect()):
+                    connection.execute('BEGIN IMMEDIATE')
+                    self._evict(connection)
+            except (sqlite3.Error, OSError):
+                pass
+
+    def get(self, key: CacheKey) -> Optional[Parameter]:
+        """Loads a decoded parameter file, if stored.
+
+        Args:
+            key (tuple): The cache key, (dataset, scan_id, reco_id, filename, signature).
+
+        Returns:
+            Parameter or None: A new parameter object with all values decoded, or None if no valid entry exists.
+        """
+        if not self.enabled:
+            return None
+        digest = self._get_digest(key)
+        try:
+            connection = self._connect()
+            if row := connection.execute('SELECT value, atime FROM parameters WHERE key = ?', (digest,)).fetchone():
+                entry = json.loads(row[0])
+                par = Parameter.from_decoded(_decode_items(entry['header']), _decode_items(entry['parameters']),
+                                             name=entry['name'], scan_id=entry['scan_id'],
+                                             reco_id=entry['reco_id'])
+                if (now := time.time()) - row[1] > self.atime_resolution:
+                    with connection:
+                        connection.execute('UPDATE parameters SET atime = ? WHERE key = ?', (now, digest))
+        except (sqlite3.Error, OSError, ValueError, TypeError, KeyError):
+            row = None
+        if not row:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return par
+
+    def put(self, key: CacheKey, value: Parameter):
+        """Stores a parameter object, decoding all its values, and evicts the least recently used entries.
+
+        Files holding a value of a type the store cannot encode are not stored.
+
+        Args:
+            key (tuple): The cache key, (dataset, scan_id, reco_id, filename, signature).
+            value (Parameter): The parameter object.
+        """
+        if not self.enabled:
+            return
+        try:
+            payload = json.dumps({'header': _encode_items(value.header),
+                                  'parameters': _encode_items(value.parameters),
+                                  'name': value._name, 'scan_id': key[1], 'reco_id': key[2]},
+                                 separators=(',', ':')).encode('UTF-8')
+        except (TypeError, ValueError):
+            return
+        if len(payload) > self.max_bytes:
+            return
+        try:
+            connection = self._connect()
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.execute('INSERT OR REPLACE INTO parameters VALUES (?, ?, ?, ?)',
+                                   (self._get_digest(key), payload, len(payload), time.time()))
+                self._evict(connection)
+        except (sqlite3.Error, OSError):
+            pass
+
+    def clear(self) -> int:
+        """Removes all entries.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        if not self.enabled or not (self.root / self.filename).exists():
+            return 0
+        try:
+            with self._connect() as connection:
+                return connection.execute('DELETE FROM parameters').rowcount
+        except (sqlite3.Error, OSError):
+            return 0
+
+    def reset_stats(self):
+        """Resets the hit and miss counters."""
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def nbytes(self) -> int:
+        """The total size of the stored entries, in bytes, or 0 if the store cannot be read."""
+        return self._query('SELECT COALESCE(SUM(nbytes), 0) FROM parameters')
+
+    def __len__(self):
+        return self._query('SELECT COUNT(*) FROM parameters')
+
+    def _query(self, sql: str) -> int:
+        """Runs an aggregate query, returning 0 if the store is disabled, missing or cannot be read."""
+        if not self.enabled or not (self.root / self.filename).exists():
+            return 0
+        try:
+            return self._connect().execute(sql).fetchone()[0]
+        except (sqlite3.Error, OSError):
+            return 0
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(root='{self.root}', enabled={self.enabled})"
+
+    def _get_digest(self, key: CacheKey) -> str:
+        return hashlib.sha1(repr((self.version, key)).encode('UTF-8')).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Returns the connection of the current thread, opened again after a fork or a change of root."""
+        owner = (os.getpid(), str(self.root))
+        if getattr(self._local, 'owner', None) != owner:
+            self.root.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.root / self.filename, timeout=self.timeout, isolation_level=None)
+            try:
+                connection.execute('PRAGMA journal_mode=WAL')
+            except sqlite3.Error:
+                pass
+            connection.execute('CREATE TABLE IF NOT EXISTS parameters '
+                               '(key TEXT PRIMARY KEY, value BLOB NOT NULL, nbytes INTEGER NOT NULL, '
+                               'atime REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS parameters_atime ON parameters (atime)')
+            self._local.owner, self._local.connection = owner, connection
+        return self._local.connection
+
+    def _evict(self, connection: sqlite3.Connection):
+        """Deletes the least recently used entries until the store fits its budget."""
+        nbytes = connection.execute('SELECT COALESCE(SUM(nbytes), 0) FROM parameters').fetchone()[0]
+        excess = nbytes - self.max_bytes
+        if excess <= 0:
+            return
+        evicted = []
+        for digest, nbytes in connection.execute('SELECT key, nbytes FROM parameters ORDER BY atime'):
+            evicted.append((digest,))
+            if (excess := excess - nbytes) <= 0:
+                break
+        connection.executemany('DELETE FROM parameters WHERE key = ?', evicted)
+
+
+def _encode_items(items: OrderedDict) -> list:
+    """Encodes the decoded values of headers or parameters as a list of [key, value] pairs, in order."""
+    return [[key, _encode_value(value)] for key, value in items.items()]
+
+
+def _decode_items(items: list) -> OrderedDict:
+    """Decodes the [key, value] pairs written by `_encode_items`."""
+    return OrderedDict((key, _decode_value(value)) for key, value in items)
+
+
+def _encode_value(value: Any) -> Any:
+    """Converts a decoded value to JSON objects, tagging the types JSON does not have as single-key objects.
+
+    Raises:
+        TypeError: If the value holds an object of another type.
+    """
+    if value is None or type(value) in (str, int, float, bool):
+        return value
+    if isinstance(value, list):
+        return [_encode_value(item) for item in value]
+    if isinstance(value, tuple):
+        return {'tuple': [_encode_value(item) for item in value]}
+    if isinstance(value, dict):
+        return {'dict': [[_encode_value(k), _encode_value(v)] for k, v in value.items()]}
+    if isinstance(value, np.ndarray) and value.dtype.hasobject:
+        return {'objects': [list(value.shape), [_encode_value(item) for item in value.ravel().tolist()]]}
+    if isinstance(value, (np.ndarray, np.generic)):
+        data = base64.b64encode(np.ascontiguousarray(value).tobytes()).decode('ascii')
+        return {'ndarray': [value.dtype.str, list(value.shape), data, isinstance(value, np.generic)]}
+    raise TypeError(f"Cannot store a value of type '{type(value).__name__}'")
+
+
+def _decode_value(value: Any) -> Any:
+    """Converts the JSON objects written by `_encode_value` back to the decoded value.
+
+    Raises:
+        ValueError: If an object has an unknown tag or an array has an object dtype.
+    """
+    if isinstance(value, list):
+        return [_decode_value(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    (tag, body), = value.items()
+    if tag == 'tuple':
+        return tuple(_decode_value(item) for item in body)
+    if tag == 'dict':
+        return {_decode_value(k): _decode_value(v) for k, v in body}
+    if tag == 'objects':
+        array = np.empty(len(body[1]), dtype=object)
+        for i, item in enumerate(body[1]):
+            array[i] = _decode_value(item)
+        return array.reshape(body[0])
+    if tag == 'ndarray' and not (dtype := np.dtype(body[0])).hasobject:
+        array = np.frombuffer(bytearray(base64.b64decode(body[2])), dtype=dtype).reshape(body[1])
+        return array[()] if body[3] else array
+    raise ValueError(f"Invalid stored value tagged '{tag}'")
+
+
+parameter_store = ParameterStore()
@@ -7,9 +7,11 @@ from .pvstudy import PvStudy
 from .pvreco import PvReco
 from .pvfiles import PvFiles
 from .parameters import Parameter
+from .pool import FileWindow
+from .remote import HttpFile
 
 
-PvFileBuffer = Type[Union[BufferedReader, ZipExtFile]]
+PvFileBuffer = Type[Union[BufferedReader, ZipExtFile, FileWindow, HttpFile]]
 
 PvStudyType = Type[PvStudy]
 
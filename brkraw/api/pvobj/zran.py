@@ -0,0 +1,427 @@
+"""Provides random access into deflated zip members through a checkpoint index, after zlib's zran example.
+
+Seeking in a `ZipExtFile` decompresses the member from its start, so reading the last frames of a large
+deflated 2dseq or fid costs a full decompression. A `DeflateIndex` records checkpoints of the deflate stream
+every `span` bytes of output: the position in the compressed data (down to the bit) of a deflate block
+boundary, and the 32 KiB of output preceding it, which is all the state inflate needs to resume there. A
+`ZipDeflatedMember` then serves any read by inflating from the nearest checkpoint before the target.
+
+The index of a member is built by one full decompression on its first random access, and persisted with the
+contents index when it is enabled (see `ContentsIndex`), keyed by the path, size and modification time of the
+archive and by the name and CRC of the member. Block boundaries and bit-level restarts are not exposed by
+Python's `zlib` module, so the index drives the system zlib library through `ctypes`. As the bindings rely on
+the ABI of that library, the index is opt-in: set the `BRKRAW_ZRAN` environment variable to enable it. The
+library is checked by inflating a known stream when it is loaded, and deflated members are opened as
+`ZipExtFile` as before if the index is disabled, or the library cannot be loaded or fails the check.
+
+Classes:
+    DeflateIndex: The checkpoints of a raw deflate stream, with their persistence.
+    ZipDeflatedMember: A read-only, seekable file object over a deflated zip member.
+
+Functions:
+    is_enabled: True if the checkpoint index is enabled by the `BRKRAW_ZRAN` environment variable.
+    is_available: True if the checkpoint index is enabled and the zlib library can be driven through ctypes.
+"""
+
+from __future__ import annotations
+import io
+import os
+import zlib
+import bisect
+import struct
+import hashlib
+import tempfile
+import zipfile
+import threading
+import ctypes
+import ctypes.util
+from pathlib import Path
+from collections import OrderedDict
+from .index import contents_index
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from typing import List, Optional, Tuple
+    from zipfile import ZipInfo
+    from .pool import FileWindow
+
+WINSIZE = 32768
+CHUNK = 65536
+Z_OK, Z_STREAM_END, Z_BUF_ERROR = 0, 1, -5
+Z_NO_FLUSH, Z_BLOCK = 0, 5
+
+
+class ZStream(ctypes.Structure):
+    """The z_stream structure of zlib."""
+    _fields_ = [('next_in', ctypes.c_void_p), ('avail_in', ctypes.c_uint), ('total_in', ctypes.c_ulong),
+                ('next_out', ctypes.c_void_p), ('avail_out', ctypes.c_uint), ('total_out', ctypes.c_ulong),
+                ('msg', ctypes.c_char_p), ('state', ctypes.c_void_p),
+                ('zalloc', ctypes.c_void_p), ('zfree', ctypes.c_void_p), ('opaque', ctypes.c_void_p),
+                ('data_type', ctypes.c_int), ('adler', ctypes.c_ulong), ('reserved', ctypes.c_ulong)]
+
+
+_libz = None
+_libz_lock = threading.RLock()
+
+
+def _load_libz():
+    global _libz
+    with _libz_lock:
+        if _libz is None:
+            _libz = False
+            for name in (ctypes.util.find_library('z'), ctypes.util.find_library('zlib1'), 'libz.so.1'):
+                try:
+                    _libz = libz = ctypes.CDLL(name)
+                    libz.zlibVersion.restype = ctypes.c_char_p
+                    libz.inflateInit2_.argtypes = [ctypes.POINTER(ZStream), ctypes.c_int, ctypes.c_char_p,
+                                                   ctypes.c_int]
+                    libz.inflate.argtypes = [ctypes.POINTER(ZStream), ctypes.c_int]
+                    libz.inflateEnd.argtypes = [ctypes.POINTER(ZStream)]
+                    libz.inflatePrime.argtypes = [ctypes.POINTER(ZStream), ctypes.c_int, ctypes.c_int]
+                    libz.inflateSetDictionary.argtypes = [ctypes.POINTER(ZStream), ctypes.c_char_p,
+                                                          ctypes.c_uint]
+                    if _check_libz():
+                        break
+                except (OSError, AttributeError, TypeError):
+                    pass
+                _libz = False
+    return _libz or None
+
+
+def _check_libz() -> bool:
+    """Inflates a known stream through the bindings, to reject a library whose ABI does not match them."""
+    data = bytes(range(256)) * 256
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    buffer = ctypes.create_string_buffer(len(data))
+    try:
+        inflater = Inflater()
+        try:
+            inflater.feed(compressed)
+            ret, written = inflater.inflate(buffer, 0, len(data))
+        finally:
+            inflater.close()
+        return ret == Z_STREAM_END and buffer.raw == data and \
+            DeflateIndex.build(io.BytesIO(compressed), len(data)).size == len(data)
+    except (zlib.error, MemoryError, ValueError, TypeError, OSError):
+        return False
+
+
+def is_enabled() -> bool:
+    """True if the checkpoint index is enabled by the `BRKRAW_ZRAN` environment variable."""
+    return os.environ.get('BRKRAW_ZRAN', '').lower() not in ('', '0', 'false', 'no', 'off')
+
+
+def is_available() -> bool:
+    """True if the checkpoint index is enabled and the zlib library can be driven through ctypes."""
+    return is_enabled() and _load_libz() is not None
+
+
+class Inflater:
+    """A raw inflate stream of the zlib library, resumable at a bit position with a preset window."""
+    def __init__(self, bits: int = 0, value: int = 0, window: Optional[bytes] = None):
+        self._libz = _load_libz()
+        self.stream = ZStream()
+        version = self._libz.zlibVersion()
+        if self._libz.inflateInit2_(ctypes.byref(self.stream), -15, version, ctypes.sizeof(ZStream)) != Z_OK:
+            raise MemoryError('Failed to initialize the inflate stream.')
+        self._input = None
+        if bits:
+            self._libz.inflatePrime(ctypes.byref(self.stream), bits, value >> (8 - bits))
+        if window:
+            self._libz.inflateSetDictionary(ctypes.byref(self.stream), window, len(window))
+
+    def feed(self, data: bytes):
+        """Sets the next input of the stream. The data must stay referenced until it is consumed."""
+        self._input = ctypes.create_string_buffer(data, len(data))
+        self.stream.next_in = ctypes.addressof(self._input)
+        self.stream.avail_in = len(data)
+
+    def inflate(self, buffer, offset: int, size: int, flush: int = Z_NO_FLUSH) -> Tuple[int, int]:
+        """Inflates into buffer[offset:offset + size].
+
+        Returns:
+            tuple: The zlib return code and the number of bytes written.
+        """
+        self.stream.next_out = ctypes.addressof(buffer) + offset
+        self.stream.avail_out = size
+        ret = self._libz.inflate(ctypes.byref(self.stream), flush)
+        if ret not in (Z_OK, Z_STREAM_END, Z_BUF_ERROR):  # Z_BUF_ERROR only means no progress was possible
+            message = self.stream.msg.decode() if self.stream.msg else ret
+            raise zlib.error(f'Error {message} while decompressing data')
+        return ret, size - self.stream.avail_out
+
+    def close(self):
+        if self._libz:
+            self._libz.inflateEnd(ctypes.byref(self.stream))
+            self._libz = None
+
+    def __del__(self):
+        self.close()
+
+
+class DeflateIndex:
+    """The checkpoints of a raw deflate stream.
+
+    Args:
+        checkpoints (list): The (output offset, input offset, bits, window) tuples of the checkpoints, in
+            increasing output offsets. The input offset is the first byte holding bits of the next block, of
+            which the low `8 - bits` bits are already consumed.
+        size (int): The size of the decompressed stream.
+    """
+    magic = b'BRKZRAN1'
+    _header = struct.Struct('<QQ')
+    _point = struct.Struct('<QQBI')
+
+    def __init__(self, checkpoints: List[Tuple[int, int, int, bytes]], size: int):
+        self.checkpoints = checkpoints
+        self.size = size
+        self._outputs = [point[0] for point in checkpoints]
+
+    @classmethod
+    def build(cls, source: FileWindow, span: int = 16 * 1024 ** 2) -> 'DeflateIndex':
+        """Decompresses a raw deflate stream once and records a checkpoint about every span bytes of output.
+
+        Args:
+            source (FileWindow): The compressed data.
+            span (int): The minimum distance between checkpoints, in bytes of output.
+
+        Returns:
+            DeflateIndex: The index of the stream.
+        """
+        inflater = Inflater()
+        window = ctypes.create_string_buffer(WINSIZE)
+        checkpoints = []
+        total_in = total_out = last = 0
+        source.seek(0)
+        ret = Z_OK
+        try:
+            while ret != Z_STREAM_END:
+                if not inflater.stream.avail_in and (chunk := source.read(CHUNK)):
+                    inflater.feed(chunk)
+                filled = WINSIZE - inflater.stream.avail_out if inflater.stream.avail_out else 0
+                avail_in = inflater.stream.avail_in
+                ret, written = inflater.inflate(window, filled, WINSIZE - filled, Z_BLOCK)
+                if not written and avail_in == inflater.stream.avail_in and ret != Z_STREAM_END:
+                    raise zlib.error('Error -5 while decompressing data: incomplete or truncated stream')
+                total_in += avail_in - inflater.stream.avail_in
+                total_out += written
+                data_type = inflater.stream.data_type
+                if data_type & 128 and not data_type & 64 and total_out - last > span:
+                    filled = (filled + written) % WINSIZE
+                    checkpoints.append((total_out, total_in, data_type & 7,
+                                        window.raw[filled:] + window.raw[:filled]))
+                    last = total_out
+                if not inflater.stream.avail_out:
+                    inflater.stream.avail_out = WINSIZE
+        finally:
+            inflater.close()
+        return cls(checkpoints, total_out)
+
+    def locate(self, offset: int) -> Tuple[int, int, int, Optional[bytes]]:
+        """Returns the last checkpoint at or before an output offset, or the start of the stream."""
+        if (index := bisect.bisect_right(self._outputs, offset)) == 0:
+            return 0, 0, 0, None
+        return self.checkpoints[index - 1]
+
+    def save(self, path: Path):
+        """Writes the index, with compressed windows, to a temporary file moved into place."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.magic + self._header.pack(self.size, len(self.checkpoints)))
+            for out_offset, in_offset, bits, window in self.checkpoints:
+                window = zlib.compress(window)
+                f.write(self._point.pack(out_offset, in_offset, bits, len(window)) + window)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['DeflateIndex']:
+        """Reads an index written by `save`, or returns None if the file is missing or invalid."""
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(cls.magic)) != cls.magic:
+                    return None
+                size, count = cls._header.unpack(f.read(cls._header.size))
+                checkpoints = []
+                for _ in range(count):
+                    out_offset, in_offset, bits, length = cls._point.unpack(f.read(cls._point.size))
+                    checkpoints.append((out_offset, in_offset, bits, zlib.decompress(f.read(length))))
+        except (OSError, struct.error, zlib.error):
+            return None
+        return cls(checkpoints, size)
+
+
+class ZipDeflatedMember(io.RawIOBase):
+    """A read-only, seekable file object over a deflated zip member, served from a checkpoint index.
+
+    Sequential reads continue the current inflate stream, as `ZipExtFile` does, and verify the CRC of the member
+    when they reach its end. The checkpoint index is only built on the first read that does not continue the
+    stream, and is shared by later opens of the member through the contents index directory. The indexes of the
+    last `max_indexes` members are kept in memory.
+
+    Args:
+        path (Path): The path to the zip archive.
+        info (ZipInfo): The information of the member.
+        source (FileWindow): A window onto the compressed data of the member.
+
+    Attributes:
+        name (str): The name of the member within the archive.
+        size (int): The size of the decompressed member in bytes.
+    """
+    span = 16 * 1024 ** 2
+    min_size = 64 * 1024 ** 2
+    max_indexes = 32
+    _indexes = OrderedDict()
+    _building = {}
+    _lock = threading.Lock()
+
+    def __init__(self, path: Path, info: ZipInfo, source: FileWindow):
+        self._path = path
+        self._info = info
+        self._source = source
+        self.name = info.filename
+        self.size = info.file_size
+        self._pos = 0
+        self._inflater = None
+        self._stream_pos = 0
+        self._pending = b''
+        self._crc = 0
+        self._crc_pos = 0
+
+    @property
+    def index(self) -> DeflateIndex:
+        """The checkpoint index of the member, loaded or built on first access.
+
+        Each member is indexed once at a time, without blocking the reads of other members.
+        """
+        key = self._get_index_path()
+        with self._lock:
+            if (index := self._get_cached_index(key)) is not None:
+                return index
+            building = self._building.setdefault(key, threading.Lock())
+        with building:
+            with self._lock:
+                if (index := self._get_cached_index(key)) is not None:
+                    return index
+            if (index := DeflateIndex.load(key) if contents_index.enabled else None) is None:
+                index = DeflateIndex.build(self._source, self.span)
+                if contents_index.enabled:
+                    try:
+                        index.save(key)
+                    except OSError:
+                        pass
+            with self._lock:
+                self._indexes[key] = index
+                while len(self._indexes) > self.max_indexes:
+                    self._indexes.popitem(last=False)
+                self._building.pop(key, None)
+        return index
+
+    def _get_cached_index(self, key: Path) -> Optional[DeflateIndex]:
+        """Returns an index kept in memory, marking it as the most recently used. Called with the lock held."""
+        if (index := self._indexes.get(key)) is not None:
+            self._indexes.move_to_end(key)
+        return index
+
+    def _get_index_path(self) -> Path:
+        stat = os.stat(self._path)
+        signature = (str(self._path), stat.st_size, stat.st_mtime_ns, self._info.filename, self._info.CRC,
+                     self.span)
+        return contents_index.root / f"{hashlib.sha1(repr(signature).encode('UTF-8')).hexdigest()}.zran"
+
+    def _restart(self, offset: int):
+        """Starts inflating at the last checkpoint before an output offset."""
+        if self._inflater:
+            self._inflater.close()
+        out_offset, in_offset, bits, window = self.index.locate(offset)
+        value = 0
+        if bits:
+            self._source.seek(in_offset - 1)
+            value = self._source.read(1)[0]
+        else:
+            self._source.seek(in_offset)
+        self._inflater = Inflater(bits, value, window)
+        self._stream_pos = out_offset
+        self._pending = b''
+
+    def _inflate(self, size: int) -> bytes:
+        """Inflates up to size bytes from the current stream position."""
+        buffer = ctypes.create_string_buffer(size)
+        filled = 0
+        while filled < size:
+            if not self._inflater.stream.avail_in and (chunk := self._source.read(CHUNK)):
+                self._inflater.feed(chunk)
+            avail_in = self._inflater.stream.avail_in
+            ret, written = self._inflater.inflate(buffer, filled, size - filled)
+            filled += written
+            if ret == Z_STREAM_END or not written and avail_in == self._inflater.stream.avail_in:
+                break
+        self._stream_pos += filled
+        return buffer.raw[:filled]
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def readall(self):
+        return self.read()
+
+    def read(self, size: int = -1):
+        if size is None or size < 0:
+            size = max(self.size - self._pos, 0)
+        size = min(size, max(self.size - self._pos, 0))
+        if not size:
+            return b''
+        if self._inflater is None and self._pos < self.span:
+            self._inflater = Inflater()
+            self._source.seek(0)
+            self._stream_pos = 0
+        elif self._inflater is None or not self._stream_pos <= self._pos <= self._stream_pos + self.span:
+            self._restart(self._pos)
+        while self._stream_pos < self._pos:
+            # skip forward from the checkpoint, or from the current position of the stream
+            self._inflate(min(self._pos - self._stream_pos, CHUNK * 16))
+        data = self._inflate(size)
+        self._check_crc(data)
+        self._pos += len(data)
+        return data
+
+    def _check_crc(self, data: bytes):
+        """Updates the CRC of the data read in order from the start, and verifies it at the end of the member."""
+        if self._pos != self._crc_pos:
+            return
+        self._crc = zlib.crc32(data, self._crc)
+        self._crc_pos += len(data)
+        if self._crc_pos == self.size and self._crc != self._info.CRC:
+            raise zipfile.BadZipFile(f"Bad CRC-32 for file {self.name!r}")
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = pos
+        elif whence == io.SEEK_CUR:
+            self._pos += pos
+        elif whence == io.SEEK_END:
+            self._pos = self.size + pos
+        else:
+            raise ValueError(f"Invalid whence ({whence})")
+        if self._pos < 0:
+            raise ValueError("Negative seek position")
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            if self._inflater:
+                self._inflater.close()
+                self._inflater = None
+            self._source.close()
+        super().close()
@@ -25,8 +25,9 @@ class BaseMethods(BaseBufferHandler):
     @staticmethod
     def get_dataobj(scanobj:'Scan',
                     reco_id:Optional[int] = None,
-                    scale_correction:bool = False):
-        data_dict = BaseMethods.get_data_dict(scanobj, reco_id)
+                    scale_correction:bool = False,
+                    mmap:bool = False):
+        data_dict = BaseMethods.get_data_dict(scanobj, reco_id, mmap=mmap)
         dataobj = data_dict['data_array']
         if scale_correction:
             try:
@@ -47,10 +48,11 @@ class BaseMethods(BaseBufferHandler):
     
     @staticmethod
     def get_data_dict(scanobj: 'Scan', 
-                      reco_id: Optional[int] = None):
+                      reco_id: Optional[int] = None,
+                      mmap: bool = False):
         datarray_analyzer = scanobj.get_datarray_analyzer(reco_id)
         axis_labels = datarray_analyzer.shape_desc
-        dataarray = datarray_analyzer.get_dataarray()
+        dataarray = datarray_analyzer.get_dataarray(mmap=mmap)
         slice_axis = axis_labels.index('slice') if 'slice' in axis_labels else 2
         if slice_axis != 2:
             dataarray = np.swapaxes(dataarray, slice_axis, 2)
@@ -1,10 +1,32 @@
 from .utils import *
+from ..api.pvobj.parser import Parser as ApiParser
+
+
+def convert_value_to(data, shape):
+    # same result as convert_data_to, using the single-pass decoders of brkraw.api where they apply
+    if not isinstance(data, str):
+        return data
+    if not any(c in data for c in '<@(, '):
+        # plain scalar
+        return convert_string_to(data)
+    if ' ' in data or '@' in data:
+        parsed_shape = shape
+        if shape != -1:
+            parsed_shape = re.sub(ptrn_array, r'\g<array>', shape)
+            if ',' in parsed_shape:
+                parsed_shape = [convert_string_to(c) for c in parsed_shape.split(',')]
+        is_array = isinstance(parsed_shape, list)
+        # numeric arrays, including PV360 @N*(value) runs
+        if not is_array or all(isinstance(c, int) for c in parsed_shape):
+            if (decoded := ApiParser.parse_numeric_array(data, as_list=not is_array)) is not None:
+                return decoded.reshape(parsed_shape) if is_array else decoded
+    return convert_data_to(data, shape)
 
 
 class Parameter:
     def __init__(self, stringlist):
-        # parse the parameter dictionaries from stringlist
-        self._set_param(*load_param(stringlist))
+        # parse the parameter dictionaries from stringlist with the tokenizer of brkraw.api
+        self._set_param(ApiParser.tokenize(stringlist), stringlist)
 
     @property
     def parameters(self):
@@ -14,35 +36,25 @@ class Parameter:
     def headers(self):
         return self._headers
 
-    def _set_param(self, params, param_addr, contents):
-        # get distance between each parameter
-        addr_diff = np.diff(param_addr)
-
+    def _set_param(self, records, contents):
         # for debugging
         self._contents = contents
-        # build dictionary for parameters
+        # build dictionary for parameters, the last record closes the file (##END=)
         self._headers = OrderedDict()
         self._parameters = OrderedDict()
-        for index, addr in enumerate(param_addr[:-1]):
-            dtype, key, value = params[addr]
+        for dtype, key, value, start, stop in records[:-1]:
             shape = -1
-            # if there are spaces before next parameter apears
-            if addr_diff[index] > 1:
-                # collect all text within spaces
-                c_lines = contents[(addr + 1):(addr + addr_diff[index])]
-                # merge lines into single text as data
-                data = " ".join([line.strip() for line in c_lines if not re.match(ptrn_comment, line)])
-                # no contents in data
-                if not data:
-                    data = convert_string_to(value)
-                else:
-                    shape = value
-            else:
+            # merge the lines up to the next parameter into single text as data, without comments
+            data = ApiParser.join_lines(contents, start, stop) if stop > start else None
+            # no contents in data
+            if not data:
                 data = convert_string_to(value)
+            else:
+                shape = value
 
-            if dtype is PARAMETER:
-                self._parameters[key] = convert_data_to(data, shape)
-            elif dtype is HEADER:
+            if dtype == PARAMETER:
+                self._parameters[key] = convert_value_to(data, shape)
+            elif dtype == HEADER:
                 self._headers[key] = data
             else:
-                raise Exception
\ No newline at end of file
+                raise Exception
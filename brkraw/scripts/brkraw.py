@@ -39,6 +39,7 @@ def main():
                                                             "for guiding BIDS data converting.")
     bids_convert = subparsers.add_parser("bids_convert", help="Convert ALL raw Bruker data located "
                                                               "in the input directory based on the BIDS datasheet")
+    index_parser = subparsers.add_parser("index", help="Manage the persistent contents index of archived datasets")
 
     # Adding arguments for each parser
     # gui
@@ -104,6 +105,12 @@ def main():
     bids_convert.add_argument("--ignore-rescale", help='remove slope and offset values from header',
                               action='store_true')
 
+    # index
+    index_parser.add_argument("--clear", help="remove all entries of the contents index", action='store_true')
+    index_switch = index_parser.add_mutually_exclusive_group()
+    index_switch.add_argument("--disable", help="stop using the contents index", action='store_true')
+    index_switch.add_argument("--enable", help="start using the contents index", action='store_true')
+
     args = parser.parse_args()
 
     if args.function == 'info':
@@ -119,6 +126,18 @@ def main():
                 study = BrukerLoader(p)
                 study.info()
 
+    elif args.function == 'index':
+        from ..api.pvobj.index import contents_index
+        if args.clear:
+            print('{} entries removed from the contents index.'.format(contents_index.clear()))
+        if args.disable:
+            contents_index.disable()
+        elif args.enable:
+            contents_index.enable()
+        print('Contents index: {} [{}] ({} entries)'.format(contents_index.root,
+                                                             'enabled' if contents_index.enabled else 'disabled',
+                                                             len(contents_index)))
+
     elif args.function == 'gui':
         ipath = args.input
         opath = args.output
@@ -0,0 +1,76 @@
+import os
+from brkraw.api.pvobj import PvStudy
+
+
+def test_zip_contents_match_dir(pvdataset_dir, pvdataset_zip):
+    dirobj = PvStudy(pvdataset_dir)
+    zipobj = PvStudy(pvdataset_zip)
+    assert dirobj.avail == zipobj.avail
+    for scan_id in zipobj.avail:
+        assert dict(zipobj.get_scan(scan_id).acqp.items()) == dict(dirobj.get_scan(scan_id).acqp.items())
+        with zipobj.get_2dseq(scan_id, 1) as z, dirobj.get_2dseq(scan_id, 1) as d:
+            assert z.read() == d.read()
+
+
+def test_zip_handle_shared_in_tree(pvdataset_zip):
+    study = PvStudy(pvdataset_zip)
+    handle = study._pool.zipfile
+    for scan_id in study.avail:
+        scan = study.get_scan(scan_id)
+        scan.method
+        scan.get_visu_pars()
+        assert scan._pool is study._pool
+        assert scan.get_reco(1)._pool is study._pool
+    assert study._pool.zipfile is handle
+
+
+def test_zip_handle_close_and_reopen(pvdataset_zip, monkeypatch):
+    with PvStudy(pvdataset_zip) as study:
+        scan = study.get_scan(1)
+        fileobj = scan.get_fid()
+    assert study._pool.closed
+    assert len(fileobj.read()) == 4 * 4 * 3 * 2 * 4
+    handle = study._pool.zipfile
+    assert scan.acqp['NI'] == 3
+
+    # a forked child must not reuse the handle inherited from its parent
+    pid = os.getpid()
+    monkeypatch.setattr(os, 'getpid', lambda: pid + 1)
+    assert study._pool.zipfile is not handle
+    assert scan.acqp['NI'] == 3
+
+
+def test_scan_close_keeps_shared_handles(pvdataset_zip):
+    study = PvStudy(pvdataset_zip)
+    handle = study._pool.zipfile
+
+    def read_scan(scan):
+        # closing a scan only closes its own buffers, while other workers read from the shared handle
+        with scan:
+            fileobj = scan.get_fid()
+            scan.get_reco(1).close()
+            return len(fileobj.read()), scan.method['PVM_EncSteps1']
+
+    assert study.map_scans(read_scan, workers=4) == {scan_id: (4 * 4 * 3 * 2 * 4, [-2, -1, 0, 1])
+                                                     for scan_id in study.avail}
+    assert not study._pool.closed and study._pool.zipfile is handle
+    study.close()
+    assert study._pool.closed
+
+
+def test_file_kind_single_pass(pvdataset_dir, tmp_path, monkeypatch):
+    import zipfile
+    from brkraw.api.pvobj.base import BaseMethods
+    from .conftest import zip_pvdataset
+    study = PvStudy(zip_pvdataset(pvdataset_dir, tmp_path / 'deflated.zip', zipfile.ZIP_DEFLATED))
+    assert BaseMethods._get_file_kind('visu_pars') == 'parameter'
+    assert BaseMethods._get_file_kind('rawdata.job0') == 'binary'
+    assert BaseMethods._get_file_kind('pulseprogram') is None
+
+    def sniffed(*args):
+        raise AssertionError('known file sniffed')
+    monkeypatch.setattr(BaseMethods, '_is_binary', staticmethod(sniffed))
+    scan = study.get_scan(1)
+    assert scan.acqp['NI'] == 3
+    assert len(scan.get_fid().read()) == 4 * 4 * 3 * 2 * 4
+    assert getattr(scan.get_reco(1), '2dseq').read(2) == (100).to_bytes(2, 'little')
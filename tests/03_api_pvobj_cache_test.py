@@ -0,0 +1,69 @@
+import os
+import pytest
+from brkraw.api.pvobj import PvStudy, parameter_cache
+from brkraw.api.pvobj import base
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    parameter_cache.clear()
+    parameter_cache.reset_stats()
+    yield
+    parameter_cache.clear()
+    parameter_cache.resize(max_entries=1024, max_bytes=256 * 1024 ** 2)
+
+
+@pytest.fixture
+def parse_count(monkeypatch):
+    calls = []
+    original = base.Parameter
+
+    def counting_parameter(*args, **kwargs):
+        calls.append(kwargs.get('name'))
+        return original(*args, **kwargs)
+    monkeypatch.setattr(base, 'Parameter', counting_parameter)
+    return calls
+
+
+@pytest.mark.parametrize('dataset', ['pvdataset_dir', 'pvdataset_zip'])
+def test_parse_once(dataset, parse_count, request):
+    path = request.getfixturevalue(dataset)
+    for _ in range(3):
+        study = PvStudy(path)
+        for scan_id in study.avail:
+            scan = study.get_scan(scan_id)
+            assert scan.acqp is scan.acqp
+            scan.method
+            scan.get_visu_pars()
+            scan.get_reco(1).reco
+    assert len(parse_count) == len(study.avail) * 4
+    assert parameter_cache.misses == len(parse_count)
+    assert parameter_cache.hits > parameter_cache.misses
+
+
+def test_invalidate_on_change(pvdataset_dir, parse_count):
+    study = PvStudy(pvdataset_dir)
+    scan = study.get_scan(1)
+    assert scan.acqp['NI'] == 3
+    acqp_path = pvdataset_dir / '1' / 'acqp'
+    acqp_path.write_text(acqp_path.read_text().replace('##$NI=3', '##$NI=5'))
+    os.utime(acqp_path, ns=(0, 0))
+    assert scan.acqp['NI'] == 5
+    assert parameter_cache.invalidate(dataset=pvdataset_dir, scan_id=1) == 2
+    assert len(parameter_cache) == 0
+
+
+def test_budget(pvdataset_dir):
+    study = PvStudy(pvdataset_dir)
+    parameter_cache.resize(max_entries=2)
+    for scan_id in study.avail:
+        study.get_scan(scan_id).acqp
+        study.get_scan(scan_id).method
+    assert len(parameter_cache) == 2
+    assert parameter_cache.evictions == 2
+    size = (pvdataset_dir / '1' / 'acqp').stat().st_size
+    parameter_cache.resize(max_bytes=size)
+    assert len(parameter_cache) <= 1
+    parameter_cache.resize(max_entries=0)
+    study.get_scan(1).acqp
+    assert len(parameter_cache) == 0
@@ -0,0 +1,116 @@
+import zipfile
+import pytest
+import numpy as np
+from types import SimpleNamespace
+from .conftest import zip_pvdataset
+from brkraw.api.pvobj import PvStudy
+from brkraw.api.pvobj.pool import ZipStoredMember
+from brkraw.api.analyzer import DataArrayAnalyzer
+
+
+def get_infoobj(shape=(4, 4), frames=(3,)):
+    return SimpleNamespace(dataarray={'slope': 1.0, 'offset': 0.0, 'dtype': np.dtype('<i2')},
+                           image={'shape': list(shape), 'dim_desc': ['spatial'] * len(shape)},
+                           frame_group={'type': 'FG_CYCLE', 'shape': list(frames), 'id': ['FG_CYCLE']})
+
+
+def test_get_dataarray_mmap(pvdataset_dir):
+    study = PvStudy(pvdataset_dir)
+    analyzer = DataArrayAnalyzer(get_infoobj(), study.get_2dseq(2, 1))
+    expected = analyzer.get_dataarray()
+    mapped = analyzer.get_dataarray(mmap=True)
+    assert isinstance(mapped, np.memmap)
+    assert mapped.shape == expected.shape == (4, 4, 3)
+    assert mapped.flags.f_contiguous and not mapped.flags.writeable
+    assert np.array_equal(mapped, expected)
+    assert mapped[1, 2, 2] == 200 + 1 + 2 * 4 + 2 * 16
+
+
+def test_get_dataarray_mmap_zip_stored(pvdataset_dir, pvdataset_zip):
+    expected = DataArrayAnalyzer(get_infoobj(), PvStudy(pvdataset_dir).get_2dseq(2, 1)).get_dataarray()
+    fileobj = PvStudy(pvdataset_zip).get_2dseq(2, 1)
+    assert isinstance(fileobj, ZipStoredMember)
+    fileobj.seek(-2, 2)
+    assert fileobj.read() == expected[-1, -1, -1].tobytes()
+    mapped = DataArrayAnalyzer(get_infoobj(), fileobj).get_dataarray(mmap=True)
+    assert isinstance(mapped, np.memmap)
+    assert np.array_equal(mapped, expected)
+
+
+def test_zip_stored_crc(pvdataset_zip):
+    study = PvStudy(pvdataset_zip)
+    fileobj = study.get_2dseq(2, 1)
+    size, offset = fileobj.size, fileobj.offset
+    fileobj.close()
+    study.close()
+    with open(pvdataset_zip, 'r+b') as f:
+        f.seek(offset + size // 2)
+        byte = f.read(1)[0]
+        f.seek(offset + size // 2)
+        f.write(bytes([byte ^ 0xFF]))
+
+    fileobj = PvStudy(pvdataset_zip).get_2dseq(2, 1)
+    # reads out of order are not verified
+    fileobj.seek(size // 2)
+    assert len(fileobj.read()) == size - size // 2
+    fileobj.seek(0)
+    with pytest.raises(zipfile.BadZipFile, match='Bad CRC-32'):
+        fileobj.read()
+    fileobj = PvStudy(pvdataset_zip).get_2dseq(2, 1)
+    assert fileobj.readinto(bytearray(size // 2)) == size // 2
+    with pytest.raises(zipfile.BadZipFile, match='Bad CRC-32'):
+        fileobj.readinto(bytearray(size))
+
+
+def test_get_dataarray_mmap_zip_deflated(pvdataset_dir, tmp_path):
+    path = zip_pvdataset(pvdataset_dir, tmp_path / 'deflated.zip', zipfile.ZIP_DEFLATED)
+    fileobj = PvStudy(path).get_2dseq(1, 1)
+    assert not isinstance(fileobj, ZipStoredMember)
+    dataarray = DataArrayAnalyzer(get_infoobj(), fileobj).get_dataarray(mmap=True)
+    assert not isinstance(dataarray, np.memmap)
+    assert dataarray[1, 2, 2] == 100 + 1 + 2 * 4 + 2 * 16
+
+
+class CountingReader:
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.nbytes = 0
+
+    def seek(self, *args):
+        return self.fileobj.seek(*args)
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.nbytes += len(data)
+        return data
+
+
+@pytest.mark.parametrize('compression', [None, zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_get_frames(pvdataset_dir, tmp_path, compression):
+    expected = DataArrayAnalyzer(get_infoobj(), PvStudy(pvdataset_dir).get_2dseq(2, 1)).get_dataarray()
+    path = pvdataset_dir if compression is None else zip_pvdataset(pvdataset_dir, tmp_path / 'study.zip', compression)
+    reader = CountingReader(PvStudy(path).get_2dseq(2, 1))
+    analyzer = DataArrayAnalyzer(get_infoobj(), reader)
+    assert analyzer.num_frames == 3
+    assert np.array_equal(analyzer.get_frames(1, 2), expected[..., 1:2])
+    assert reader.nbytes == 4 * 4 * 2
+    assert np.array_equal(analyzer.get_frames(), expected)
+    assert np.array_equal(analyzer.get_frames(step=2), expected[..., ::2])
+    assert np.array_equal(analyzer.get_frames(-1, None, -1), expected[..., ::-1])
+    assert analyzer.get_frames(2, 1).shape == (4, 4, 0)
+
+
+def test_get_volume(pvdataset_dir):
+    # the 3 frames of 4x4 read as 2x4 images with 2 slices per volume
+    infoobj = get_infoobj(shape=(2, 4), frames=(2, 3))
+    infoobj.frame_group['id'] = ['FG_SLICE', 'FG_CYCLE']
+    fileobj = PvStudy(pvdataset_dir).get_2dseq(1, 1)
+    analyzer = DataArrayAnalyzer(infoobj, fileobj)
+    expected = analyzer.get_dataarray()
+    assert analyzer.volume_shape == [2, 4, 2]
+    assert analyzer.num_volumes == 3
+    for index in range(3):
+        assert np.array_equal(analyzer.get_volume(index), expected[..., index])
+    assert np.array_equal(analyzer.get_volume(-1), expected[..., 2])
+    with pytest.raises(IndexError):
+        analyzer.get_volume(3)
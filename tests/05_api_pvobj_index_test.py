@@ -0,0 +1,109 @@
+import os
+import zipfile
+import pytest
+from brkraw.api.pvobj import PvStudy
+from brkraw.api.pvobj.base import BaseMethods
+from .conftest import zip_pvdataset
+
+
+def walk_contents(path):
+    contents = {}
+    for dirpath, dirnames, filenames in os.walk(path):
+        contents[os.path.relpath(dirpath, path)] = {
+            'dirs': sorted(dirnames), 'files': sorted(filenames),
+            'file_sizes': [os.path.getsize(os.path.join(dirpath, f)) for f in sorted(filenames)]}
+    return contents
+
+
+def test_fetch_dir_matches_walk(pvdataset_dir):
+    contents = BaseMethods._fetch_dir(pvdataset_dir)
+    expected = walk_contents(pvdataset_dir)
+    assert list(contents) == list(expected)
+    for path, item in contents.items():
+        order = sorted(range(len(item['files'])), key=lambda i: item['files'][i])
+        assert sorted(item['dirs']) == expected[path]['dirs']
+        assert [item['files'][i] for i in order] == expected[path]['files']
+        assert [item['file_sizes'][i] for i in order] == expected[path]['file_sizes']
+
+
+def test_shallow_study(pvdataset_dir):
+    full = PvStudy(pvdataset_dir)
+    shallow = PvStudy(pvdataset_dir, shallow=True)
+    assert list(shallow._contents) == ['.']
+    assert shallow.avail == full.avail
+    assert not shallow._scans
+    scan = shallow.get_scan(2)
+    assert list(shallow._scans) == [2]
+    assert scan.avail == [1]
+    assert scan.acqp['NI'] == full.get_scan(2).acqp['NI']
+    assert shallow.get_2dseq(2, 1).read() == full.get_2dseq(2, 1).read()
+    assert shallow.avail == full.avail
+
+
+def test_contents_index(pvdataset_zip, index_dir, monkeypatch):
+    from brkraw.api.pvobj.index import contents_index
+    from brkraw.api.pvobj import pool
+    # the index is disabled by default
+    assert not contents_index.enabled
+    PvStudy(pvdataset_zip)
+    assert len(contents_index) == 0
+    contents_index.enable()
+    assert contents_index.enabled
+    study = PvStudy(pvdataset_zip)
+    assert len(contents_index) == 1
+
+    def no_zipfile(*args, **kwargs):
+        raise AssertionError('archive re-read')
+    with monkeypatch.context() as m:
+        m.setattr(pool.zipfile, 'ZipFile', no_zipfile)
+        m.setattr('brkraw.api.pvobj.base.ZipFile', no_zipfile)
+        indexed = PvStudy(pvdataset_zip)
+        assert indexed.avail == study.avail
+        assert indexed._contents == study._contents
+        assert indexed.get_scan(1).acqp['NI'] == 3
+        assert indexed.get_2dseq(2, 1).read() == study.get_2dseq(2, 1).read()
+
+    # a modified archive invalidates its entry
+    os.utime(pvdataset_zip, ns=(0, 0))
+    with monkeypatch.context() as m:
+        m.setattr(pool.zipfile, 'ZipFile', no_zipfile)
+        with pytest.raises(AssertionError, match='archive re-read'):
+            PvStudy(pvdataset_zip)
+
+    contents_index.disable()
+    assert not contents_index.enabled
+    assert contents_index.clear() == 1
+    PvStudy(pvdataset_zip)
+    assert len(contents_index) == 0
+    monkeypatch.setenv('BRKRAW_INDEX', '1')
+    assert contents_index.enabled
+    monkeypatch.setenv('BRKRAW_INDEX', '0')
+    contents_index.enable()
+    assert not contents_index.enabled
+
+
+def test_contents_index_deflated(pvdataset_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv('BRKRAW_INDEX', '1')
+    path = zip_pvdataset(pvdataset_dir, tmp_path / 'deflated.zip', zipfile.ZIP_DEFLATED)
+    expected = PvStudy(path).get_2dseq(1, 1).read()
+    indexed = PvStudy(path)
+    assert indexed._pool.closed
+    assert indexed.get_2dseq(1, 1).read() == expected
+    assert indexed.get_scan(1).method['PVM_Matrix'] == [4, 4]
+
+
+def test_lazy_construction(pvdataset_dir, monkeypatch):
+    from brkraw.api.pvobj import pvstudy, pvscan
+    created = []
+    for module, name in [(pvstudy, 'PvScan'), (pvscan, 'PvReco')]:
+        cls = getattr(module, name)
+        monkeypatch.setattr(module, name, lambda *args, cls=cls, **kwargs: created.append(cls) or cls(*args, **kwargs))
+    study = PvStudy(pvdataset_dir)
+    assert study.avail == [1, 2]
+    assert not created
+    scan = study.get_scan(2)
+    assert scan.avail == [1]
+    assert len(created) == 1
+    assert scan.get_reco(1) is scan.get_reco(1)
+    assert study.get_scan(2) is scan
+    assert len(created) == 2
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from .conftest import tar_pvdataset
+from brkraw.api.pvobj import PvStudy
+from brkraw.api.pvobj import pool
+from brkraw.api.pvobj.pool import FileWindow, TarHandlePool
+from brkraw.api.analyzer import DataArrayAnalyzer
+
+
+def get_infoobj():
+    return SimpleNamespace(dataarray={'slope': 1.0, 'offset': 0.0, 'dtype': np.dtype('<i2')},
+                           image={'shape': [4, 4], 'dim_desc': ['spatial'] * 2},
+                           frame_group={'type': 'FG_CYCLE', 'shape': [3], 'id': ['FG_CYCLE']})
+
+
+@pytest.mark.parametrize('mode', ['w', 'w:gz', 'w:bz2'])
+def test_tar_contents_match_dir(pvdataset_dir, tmp_path, mode):
+    path = tar_pvdataset(pvdataset_dir, tmp_path / 'study.tar', mode)
+    dirobj = PvStudy(pvdataset_dir)
+    tarobj = PvStudy(path)
+    assert isinstance(tarobj._pool, TarHandlePool)
+    assert tarobj._pool.is_stream_compressed == (mode != 'w')
+    assert tarobj.avail == dirobj.avail
+    assert dict(tarobj.subject.items()) == dict(dirobj.subject.items())
+    for scan_id in tarobj.avail:
+        assert dict(tarobj.get_scan(scan_id).acqp.items()) == dict(dirobj.get_scan(scan_id).acqp.items())
+        with tarobj.get_2dseq(scan_id, 1) as t, dirobj.get_2dseq(scan_id, 1) as d:
+            assert t.read() == d.read()
+
+
+def test_tar_uncompressed_mmap(pvdataset_dir, tmp_path):
+    path = tar_pvdataset(pvdataset_dir, tmp_path / 'study.tar')
+    fileobj = PvStudy(path).get_2dseq(2, 1)
+    assert isinstance(fileobj, FileWindow)
+    mapped = DataArrayAnalyzer(get_infoobj(), fileobj).get_dataarray(mmap=True)
+    assert isinstance(mapped, np.memmap)
+    assert mapped[1, 2, 2] == 200 + 1 + 2 * 4 + 2 * 16
+
+
+def test_tar_contents_index(pvdataset_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv('BRKRAW_INDEX', '1')
+    path = tar_pvdataset(pvdataset_dir, tmp_path / 'study.tar')
+    expected = PvStudy(path)
+
+    def no_tarfile(*args, **kwargs):
+        raise AssertionError('the member table must be read from the index')
+
+    with monkeypatch.context() as m:
+        m.setattr(pool.tarfile, 'open', no_tarfile)
+        indexed = PvStudy(path)
+        assert indexed.avail == expected.avail
+        assert indexed.get_scan(1).acqp['NI'] == 3
+        with indexed.get_2dseq(1, 1) as t, expected.get_2dseq(1, 1) as e:
+            assert t.read() == e.read()
+    assert indexed._pool.closed
@@ -0,0 +1,56 @@
+import zipfile
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from .conftest import build_pvdataset, zip_pvdataset, tar_pvdataset
+from brkraw.api.pvobj import PvStudy, parameter_cache
+
+
+def read_scan(pvscan):
+    return (pvscan.acqp['NI'], pvscan.method['PVM_Matrix'], pvscan.get_visu_pars()['VisuCoreFrameCount'],
+            pvscan.get_fid().read(), pvscan.get_reco(1).get_2dseq().read())
+
+
+@pytest.fixture
+def large_pvdataset_dir(tmp_path):
+    return build_pvdataset(tmp_path / 'study', num_scans=12)
+
+
+@pytest.mark.parametrize('archive', ['dir', 'zip_stored', 'zip_deflated', 'tar', 'tar_gz'])
+def test_map_scans_stress(large_pvdataset_dir, tmp_path, archive):
+    path = {'dir': lambda: large_pvdataset_dir,
+            'zip_stored': lambda: zip_pvdataset(large_pvdataset_dir, tmp_path / 'study.zip'),
+            'zip_deflated': lambda: zip_pvdataset(large_pvdataset_dir, tmp_path / 'study.zip',
+                                                  zipfile.ZIP_DEFLATED),
+            'tar': lambda: tar_pvdataset(large_pvdataset_dir, tmp_path / 'study.tar'),
+            'tar_gz': lambda: tar_pvdataset(large_pvdataset_dir, tmp_path / 'study.tar.gz', 'w:gz')}[archive]()
+    expected = PvStudy(large_pvdataset_dir).map_scans(read_scan, workers=1)
+
+    with PvStudy(path) as study:
+        for _ in range(5):
+            parameter_cache.clear()
+            assert study.map_scans(read_scan, workers=8) == expected
+
+        # hammer the same scans from many threads at once
+        barrier = threading.Barrier(16)
+
+        def hammer(i):
+            barrier.wait()
+            scan_id = study.avail[i % len(study.avail)]
+            return [read_scan(study.get_scan(scan_id)) == expected[scan_id] for _ in range(10)]
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            assert all(all(results) for results in executor.map(hammer, range(16)))
+        scans = [study.get_scan(scan_id) for scan_id in study.avail]
+        assert all(study.get_scan(scan_id) is scan for scan_id, scan in zip(study.avail, scans))
+
+
+def test_map_scans_subset_and_errors(pvdataset_dir):
+    study = PvStudy(pvdataset_dir)
+    assert list(study.map_scans(lambda pvscan: pvscan.acqp['NI'], scan_ids=[2, 1])) == [2, 1]
+
+    def fail(pvscan):
+        raise RuntimeError(pvscan.acqp['NI'])
+
+    with pytest.raises(RuntimeError):
+        study.map_scans(fail, workers=2)
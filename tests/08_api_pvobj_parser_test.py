@@ -0,0 +1,450 @@
+import random
+import struct
+import time
+import numpy as np
+import pytest
+from collections import OrderedDict
+from . import legacy_parser
+from brkraw.api.pvobj import Parameter
+from brkraw.api.pvobj.parser import Parser, PARAMETER, HEADER
+
+CORPUS = {
+'method': """##TITLE=Parameter List, ParaVision 360 V3.2
+##JCAMPDX=4.24
+##DATATYPE=Parameter Values
+##ORIGIN=Bruker BioSpin MRI GmbH
+##OWNER=nmrsu
+$$ Mon Jan 10 12:00:00 2022 CET (UT+1h)  nmrsu
+$$ /opt/PV-360.3.2/data/nmrsu/test/5/method
+##$Method=<Bruker:RARE>
+##$PVM_EchoTime=8.5
+##$PVM_NRepetitions=1
+##$PVM_Matrix=( 2 )
+128 128
+##$PVM_Fov=( 2 )
+25.6 25.6
+##$PVM_SpatResol=( 2 )
+0.2 0.2
+##$PVM_EncSteps1=( 16 )
+-8 -7 -6 -5 -4 -3 -2 -1 0 1 2 3 4 5 6 7
+##$PVM_SPackArrGradOrient=( 1, 3, 3 )
+1 0 0 0 1 0 0 0 1
+##$PVM_ObjOrderList=( 5 )
+0 2 4 1 3
+##$PVM_GradCalConst=4258.3
+##$PVM_DwBvalEach=( 3 )
+1e-05 1000 2.5e3
+##$ExcPul=(1, 3200, 30, Yes, 3, 5400, 0.213, 0.109, 0, 50, 0.416, <$ExcPulseShape>)
+##$PVM_SliceThick=0.5
+##$PVM_DummyScans=( 2 )
+@2*(0)
+##$PVM_ScanTimeStr=( 64 )
+<0h0m32s0ms>
+##$PVM_FovSatThick=( 0 )
+
+##$PVM_ppgFlag1=Yes
+##$PVM_DwDir=( 3, 3 )
+1 0 0
+0 1 0
+0 0 1
+##$PVM_DwEffBval=( 4 )
+@2*(0.5) 3 -4.5
+##$PVM_AntiAlias=( 2 )
+1 1
+##$PVM_Comment=( 2048 )
+<a very long comment that is broken over
+$$ a comment line in between
+several lines of the file>
+##END=
+""",
+'acqp': """##TITLE=Parameter List, ParaVision 6.0.1
+##JCAMPDX=4.24
+##DATATYPE=Parameter Values
+##ORIGIN=Bruker BioSpin MRI GmbH
+##OWNER=nmrsu
+$$ Tue Feb  1 09:12:33 2022 CET (UT+1h)  nmrsu
+##$ACQ_sw_version=( 65 )
+<PV 6.0.1>
+##$ACQ_scan_name=( 64 )
+<1_Localizer (E1)>
+##$ACQ_time=<2022-02-01T09:12:33,123+0100>
+##$ACQ_abs_time=( 3 )
+1643703153 123 60
+##$NI=3
+##$NR=1
+##$NA=2
+##$ACQ_dim=2
+##$ACQ_size=( 2 )
+256 64
+##$ACQ_jobs=( 1 )
+(128, 4096, 1, 4294967295, 8, 1, 0, <job0>, 32, <Fid>, 0, 0, (0, 0))
+##$ACQ_O1_list=( 5 )
+0 0 0 0 0
+##$ACQ_grad_str_X=( 8 )
+@8*(0)
+##$ACQ_spatial_phase_1=( 8 )
+-1 -0.75 -0.5 -0.25 0 0.25 0.5 0.75
+##$GO_raw_data_format=GO_32BIT_SGN_INT
+##$BYTORDA=little
+##$ACQ_method_desc=<$Bis-Desc, Pvm#>
+##$ACQ_protocol_location=( 2 )
+<$Bis one#> <$Bis two#>
+##$ACQ_RF_power=( 2 )
+1.5e-3 2.
+##$ACQ_flip_angle=30
+##$ACQ_word_size=_32_BIT
+##$ACQ_trim=( 3, 2 )
+(1, 2) (3, 4) (5, 6)
+##$ACQ_ReceiverSelect=( 4 )
+Yes Yes No No
+##$ACQ_user_filter_setting=(0, 0, <>)
+##$Coil_operation=<>
+##$ACQ_vd_list=( 1 )
+0.001
+##END=
+""",
+'visu_pars': """##TITLE=Parameter List, ParaVision 360 V1.1
+##JCAMPDX=4.24
+##DATATYPE=Parameter Values
+##ORIGIN=Bruker BioSpin MRI GmbH
+##OWNER=nmrsu
+##$VisuVersion=3
+##$VisuUid=( 65 )
+<2.16.756.5.5.100.3611280983.20092.1643703153.1>
+##$VisuCoreFrameCount=10
+##$VisuCoreDim=2
+##$VisuCoreSize=( 2 )
+128 128
+##$VisuCoreDimDesc=( 2 )
+spatial spatial
+##$VisuCoreExtent=( 2 )
+25.6 25.6
+##$VisuCoreFrameThickness=( 1 )
+0.5
+##$VisuCoreUnits=( 2, 65 )
+<mm> <mm>
+##$VisuCoreOrientation=( 10, 9 )
+@10*(1 0 0 0 1 0 0 0 1)
+##$VisuCorePosition=( 10, 3 )
+-12.8 -12.8 -2.25 -12.8 -12.8 -1.75 -12.8 -12.8 -1.25 -12.8 -12.8 -0.75 -12.8 -12.8 -0.25 -12.8 -12.8
+0.25 -12.8 -12.8 0.75 -12.8 -12.8 1.25 -12.8 -12.8 1.75 -12.8 -12.8 2.25
+##$VisuCoreDataMin=( 10 )
+@10*(0)
+##$VisuCoreDataMax=( 10 )
+@5*(32767) @5*(16383.5)
+##$VisuCoreDataOffs=( 10 )
+@10*(0)
+##$VisuCoreDataSlope=( 10 )
+@3*(1.5) 2 2 2 @4*(-1e-3)
+##$VisuCoreWordType=_16BIT_SGN_INT
+##$VisuCoreByteOrder=littleEndian
+##$VisuFGOrderDescDim=2
+##$VisuFGOrderDesc=( 2 )
+(5, <FG_SLICE>, <>, 0, 2) (2, <FG_CYCLE>, <>, 2, 1)
+##$VisuGroupDepVals=( 3 )
+(<VisuCoreOrientation>, 0) (<VisuCorePosition>, 0) (<VisuCoreDataMin>, 1)
+##$VisuSubjectName=( 65 )
+<Rat 1>
+##$VisuSubjectComment=( 2048 )
+<>
+##$VisuAcqDate=<2022-02-01T09:12:33,123+0100>
+##$VisuAcqEchoTime=( 1 )
+8.5
+##$VisuAcqImagePhaseEncDir=( 10 )
+@10*(col_dir)
+##$VisuAcqSize=( 2 )
+256 64
+##END=
+""",
+'subject': """##TITLE=Parameter List, ParaVision 6.0.1
+##JCAMPDX=4.24
+##DATATYPE=Parameter Values
+##ORIGIN=Bruker BioSpin MRI GmbH
+##OWNER=nmrsu
+$$ Tue Feb  1 09:10:00 2022 CET (UT+1h)  nmrsu
+$$ /opt/PV6.0.1/data/nmrsu/nmr/20220201_Rat1.xY1/subject
+##$SUBJECT_id=<Rat1>
+##$SUBJECT_study_name=<Study A = control>
+##$SUBJECT_name_string=<Rat1>
+##$SUBJECT_weight=0.35
+##$SUBJECT_type=Quadruped
+##$SUBJECT_position=SUBJ_POS_Prone
+##$SUBJECT_dbirth=<>
+##$SUBJECT_abs_date=( 3 )
+1643703000 0 60
+##$SUBJECT_remarks=( 2048 )
+<>
+
+##END=
+""",
+}
+
+
+def assert_identical(value, expected, path='value'):
+    assert type(value) is type(expected), f"{path}: {type(value)} != {type(expected)}"
+    if isinstance(expected, np.ndarray):
+        assert value.dtype == expected.dtype and value.shape == expected.shape, path
+        if expected.dtype == object:
+            assert_identical(value.tolist(), expected.tolist(), path)
+        else:
+            assert value.tobytes() == expected.tobytes(), path
+    elif isinstance(expected, dict):
+        assert list(value) == list(expected), path
+        for key in expected:
+            assert_identical(value[key], expected[key], f'{path}[{key!r}]')
+    elif isinstance(expected, (list, tuple)):
+        assert len(value) == len(expected), path
+        for i, (v, e) in enumerate(zip(value, expected)):
+            assert_identical(v, e, f'{path}[{i}]')
+    elif isinstance(expected, float):
+        assert struct.pack('<d', value) == struct.pack('<d', expected), path
+    else:
+        assert value == expected, path
+
+
+def assert_parity(text):
+    stringlist = text.split('\n')
+    try:
+        expected = legacy_parser.parse(stringlist)
+    except Exception as e:
+        with pytest.raises(type(e)):
+            Parameter(stringlist, name='parity').parameters
+        return
+    par = Parameter(stringlist, name='parity')
+    assert_identical((par.header, par.parameters), expected)
+
+
+TOKENS = ['0', '1', '-3', '42', '0.5', '-12.75', '1e-05', '2.5e3', '1.5e+02', '.5', '3.', 'Yes', 'No',
+          '<>', '<a b>', '<FG_SLICE>', '<x, y>', '<$Bis a, b#>', '@3*(0)', '@2*(1.5)', '@4*(-1e-3)', '@2*(col)',
+          '(1, 2)', '(<a>, 3)', '((1, 2), (3, 4))', '(1, (2, <c>))', 'spatial', '=', '$$ note', ',', ' ', '']
+
+
+def random_value(rng):
+    return ' '.join(rng.choice(TOKENS) for _ in range(rng.randint(0, 6)))
+
+
+def random_file(rng):
+    lines = ['##TITLE=Parameter List, ParaVision 360 V3.2', '##JCAMPDX=4.24', '##OWNER=nmrsu']
+    for i in range(rng.randint(1, 4)):
+        kind = rng.random()
+        if kind < 0.35:
+            lines.append(f'##$Key{i}={random_value(rng)}')
+        else:
+            shape = rng.choice(['( 3 )', '( 2, 2 )', '( 1, 3, 2 )', '( 4 )', '( 65 )', '( 2, 65 )', '( 0 )'])
+            lines.append(f'##$Key{i}={shape}')
+            for _ in range(rng.randint(0, 3)):
+                lines.append(rng.choice(['', '$$ comment', '  ' + random_value(rng)]) if rng.random() < 0.2
+                             else random_value(rng))
+        if rng.random() < 0.05:
+            lines.append(f'##Header{i}={random_value(rng)}')
+    lines.append('##END=')
+    return '\n'.join(lines)
+
+
+@pytest.mark.parametrize('name', sorted(CORPUS))
+def test_parser_parity_corpus(name):
+    assert_parity(CORPUS[name])
+
+
+def test_parser_parity_random():
+    for seed in range(500):
+        assert_parity(random_file(random.Random(seed)))
+
+
+def test_parser_parity_pvdataset(pvdataset_dir):
+    for path in sorted(pvdataset_dir.rglob('*')):
+        if path.is_file() and path.name not in ('2dseq', 'fid'):
+            assert_parity(path.read_text())
+
+
+def test_tokenize():
+    stringlist = ['##TITLE=x', '$$ comment', '##$A=( 2 )', '1 2', '', '##$B=<a=b>', '##END=', 'trailing']
+    assert Parser.tokenize(stringlist) == [(HEADER, 'TITLE', 'x', 1, 2),
+                                           (PARAMETER, 'A', '( 2 )', 3, 5),
+                                           (PARAMETER, 'B=<a', 'b>', 6, 6),
+                                           (HEADER, 'END', '', 7, 8)]
+    assert legacy_parser.Parser.load_param(stringlist)[:2] == Parser.load_param(stringlist)[:2]
+
+
+def test_parameter_lazy_decoding(monkeypatch):
+    par = Parameter(CORPUS['visu_pars'].split('\n'), name='visu_pars')
+    decoded = []
+    convert_data_to = Parser.convert_data_to
+    monkeypatch.setattr(Parser, 'convert_data_to',
+                        staticmethod(lambda data, shape: decoded.append(data) or convert_data_to(data, shape)))
+    assert len(par.keys()) == 26 and not decoded
+    assert par['VisuCoreSize'] == [128, 128]
+    assert par.VisuCoreFrameCount == 10
+    assert par.get('VisuCoreWordType') == '_16BIT_SGN_INT'
+    assert par.get('Missing') is None
+    assert len(decoded) == 3
+    par['VisuCoreSize']
+    assert len(decoded) == 3
+    assert list(dict(par.items())) == list(par.keys())
+    assert len(decoded) == 26
+    _, expected = legacy_parser.parse(CORPUS['visu_pars'].split('\n'))
+    assert_identical(par.parameters, expected)
+
+
+
+def test_parameter_selected_keys():
+    stringlist = CORPUS['visu_pars'].split('\n')
+    full = Parameter(stringlist, name='visu_pars')
+    keys = ['VisuCoreSize', 'VisuCoreWordType', 'Missing']
+    par = Parameter(stringlist, name='visu_pars', keys=keys)
+    assert par.header == full.header
+    assert list(par.keys()) == keys[:2]
+    assert_identical(par.parameters, OrderedDict((key, full[key]) for key in keys[:2]))
+
+    consumed = []
+    lines = (consumed.append(line) or line for line in stringlist)
+    par = Parameter(lines, name='visu_pars', keys=['VisuCoreSize'])
+    assert par['VisuCoreSize'] == [128, 128]
+    assert len(consumed) < len(stringlist) / 2
+    assert list(par.keys()) == ['VisuCoreSize']
+
+    consumed.clear()
+    lines = (consumed.append(line) or line for line in stringlist)
+    par = Parameter(lines, name='visu_pars', keys=[])
+    assert list(par.header) == [key for key in full.header if key != 'END'] and not par.keys()
+    assert consumed[-1].startswith('##$') and not any(line.startswith('##$') for line in consumed[:-1])
+
+
+NUMERIC_TOKENS = ['0', '-0', '00', '-00', '7', '-3', '007', '42', '9223372036854775807', '9223372036854775808',
+                  '-9223372036854775809', '18446744073709551616', '0.5', '-12.75', '-0.0', '00.50', '1e-05', '2.5e3',
+                  '1.e5', '.5e3', '1e400', '1e-400', '1.', '.5', '-.5', '--1', '1-2', '-', 'e5', '5e', '1e.5', '1.2.3']
+
+
+def test_parser_parity_numeric_array():
+    rng = random.Random(0)
+    for _ in range(2000):
+        tokens = rng.sample(NUMERIC_TOKENS[:8], 2) + [rng.choice(NUMERIC_TOKENS) for _ in range(rng.randint(0, 4))]
+        rng.shuffle(tokens)
+        shape = rng.choice([f'( {len(tokens)} )', f'( 1, {len(tokens)} )', '( 65 )'])
+        assert_parity(f'##TITLE=x\n##$Array={shape}\n{" ".join(tokens)}\n##$Line={" ".join(tokens)}\n##END=')
+
+
+def best_of(func, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def large_numeric_array(dtype):
+    rng = np.random.default_rng(0)
+    values = rng.integers(-1000, 1000, 100_000) if dtype == 'int' else rng.uniform(-100, 100, 100_000).round(6)
+    text = f'##TITLE=x\n##$Array=( 1000, 100 )\n{" ".join(map(str, values.tolist()))}\n##END='
+    return text.split('\n')
+
+
+@pytest.mark.parametrize('dtype', ['int', 'float'])
+def test_parser_parity_large_numeric_array(dtype):
+    stringlist = large_numeric_array(dtype)
+    assert_identical(Parameter(stringlist, name='bench').parameters, legacy_parser.parse(stringlist)[1])
+
+
+@pytest.mark.timing
+@pytest.mark.parametrize('dtype', ['int', 'float'])
+def test_numeric_array_microbenchmark(dtype):
+    stringlist = large_numeric_array(dtype)
+    legacy = best_of(lambda: legacy_parser.parse(stringlist))
+    fast = best_of(lambda: Parameter(stringlist, name='bench').parameters)
+    print(f'\n100k {dtype} elements: legacy {legacy * 1e3:.1f} ms, vectorized {fast * 1e3:.1f} ms '
+          f'({legacy / fast:.1f}x)')
+    assert fast * 3 < legacy
+
+
+RUN_TOKENS = ['@3*(0)', '@2*(1.5)', '@4*(-1e-3)', '@1*(5)', '@0*(1)', '@2*(1e20)', '@2*(1e-20)', '@*(5)', '@2*(x)',
+              '@-1*(2)', '@2*(-0)', '@2*(007)', '@10*(inf)']
+
+
+def test_parser_parity_run_length_array():
+    rng = random.Random(0)
+    for _ in range(2000):
+        tokens = [rng.choice(RUN_TOKENS) for _ in range(rng.randint(1, 3))] + \
+                 [rng.choice(NUMERIC_TOKENS[:8] + NUMERIC_TOKENS[12:18]) for _ in range(rng.randint(0, 3))]
+        rng.shuffle(tokens)
+        body = rng.choice([' ', ' ', ' ', '  ', '']).join(tokens)
+        body = rng.choice(['', '', ' ']) + body + rng.choice(['', '', ' '])
+        shape = rng.choice(['( 6 )', '( 2, 3 )', '( 1, 6 )', '( 65 )'])
+        assert_parity(f'##TITLE=x\n##$Array={shape}\n{body}\n##$Line={body}\n##END=')
+
+
+def long_run_length_array():
+    rng = np.random.default_rng(0)
+    runs = [f'@{count}*({value})' for count, value in zip(rng.integers(100, 1000, 200).tolist(),
+                                                         rng.uniform(-100, 100, 200).round(3).tolist())]
+    text = f'##TITLE=x\n##$Array=( {len(runs)} )\n{" ".join(runs)}\n##END='
+    return text.split('\n')
+
+
+def test_parser_parity_long_run_length_array():
+    stringlist = long_run_length_array()
+    assert_identical(Parameter(stringlist, name='bench').parameters, legacy_parser.parse(stringlist)[1])
+
+
+@pytest.mark.timing
+def test_run_length_array_microbenchmark():
+    stringlist = long_run_length_array()
+    legacy = best_of(lambda: legacy_parser.parse(stringlist))
+    fast = best_of(lambda: Parameter(stringlist, name='bench').parameters)
+    print(f'\n200 runs: legacy {legacy * 1e3:.1f} ms, vectorized {fast * 1e3:.1f} ms ({legacy / fast:.1f}x)')
+    assert fast * 3 < legacy
+
+
+STRUCT_TOKENS = ['5', '-1', '0.5', '1e-3', '<FG_SLICE>', '<>', '<x y>', 'Yes', '@2*(1)', '1 2', '$Bis', '', ' ']
+
+
+def random_struct(rng, depth=0):
+    parts = []
+    for _ in range(rng.randint(0, 4)):
+        if depth < 4 and rng.random() < 0.4:
+            parts.append(random_struct(rng, depth + 1))
+        else:
+            parts.append(rng.choice(STRUCT_TOKENS))
+    return '(' + rng.choice([', ', ',', ' ']).join(parts) + ')'
+
+
+def test_parser_parity_complex_array():
+    rng = random.Random(0)
+    for _ in range(2000):
+        data = '(' + ' '.join(random_struct(rng, 1) for _ in range(rng.randint(1, 3))) + ')'
+        if rng.random() < 0.2:
+            pos = rng.randrange(1, len(data))
+            data = data[:pos] + rng.choice('()') + data[pos:]
+        if not legacy_parser.re.match(legacy_parser.ptrn_complex_array, data):
+            continue
+        assert_identical(Parser.process_complexarray(data), legacy_parser.Parser.process_complexarray(data))
+        assert_parity(f'##TITLE=x\n##$Struct=( 3 )\n{data}\n##END=')
+
+
+def test_parse_nested_array():
+    assert Parser.parse_nested_array('((1, <a>), (2, <b>))') == [[1, 'a'], [2, 'b']]
+    assert Parser.parse_nested_array('(((a) b (c)), (d))') == [[['a'], 'b', ['c']], ['d']]
+    assert Parser.parse_nested_array('((1) (2)') == [[1], [2]]
+    assert Parser.split_braces('(a (b) c))') == [[1, ['b']], [2, ['a ', [1, ['b']], ' c']]]
+
+
+def large_complex_array():
+    groups = [f'(<FG_{i}>, {i % 7}, {i}, (<sub>, {i * 0.5}, (<leaf>, {-i})), Yes)' for i in range(2000)]
+    return f'({" ".join(groups)})'
+
+
+def test_parser_parity_large_complex_array():
+    data = large_complex_array()
+    expected = legacy_parser.Parser.process_complexarray(data)
+    assert_identical(Parser.process_complexarray(data), expected)
+    assert [len(expected[f'level_{n}']) for n in range(1, 5)] == [2000, 2000, 2000, 1]
+
+
+@pytest.mark.timing
+def test_complex_array_microbenchmark():
+    data = large_complex_array()
+    legacy = best_of(lambda: legacy_parser.Parser.process_complexarray(data))
+    fast = best_of(lambda: Parser.process_complexarray(data))
+    print(f'\n2000 nested groups: legacy {legacy * 1e3:.1f} ms, stack-based {fast * 1e3:.1f} ms '
+          f'({legacy / fast:.1f}x)')
+    assert fast * 3 < legacy
@@ -0,0 +1,158 @@
+import json
+import sqlite3
+import multiprocessing
+import numpy as np
+import pytest
+from collections import OrderedDict
+from .jcampdx import generate, golden_digests
+from brkraw.api.pvobj import PvStudy, Parameter, parameter_cache, parameter_store
+from brkraw.api.pvobj import base
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv('BRKRAW_STORE_DIR', raising=False)
+    monkeypatch.delenv('BRKRAW_STORE_MAX_BYTES', raising=False)
+    parameter_store.configure(root=tmp_path / 'store')
+    parameter_store.reset_stats()
+    parameter_cache.clear()
+    yield tmp_path / 'store'
+    parameter_store.configure()
+    parameter_cache.clear()
+
+
+@pytest.fixture
+def parse_count(monkeypatch):
+    calls = []
+    original = base.Parameter
+
+    def counting_parameter(*args, **kwargs):
+        calls.append(kwargs.get('name'))
+        return original(*args, **kwargs)
+    monkeypatch.setattr(base, 'Parameter', counting_parameter)
+    return calls
+
+
+def read_parameters(path):
+    study = PvStudy(path)
+    return {scan_id: (study.get_scan(scan_id).acqp.parameters, study.get_scan(scan_id).method.header,
+                      study.get_scan(scan_id).method['PVM_EncSteps1'])
+            for scan_id in study.avail}
+
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.delenv('BRKRAW_STORE_DIR', raising=False)
+    assert not parameter_store.enabled
+    assert len(parameter_store) == 0
+
+
+@pytest.mark.parametrize('dataset', ['pvdataset_dir', 'pvdataset_zip'])
+def test_store_across_instances(dataset, store_dir, parse_count, request):
+    path = request.getfixturevalue(dataset)
+    expected = read_parameters(path)
+    assert len(parse_count) == len(expected) * 2
+    assert len(parameter_store) == len(parse_count)
+    parameter_cache.clear()
+    stored = read_parameters(path)
+    assert len(parse_count) == len(expected) * 2
+    assert parameter_store.hits == len(parse_count)
+    for scan_id, (acqp, header, enc_steps) in stored.items():
+        assert list(acqp.items()) == list(expected[scan_id][0].items())
+        assert header == expected[scan_id][1]
+        assert enc_steps == expected[scan_id][2] == [-2, -1, 0, 1]
+
+    method = PvStudy(path).get_scan(1).method
+    assert isinstance(method, Parameter) and list(method.keys()) == ['Method', 'PVM_Matrix', 'PVM_EncSteps1']
+    assert repr(method) == 'Method(scan_id=1)'
+
+
+def test_store_numpy_and_invalidation(pvdataset_dir, store_dir):
+    acqp_path = pvdataset_dir / '1' / 'acqp'
+    acqp_path.write_text(acqp_path.read_text().replace('##$NI=3', '##$ACQ_grad=( 2, 3 )\n1 2 3 4 5 6\n##$NI=3'))
+    expected = PvStudy(pvdataset_dir).get_scan(1).acqp['ACQ_grad']
+    parameter_cache.clear()
+    stored = PvStudy(pvdataset_dir).get_scan(1).acqp['ACQ_grad']
+    assert isinstance(stored, np.ndarray) and stored.dtype == expected.dtype
+    assert np.array_equal(stored, expected)
+
+    acqp_path.write_text(acqp_path.read_text().replace('##$NI=3', '##$NI=5'))
+    parameter_cache.clear()
+    assert PvStudy(pvdataset_dir).get_scan(1).acqp['NI'] == 5
+
+
+@pytest.mark.parametrize('kind', ['acqp', 'method', 'visu_pars'])
+def test_store_decoded_values(kind, store_dir):
+    par = Parameter(generate(kind, 1).split('\n'), name=kind, scan_id=3)
+    key = ('dataset', 3, None, kind, 'signature')
+    parameter_store.put(key, par)
+    with sqlite3.connect(store_dir / parameter_store.filename) as connection:
+        entry = json.loads(connection.execute('SELECT value FROM parameters').fetchone()[0])
+    assert [key for key, _ in entry['parameters']] == list(par.keys())
+    stored = parameter_store.get(key)
+    # the values are loaded decoded, with their types, dtypes and shapes
+    assert stored._contents is None and len(stored._parameters) == len(par._parameters)
+    assert golden_digests(stored) == golden_digests(par) and repr(stored) == repr(par)
+
+
+def test_store_value_encoding(store_dir):
+    values = [None, True, -1, 2 ** 70, 0.1, float('nan'), 'text', ['a', (1, 2.5)], {'level_1': [1]},
+              np.arange(6, dtype='>i4').reshape(2, 3), np.array(['ab', 'c']),
+              np.array([[1, 'a'], [None, 2.0]], dtype=object)]
+    par = Parameter.from_decoded(OrderedDict(TITLE='x'), OrderedDict((f'P{i}', v) for i, v in enumerate(values)),
+                                 name='x')
+    key = ('dataset', None, None, 'x', 'signature')
+    parameter_store.put(key, par)
+    stored = parameter_store.get(key)
+    assert golden_digests(stored) == golden_digests(par) and stored.header == par.header
+    assert stored['P9'].flags.writeable
+
+    # numpy scalars keep their type, and values of other types are not stored
+    parameter_store.put(key, Parameter.from_decoded(OrderedDict(), OrderedDict(P=np.float64(1.5)), name='x'))
+    assert type(parameter_store.get(key)['P']) is np.float64
+    parameter_store.put(key, Parameter.from_decoded(OrderedDict(), OrderedDict(P=object()), name='x'))
+    assert type(parameter_store.get(key)['P']) is np.float64
+    # entries are never unpickled or evaluated
+    with sqlite3.connect(store_dir / parameter_store.filename) as connection:
+        connection.execute('UPDATE parameters SET value = ?',
+                           (json.dumps({'header': [], 'parameters': [['P', {'ndarray': ['|O', [1], '', False]}]],
+                                        'name': 'x', 'scan_id': None, 'reco_id': None}),))
+    assert parameter_store.get(key) is None
+
+
+def test_store_corrupted(pvdataset_dir, store_dir):
+    root = store_dir.parent / 'corrupted'
+    root.mkdir()
+    (root / parameter_store.filename).write_bytes(b'not a database' * 1024)
+    parameter_store.configure(root=root)
+    assert parameter_store.nbytes == 0 and len(parameter_store) == 0 and parameter_store.clear() == 0
+    assert read_parameters(pvdataset_dir)[1][2] == [-2, -1, 0, 1]
+    assert parameter_store.hits == 0
+
+
+def test_store_eviction(pvdataset_dir, store_dir):
+    read_parameters(pvdataset_dir)
+    nbytes = parameter_store.nbytes
+    assert nbytes > 0
+    parameter_store.configure(root=store_dir, max_bytes=nbytes // 2)
+    assert 0 < parameter_store.nbytes <= nbytes // 2
+    entries = len(parameter_store)
+    assert parameter_store.clear() == entries > 0
+    assert parameter_store.nbytes == 0
+
+
+def write_parameters(args):
+    path, root = args
+    parameter_store.configure(root=root)
+    for _ in range(5):
+        parameter_cache.clear()
+        read_parameters(path)
+    return parameter_store.hits
+
+
+def test_store_concurrent_writers(pvdataset_zip, store_dir):
+    with multiprocessing.get_context('spawn').Pool(4) as pool:
+        hits = pool.map(write_parameters, [(pvdataset_zip, store_dir)] * 8)
+    assert sum(hits) > 0
+    assert len(parameter_store) == len(PvStudy(pvdataset_zip).avail) * 2
+    parameter_cache.clear()
+    assert read_parameters(pvdataset_zip)[1][2] == [-2, -1, 0, 1]
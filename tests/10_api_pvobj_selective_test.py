@@ -0,0 +1,62 @@
+import pytest
+from .conftest import as_jcampdx, zip_pvdataset
+from brkraw.api.pvobj import PvStudy, parameter_cache
+from brkraw.api.pvobj import base
+
+
+@pytest.fixture
+def large_pvdataset_dir(pvdataset_dir):
+    filler = ''.join(f'##$Filler{i}=( 64 )\n{" ".join(["0.5"] * 64)}\n' for i in range(1000))
+    body = ('##$ACQ_scan_name=( 64 )\n<1_Localizer>\n##$Method=<Bruker:FLASH>\n' + filler
+            + '##$ACQ_sw_version=( 65 )\n<PV 6.0.1>\n')
+    for scan_id in (1, 2):
+        (pvdataset_dir / str(scan_id) / 'acqp').write_bytes(as_jcampdx(body))
+    return pvdataset_dir
+
+
+@pytest.fixture
+def read_bytes(monkeypatch):
+    nbytes = []
+    original = base.BaseMethods._iter_lines
+
+    def counting_iter_lines(fileobj, chunk_size=8192):
+        for line in original(fileobj, chunk_size):
+            nbytes.append(len(line) + 1)
+            yield line
+    monkeypatch.setattr(base.BaseMethods, '_iter_lines', staticmethod(counting_iter_lines))
+    parameter_cache.clear()
+    yield nbytes
+    parameter_cache.clear()
+
+
+@pytest.mark.parametrize('archive', [False, True])
+def test_get_parameter_keys(large_pvdataset_dir, tmp_path, read_bytes, archive):
+    path = zip_pvdataset(large_pvdataset_dir, tmp_path / 'study.zip') if archive else large_pvdataset_dir
+    study = PvStudy(path)
+    size = (large_pvdataset_dir / '1' / 'acqp').stat().st_size
+    scan = study.get_scan(1)
+
+    acqp = scan.get_parameter('acqp', keys=['ACQ_scan_name', 'Method'])
+    assert list(acqp.keys()) == ['ACQ_scan_name', 'Method']
+    assert acqp.ACQ_scan_name == '1_Localizer' and acqp.Method == 'Bruker:FLASH'
+    assert sum(read_bytes) < size / 10
+    assert len(parameter_cache) == 0
+
+    read_bytes.clear()
+    subject = study.get_parameter('subject', keys=[])
+    assert subject.header['OWNER'] == 'nmrsu' and not subject.keys()
+    assert sum(read_bytes) < 400
+
+    read_bytes.clear()
+    acqp = scan.get_parameter('acqp', keys=['ACQ_sw_version'])
+    assert acqp.ACQ_sw_version == 'PV 6.0.1'
+    assert sum(read_bytes) == size + 1
+
+    visu_pars = scan.get_visu_pars(keys=['VisuCoreSize'])
+    assert list(visu_pars.keys()) == ['VisuCoreSize']
+
+    full = scan.acqp
+    assert scan.get_parameter('acqp') is full
+    assert scan.get_parameter('acqp', keys=['Method']) is full
+    with pytest.raises(FileNotFoundError):
+        scan.get_parameter('procs', keys=[])
@@ -0,0 +1,28 @@
+import json
+import pytest
+from . import legacy_parser
+from .jcampdx import generate, golden_digests, GOLDEN_CASES, GOLDEN_PATH
+from brkraw.api.pvobj import Parameter
+
+
+@pytest.fixture(scope='module')
+def golden():
+    return json.loads(GOLDEN_PATH.read_text())
+
+
+def assert_golden(digests, expected):
+    assert digests['header'] == expected['header']
+    assert list(digests['parameters']) == list(expected['parameters'])
+    changed = [key for key, value in expected['parameters'].items() if digests['parameters'][key] != value]
+    assert not changed, f'decoded values changed: {changed}'
+
+
+@pytest.mark.parametrize('kind,size', GOLDEN_CASES)
+def test_parser_golden(kind, size, golden):
+    assert_golden(golden_digests(Parameter(generate(kind, size).split('\n'), name=kind)), golden[f'{kind}-{size}'])
+
+
+@pytest.mark.parametrize('kind,size', GOLDEN_CASES)
+def test_legacy_parser_golden(kind, size, golden):
+    header, parameters = legacy_parser.parse(generate(kind, size).split('\n'))
+    assert_golden(golden_digests(Parameter.from_decoded(header, parameters, name=kind)), golden[f'{kind}-{size}'])
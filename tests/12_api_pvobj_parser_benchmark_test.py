@@ -0,0 +1,43 @@
+"""Parse throughput of synthetic parameter files, measured with pytest-benchmark.
+
+Run `pytest tests/12_api_pvobj_parser_benchmark_test.py --benchmark-only` to report MB/s and keys/s in the
+extra info of each benchmark; `BRKRAW_BENCH_SIZE` scales the generated files (4 by default).
+"""
+import os
+import json
+import pytest
+from .jcampdx import generate, golden_digests, GOLDEN_PATH
+from brkraw.api.pvobj import Parameter, Parser
+from brkraw.api.pvobj.parser import PARAMETER
+
+pytest.importorskip('pytest_benchmark')
+
+SIZE = int(os.environ.get('BRKRAW_BENCH_SIZE', 4))
+
+
+def report(benchmark, text, num_keys):
+    mean = benchmark.stats.stats.mean
+    benchmark.extra_info.update({'size': SIZE, 'bytes': len(text), 'keys': num_keys,
+                                 'MB/s': round(len(text) / mean / 1e6, 2), 'keys/s': round(num_keys / mean)})
+
+
+@pytest.mark.parametrize('kind', ['acqp', 'method', 'visu_pars'])
+def test_benchmark_parse(benchmark, kind):
+    text = generate(kind, SIZE)
+
+    def parse():
+        par = Parameter(text.split('\n'), name=kind)
+        par.parameters
+        return par
+    par = benchmark(parse)
+    report(benchmark, text, len(par.keys()))
+    golden = json.loads(GOLDEN_PATH.read_text())
+    if (case := f'{kind}-{SIZE}') in golden:
+        assert golden_digests(par) == golden[case]
+
+
+@pytest.mark.parametrize('kind', ['acqp', 'method', 'visu_pars'])
+def test_benchmark_tokenize(benchmark, kind):
+    text = generate(kind, SIZE)
+    records = benchmark(lambda: Parser.tokenize(text.split('\n')))
+    report(benchmark, text, sum(record[0] == PARAMETER for record in records))
@@ -0,0 +1,74 @@
+import random
+import time
+import pytest
+from . import legacy_lib_parser
+from .jcampdx import generate, digest
+from .conftest import build_pvdataset
+from brkraw.lib.parser import Parameter
+
+TOKENS = ['0', '-0', '7', '-3', '007', '42', '9223372036854775808', '0.5', '-12.75', '1e-05', '2.5e3', '1e+20',
+          '1.', '.5', '--1', '@3*(0)', '@2*(1.5)', '@*(5)', '@0*(1)', '<a b>', '<FG_SLICE>', '<$Bis a, b#>', 'Yes',
+          '(1, 2)', '(<a>, 3)', '((1, 2), (3, 4))', ',', '', ' ', '$$ note']
+SHAPES = ['( 3 )', '( 2, 2 )', '( 1, 3, 2 )', '( 65 )', '( 2, x )', '( 0 )']
+
+
+def assert_parity(text):
+    stringlist = text.split('\n')
+    try:
+        expected = legacy_lib_parser.Parameter(stringlist)
+    except Exception as e:
+        with pytest.raises(type(e)):
+            Parameter(stringlist)
+        return
+    par = Parameter(stringlist)
+    assert list(par.headers) == list(expected.headers)
+    assert list(par.parameters) == list(expected.parameters)
+    for key, value in expected.headers.items():
+        assert digest(par.headers[key]) == digest(value), key
+    for key, value in expected.parameters.items():
+        assert digest(par.parameters[key]) == digest(value), key
+
+
+def random_file(rng):
+    lines = ['##TITLE=Parameter List', '##OWNER=nmrsu']
+    for i in range(rng.randint(1, 4)):
+        value = ' '.join(rng.choice(TOKENS) for _ in range(rng.randint(1, 6)))
+        if rng.random() < 0.3:
+            lines.append(f'##$Key{i}={value}')
+        else:
+            lines += [f'##$Key{i}={rng.choice(SHAPES)}', value]
+    return '\n'.join(lines + ['##END='])
+
+
+@pytest.mark.parametrize('kind', ['acqp', 'method', 'visu_pars'])
+def test_lib_parser_parity_generated(kind):
+    for size in (1, 2):
+        for seed in range(10):
+            assert_parity(generate(kind, size, seed))
+
+
+def test_lib_parser_parity_random():
+    rng = random.Random(0)
+    for _ in range(2000):
+        assert_parity(random_file(rng))
+
+
+def test_lib_parser_parity_pvdataset(tmp_path):
+    for path in sorted(build_pvdataset(tmp_path / 'study').rglob('*')):
+        if path.is_file() and path.name not in ('2dseq', 'fid'):
+            assert_parity(path.read_text())
+
+
+@pytest.mark.timing
+def test_lib_parser_speedup():
+    stringlist = generate('method', 8).split('\n')
+    timings = []
+    for parser in (legacy_lib_parser.Parameter, Parameter):
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            parser(stringlist)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best)
+    print(f'\nlegacy lib parser {timings[0] * 1e3:.1f} ms, api-backed {timings[1] * 1e3:.1f} ms')
+    assert timings[1] * 2 < timings[0]
@@ -0,0 +1,170 @@
+import copy
+import shutil
+import zipfile
+import threading
+import pytest
+import numpy as np
+from types import SimpleNamespace
+from collections import OrderedDict
+from .conftest import build_pvdataset, zip_pvdataset
+from brkraw.api.pvobj import PvStudy
+from brkraw.api.pvobj.index import contents_index
+from brkraw.api.pvobj import zran
+from brkraw.api.pvobj.zran import ZipDeflatedMember, DeflateIndex
+from brkraw.api.analyzer import DataArrayAnalyzer
+
+pytestmark = pytest.mark.skipif(zran._load_libz() is None, reason='the zlib library cannot be loaded')
+
+SHAPE, FRAMES = (64, 64), 96
+
+
+@pytest.fixture
+def large_member(monkeypatch):
+    monkeypatch.setenv('BRKRAW_ZRAN', '1')
+    monkeypatch.setattr(ZipDeflatedMember, 'min_size', 1024)
+    monkeypatch.setattr(ZipDeflatedMember, 'span', 64 * 1024)
+    monkeypatch.setattr(ZipDeflatedMember, '_indexes', OrderedDict())
+    monkeypatch.setattr(ZipDeflatedMember, '_building', {})
+
+
+@pytest.fixture
+def deflated_study(tmp_path):
+    root = build_pvdataset(tmp_path / 'study', num_scans=1)
+    rng = np.random.default_rng(0)
+    # smooth images with noise, compressible but not trivially so
+    base = np.add.outer(np.arange(SHAPE[0]), np.arange(SHAPE[1])).astype('<i2')
+    data = np.stack([base + rng.integers(0, 64, SHAPE, dtype='<i2') for _ in range(FRAMES)], axis=-1)
+    (root / '1' / 'pdata' / '1' / '2dseq').write_bytes(data.tobytes(order='F'))
+    return zip_pvdataset(root, tmp_path / 'deflated.zip', zipfile.ZIP_DEFLATED), data
+
+
+def get_infoobj():
+    return SimpleNamespace(dataarray={'slope': 1.0, 'offset': 0.0, 'dtype': np.dtype('<i2')},
+                           image={'shape': list(SHAPE), 'dim_desc': ['spatial'] * 2},
+                           frame_group={'type': 'FG_CYCLE', 'shape': [FRAMES], 'id': ['FG_CYCLE']})
+
+
+def test_random_access(large_member, deflated_study):
+    path, data = deflated_study
+    raw = data.tobytes(order='F')
+    fileobj = PvStudy(path).get_2dseq(1, 1)
+    assert isinstance(fileobj, ZipDeflatedMember)
+    assert fileobj.read() == raw
+    rng = np.random.default_rng(1)
+    for offset in rng.integers(0, len(raw), 50):
+        size = int(rng.integers(1, 100000))
+        fileobj.seek(int(offset))
+        assert fileobj.read(size) == raw[offset:offset + size]
+    fileobj.seek(-10, 2)
+    assert fileobj.read(100) == raw[-10:] and fileobj.read() == b''
+
+    # checkpoints resume in the middle of a byte as well as at byte boundaries
+    checkpoints = fileobj.index.checkpoints
+    assert len(checkpoints) > 4 and any(bits for _, _, bits, _ in checkpoints)
+    for out_offset, *_ in checkpoints:
+        fileobj.seek(out_offset)
+        assert fileobj.read(4096) == raw[out_offset:out_offset + 4096]
+
+
+def test_get_frames(large_member, deflated_study):
+    path, data = deflated_study
+    analyzer = DataArrayAnalyzer(get_infoobj(), PvStudy(path).get_2dseq(1, 1))
+    assert np.array_equal(analyzer.get_frames(FRAMES - 3), data[..., FRAMES - 3:])
+    assert np.array_equal(analyzer.get_frames(1, FRAMES, 17), data[..., 1::17])
+    assert np.array_equal(analyzer.get_dataarray(mmap=True), data)
+
+
+def test_index_persistence(large_member, deflated_study, index_dir, monkeypatch):
+    monkeypatch.setenv('BRKRAW_INDEX', '1')
+    path, data = deflated_study
+    fileobj = PvStudy(path).get_2dseq(1, 1)
+    fileobj.seek(len(fileobj.read()) // 2)
+    expected = fileobj.index
+    assert len(list(index_dir.glob('*.zran'))) == 1
+
+    # a new process loads the checkpoints instead of decompressing the member again
+    monkeypatch.setattr(ZipDeflatedMember, '_indexes', OrderedDict())
+    monkeypatch.setattr(DeflateIndex, 'build', None)
+    fileobj = PvStudy(path).get_2dseq(1, 1)
+    fileobj.seek(data.nbytes - 2)
+    assert fileobj.read() == data[-1, -1, -1].tobytes()
+    loaded = fileobj.index
+    assert loaded is not expected and loaded.size == expected.size == data.nbytes
+    assert loaded.checkpoints == expected.checkpoints
+
+    assert contents_index.clear() >= 1
+    assert not list(index_dir.glob('*.zran'))
+
+
+def test_small_member_uses_zipfile(deflated_study):
+    path, data = deflated_study
+    fileobj = PvStudy(path).get_2dseq(1, 1)
+    assert not isinstance(fileobj, ZipDeflatedMember)
+    assert fileobj.read() == data.tobytes(order='F')
+
+
+def test_disabled_by_default(large_member, deflated_study, monkeypatch):
+    monkeypatch.delenv('BRKRAW_ZRAN')
+    path, data = deflated_study
+    assert not zran.is_available()
+    fileobj = PvStudy(path).get_2dseq(1, 1)
+    assert not isinstance(fileobj, ZipDeflatedMember)
+    assert fileobj.read() == data.tobytes(order='F')
+
+
+def test_crc_mismatch(large_member, deflated_study):
+    path, data = deflated_study
+    raw = data.tobytes(order='F')
+    fileobj = PvStudy(path).get_2dseq(1, 1)
+    fileobj._info = copy.copy(fileobj._info)
+    fileobj._info.CRC ^= 1
+    # reads out of order are not verified
+    fileobj.seek(len(raw) // 2)
+    assert fileobj.read() == raw[len(raw) // 2:]
+    fileobj.seek(0)
+    assert fileobj.read(100) == raw[:100]
+    with pytest.raises(zipfile.BadZipFile, match='Bad CRC-32'):
+        fileobj.read()
+
+
+def test_index_lru(large_member, deflated_study, tmp_path, monkeypatch):
+    path, data = deflated_study
+    monkeypatch.setattr(ZipDeflatedMember, 'max_indexes', 2)
+    builds = []
+    build = DeflateIndex.build
+
+    def counting_build(*args, **kwargs):
+        builds.append(args)
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(DeflateIndex, 'build', counting_build)
+    paths = [shutil.copy(path, tmp_path / f'copy{i}.zip') for i in range(3)]
+    fileobjs = [PvStudy(p).get_2dseq(1, 1) for p in paths]
+    # concurrent readers of a member build its index once
+    threads = [threading.Thread(target=lambda: fileobjs[0].index) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    for fileobj in fileobjs:
+        fileobj.seek(data.nbytes - 2)
+        assert fileobj.read() == data[-1, -1, -1].tobytes()
+    assert len(builds) == 3 and len(ZipDeflatedMember._indexes) == 2
+    assert fileobjs[0]._get_index_path() not in ZipDeflatedMember._indexes
+    assert not ZipDeflatedMember._building
+
+
+def test_truncated_stream(tmp_path):
+    source = tmp_path / 'truncated'
+    source.write_bytes(zlib_raw(b'brkraw' * 10000)[:-20])
+    from brkraw.api.pvobj.pool import FileWindow
+    with FileWindow(source, 0, source.stat().st_size, 'truncated') as window:
+        with pytest.raises(Exception, match='incomplete or truncated'):
+            DeflateIndex.build(window)
+
+
+def zlib_raw(data):
+    import zlib
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
@@ -0,0 +1,148 @@
+import re
+import zipfile
+import threading
+import pytest
+import numpy as np
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from .conftest import zip_pvdataset, tar_pvdataset
+from brkraw.api.pvobj import PvStudy, parameter_cache
+from brkraw.api.pvobj.storage import DirStorage, get_storage, is_url
+from brkraw.api.pvobj.pool import ZipHandlePool, TarHandlePool
+from brkraw.api.pvobj.remote import HttpZipStorage, HttpFile
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Serves files with single range requests, recording the ranges it served."""
+    def send_head(self):
+        if not (header := self.headers.get('Range')) or not self.server.ranges:
+            return super().send_head()
+        path = self.translate_path(self.path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        start, stop = re.match(r'bytes=(\d+)-(\d+)', header).groups()
+        start, stop = int(start), min(int(stop) + 1, len(data))
+        self.server.served.append((self.path, start, stop))
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes {start}-{stop - 1}/{len(data)}')
+        self.send_header('Content-Length', str(stop - start))
+        self.end_headers()
+        self.wfile.write(data[start:stop])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_root(tmp_path):
+    root = tmp_path / 'www'
+    root.mkdir()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(RangeRequestHandler, directory=str(root)))
+    server.served, server.ranges = [], True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield root, f'http://127.0.0.1:{server.server_port}', server
+    server.shutdown()
+    server.server_close()
+
+
+def read_study(study):
+    return {scan_id: (study.get_scan(scan_id).acqp.parameters, study.get_scan(scan_id).method['PVM_EncSteps1'],
+                      study.get_fid(scan_id).read(), study.get_2dseq(scan_id, 1).read())
+            for scan_id in study.avail}
+
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_http_study(pvdataset_dir, http_root, compression):
+    root, url, server = http_root
+    zip_pvdataset(pvdataset_dir, root / 'study.zip', compression)
+    expected = read_study(PvStudy(pvdataset_dir))
+    parameter_cache.clear()
+    with PvStudy(f'{url}/study.zip') as study:
+        assert isinstance(study._pool, HttpZipStorage) and study.is_compressed
+        assert study.path == f'{url}/study.zip'
+        assert study.get_scan(1)._pool is study._pool
+        assert read_study(study) == expected
+        assert study.get_parameter('subject', keys=[]).header['TITLE']
+    # the archive is only ever read by ranges
+    assert server.served and all(path == '/study.zip' for path, *_ in server.served)
+    parameter_cache.clear()
+
+
+def test_http_member_range(pvdataset_dir, http_root):
+    root, url, server = http_root
+    archive = zip_pvdataset(pvdataset_dir, root / 'study.zip')
+    study = PvStudy(f'{url}/study.zip')
+    data = PvStudy(pvdataset_dir).get_2dseq(2, 1).read()
+    member = study.get_scan(2).get_reco(1)._get_member('2dseq')
+    served = len(server.served)
+    assert study._pool.read(member, 10, 6) == data[10:16]
+    # the local file header, then exactly the requested bytes
+    (_, *header), (_, start, stop) = server.served[served:]
+    assert stop - start == 6 and header[1] - header[0] == 30
+    assert study._pool.read(member, len(data) - 4, 100) == data[-4:]
+
+    fileobj = study.get_2dseq(2, 1)
+    assert isinstance(fileobj, HttpFile)
+    fileobj.seek(-2, 2)
+    assert fileobj.read() == data[-2:]
+    with zipfile.ZipFile(archive) as zf:
+        assert study._pool.stat(member) == ((zf.infolist()[member].date_time, len(data),
+                                             zf.infolist()[member].CRC), len(data))
+
+
+def test_http_file_buffer(http_root, monkeypatch):
+    root, url, server = http_root
+    data = bytes(range(256)) * 4
+    (root / 'data.bin').write_bytes(data)
+    monkeypatch.setattr(HttpFile, 'block_size', 64)
+    fileobj = HttpFile(f'{url}/data.bin')
+    assert fileobj.read(10) == data[:10] and fileobj.read(10) == data[10:20]
+    served = len(server.served)
+    # a read larger than the block is requested alone, and keeps the buffer
+    assert fileobj.read(500) == data[20:520] and len(fileobj._block) == 64
+    fileobj.seek(30)
+    assert fileobj.read(10) == data[30:40]
+    assert server.served[served:] == [('/data.bin', 20, 520)]
+    assert fileobj.read() == data[40:]
+
+
+def test_http_without_ranges(pvdataset_dir, http_root):
+    root, url, server = http_root
+    zip_pvdataset(pvdataset_dir, root / 'study.zip')
+    server.ranges = False
+    with pytest.raises(OSError, match='range requests'):
+        PvStudy(f'{url}/study.zip')
+    with pytest.raises(OSError):
+        PvStudy(f'{url}/missing.zip')
+
+
+@pytest.mark.parametrize('kind', ['dir', 'zip', 'tar'])
+def test_storage_backends(pvdataset_dir, tmp_path, kind):
+    path = {'dir': lambda: pvdataset_dir,
+            'zip': lambda: zip_pvdataset(pvdataset_dir, tmp_path / 'study.zip', zipfile.ZIP_DEFLATED),
+            'tar': lambda: tar_pvdataset(pvdataset_dir, tmp_path / 'study.tar')}[kind]()
+    storage = get_storage(path)
+    assert isinstance(storage, {'dir': DirStorage, 'zip': ZipHandlePool, 'tar': TarHandlePool}[kind])
+    assert storage.kind == kind
+    contents = storage.list()
+    dirpath = next(d for d in contents if d.endswith('pdata/1') and d.split('/')[-3] == '1')
+    files = contents[dirpath]['files']
+    member = contents[dirpath]['file_indexes'][files.index('2dseq')] if kind != 'dir' \
+        else f'{dirpath}/2dseq'
+    expected = (pvdataset_dir / '1' / 'pdata' / '1' / '2dseq').read_bytes()
+    signature, size = storage.stat(member)
+    assert size == len(expected) == contents[dirpath]['file_sizes'][files.index('2dseq')]
+    assert storage.read(member) == expected
+    with storage.open(member, 8, 16) as f:
+        assert f.read() == expected[8:24]
+        f.seek(4)
+        assert f.read(4) == expected[12:16]
+    assert storage.read(member, len(expected) - 2, 10) == expected[-2:]
+    assert np.array_equal(np.frombuffer(storage.read(member, 2, 4), '<i2'), [101, 102])
+    storage.close()
+
+
+def test_is_url():
+    assert is_url('http://host/study.zip') and is_url('HTTPS://host/study.zip')
+    assert not is_url('study.zip') and not is_url(None)
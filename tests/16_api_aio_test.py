@@ -0,0 +1,125 @@
+import time
+import asyncio
+import threading
+import zipfile
+import pytest
+import numpy as np
+from types import SimpleNamespace
+from .conftest import zip_pvdataset
+from brkraw.api import aio
+from brkraw.api.aio import AsyncStudy, AsyncScan, DeviceLimiter, get_device
+from brkraw.api.pvobj import PvStudy, parameter_cache
+from brkraw.api.analyzer import DataArrayAnalyzer
+
+
+def get_infoobj(self, reco_id=None):
+    return SimpleNamespace(dataarray={'slope': 1.0, 'offset': 0.0, 'dtype': np.dtype('<i2')},
+                           image={'shape': [4, 4], 'dim_desc': ['spatial'] * 2},
+                           frame_group={'type': 'FG_CYCLE', 'shape': [3], 'id': ['FG_CYCLE']})
+
+
+@pytest.fixture(autouse=True)
+def infoobj(monkeypatch):
+    # the synthetic dataset lacks the parameters analyzed by ScanInfoAnalyzer
+    monkeypatch.setattr(AsyncScan, '_get_info', get_infoobj)
+    yield
+    parameter_cache.clear()
+
+
+@pytest.fixture(params=['dir', 'zip'])
+def study_path(request, pvdataset_dir, tmp_path):
+    if request.param == 'dir':
+        return pvdataset_dir
+    return zip_pvdataset(pvdataset_dir, tmp_path / 'study.zip', zipfile.ZIP_DEFLATED)
+
+
+def test_async_study(pvdataset_dir, study_path):
+    pvstudy = PvStudy(pvdataset_dir)
+    expected = {scan_id: DataArrayAnalyzer(get_infoobj(None), pvstudy.get_2dseq(scan_id, 1)).get_dataarray()
+                for scan_id in pvstudy.avail}
+
+    async def main():
+        async with await AsyncStudy.open(study_path) as study:
+            assert study.avail == pvstudy.avail
+            subject = await study.get_parameter('subject')
+            scans = [scan async for scan in study.iter_scans()]
+            assert await study.get_scan(1) is scans[0]
+            methods = await asyncio.gather(*[scan.get_parameter('method') for scan in scans])
+            arrays = await asyncio.gather(*[scan.get_dataarray() for scan in scans])
+            frames = [frame async for frame in scans[1].iter_frames(start=-1, stop=None, step=-1, batch=2)]
+            visu_pars = await scans[0].get_visu_pars(1, keys=['VisuCoreSize'])
+            return subject, methods, arrays, frames, visu_pars
+
+    subject, methods, arrays, frames, visu_pars = asyncio.run(main())
+    assert subject.parameters == pvstudy.subject.parameters
+    assert [m.parameters for m in methods] == [pvstudy.get_scan(i).method.parameters for i in pvstudy.avail]
+    for scan_id, dataarray in zip(pvstudy.avail, arrays):
+        assert np.array_equal(dataarray, expected[scan_id])
+    assert len(frames) == 3
+    for i, frame in enumerate(frames):
+        assert np.array_equal(frame, expected[2][..., 2 - i])
+    assert list(visu_pars.parameters) == ['VisuCoreSize']
+
+
+def test_device_limit(pvdataset_dir, monkeypatch):
+    running, peak, lock = [0], [0], threading.Lock()
+    get_parameter = PvStudy.get_parameter
+
+    def slow_get_parameter(self, *args, **kwargs):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return get_parameter(self, *args, **kwargs)
+
+    monkeypatch.setattr(PvStudy, 'get_parameter', slow_get_parameter)
+    limiter = DeviceLimiter(8)
+    limiter.set_limit(pvdataset_dir, 2)
+    assert limiter.get_limit(get_device(pvdataset_dir)) == 2
+
+    async def main():
+        study = await AsyncStudy.open(pvdataset_dir, limiter=limiter)
+        await asyncio.gather(*[study.get_parameter('subject') for _ in range(8)])
+
+    asyncio.run(main())
+    assert peak[0] == 2
+    limiter.set_limit(pvdataset_dir, None)
+    assert limiter.get_limit(get_device(pvdataset_dir)) == 8
+    assert get_device('https://Host:8080/study.zip') == 'host:8080'
+
+
+def test_cancel_iter_frames(pvdataset_dir, monkeypatch):
+    buffers = []
+    get_dataarray_analyzer = AsyncScan._get_dataarray_analyzer
+
+    def record_buffer(self, reco_id=None):
+        analyzer = get_dataarray_analyzer(self, reco_id)
+        buffers.append(analyzer.buffer)
+        return analyzer
+
+    monkeypatch.setattr(AsyncScan, '_get_dataarray_analyzer', record_buffer)
+    limiter = DeviceLimiter(1)
+
+    async def main():
+        scan = await (await AsyncStudy.open(pvdataset_dir, limiter=limiter)).get_scan(2)
+        started = asyncio.Event()
+
+        async def consume():
+            async for _ in scan.iter_frames():
+                started.set()
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(consume())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # the slot of the device is released, so the next call runs
+        return await asyncio.wait_for(scan.get_dataarray(), 5)
+
+    dataarray = asyncio.run(main())
+    assert dataarray.shape == (4, 4, 3)
+    assert len(buffers) == 2 and all(b.closed for b in buffers)
+    assert aio._executor is not None
@@ -0,0 +1,74 @@
+import os
+import zipfile
+import pytest
+from .conftest import zip_pvdataset, tar_pvdataset
+from brkraw.api.pvobj import PvStudy
+from brkraw.api.pvobj.pool import ZipHandlePool
+
+
+def fingerprints(study, **kwargs):
+    scan = study.get_scan(2)
+    return study.fingerprint(**kwargs), scan.fingerprint(**kwargs), scan.get_reco(1).fingerprint(**kwargs)
+
+
+def rewrite(path, data):
+    # the same size and modification time, different content
+    stat = os.stat(path)
+    path.write_bytes(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+@pytest.mark.parametrize('kind', ['zip_stored', 'zip_deflated', 'tar', 'shallow'])
+def test_fingerprint_stable_across_forms(pvdataset_dir, tmp_path, kind):
+    path = {'zip_stored': lambda: zip_pvdataset(pvdataset_dir, tmp_path / 'study.zip'),
+            'zip_deflated': lambda: zip_pvdataset(pvdataset_dir, tmp_path / 'study.zip', zipfile.ZIP_DEFLATED),
+            'tar': lambda: tar_pvdataset(pvdataset_dir, tmp_path / 'study.tar'),
+            'shallow': lambda: pvdataset_dir}[kind]()
+    expected = PvStudy(pvdataset_dir)
+    study = PvStudy(path, shallow=kind == 'shallow')
+    assert fingerprints(study) == fingerprints(expected)
+    assert fingerprints(study, sample=2, block_size=8) == fingerprints(expected, sample=2, block_size=8)
+    assert fingerprints(study, mtime=False) == fingerprints(expected, mtime=False)
+    assert len(set(fingerprints(study) + fingerprints(study, sample=2) + fingerprints(study, mtime=False))) == 9
+    # the scans differ by their data only
+    assert study.get_scan(1).fingerprint(sample=1) != study.get_scan(2).fingerprint(sample=1)
+
+
+def test_fingerprint_reads_no_archive_member(pvdataset_zip, monkeypatch):
+    study = PvStudy(pvdataset_zip)
+    expected = study.fingerprint()
+
+    def fail(*args, **kwargs):
+        raise AssertionError('member opened')
+
+    monkeypatch.setattr(ZipHandlePool, 'open', fail)
+    assert PvStudy(pvdataset_zip).fingerprint() == expected
+    with pytest.raises(AssertionError):
+        study.fingerprint(sample=1)
+
+
+def test_fingerprint_changes(pvdataset_dir):
+    study = PvStudy(pvdataset_dir)
+    before = fingerprints(study, sample=1)
+    plain = fingerprints(study)
+    scan1 = study.get_scan(1).fingerprint()
+
+    # a parameter file rewritten in place
+    method = pvdataset_dir / '2' / 'method'
+    rewrite(method, method.read_bytes().replace(b'##$PVM_EncSteps1', b'##$PVM_EncSteps2'))
+    after = fingerprints(study, sample=1)
+    assert after[0] != before[0] and after[1] != before[1] and after[2] == before[2]
+    assert study.get_scan(1).fingerprint() == scan1
+
+    # binary data is only compared when sampled
+    data = pvdataset_dir / '2' / 'pdata' / '1' / '2dseq'
+    rewrite(data, bytes(reversed(data.read_bytes())))
+    assert fingerprints(study)[2] == plain[2]
+    assert fingerprints(study, sample=1)[2] != after[2]
+
+    # a touched file
+    untimed = fingerprints(study, mtime=False)
+    stat = os.stat(data)
+    os.utime(data, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 10))
+    assert fingerprints(study)[2] != plain[2]
+    assert fingerprints(study, mtime=False) == untimed
@@ -0,0 +1,120 @@
+"""Compact parameter mode, and the memory held by parsed parameter files.
+
+Run `pytest tests/18_api_pvobj_parameter_compact_test.py --benchmark-only` to report the bytes held per parsed
+visu_pars, with and without the compact mode, in the extra info of the benchmarks; `BRKRAW_BENCH_SIZE` scales
+the generated files (4 by default).
+"""
+import os
+import gc
+import weakref
+import importlib.util
+import tracemalloc
+import pytest
+import numpy as np
+from .jcampdx import generate
+from brkraw.api.pvobj import PvStudy, Parameter, parameter_cache, parameter_store
+
+SIZE = int(os.environ.get('BRKRAW_BENCH_SIZE', 4))
+
+
+def assert_same(value, compacted):
+    if isinstance(value, list) and isinstance(compacted, np.ndarray):
+        assert compacted.ndim == 1 and np.array_equal(np.asarray(value), compacted)
+        assert compacted.dtype == (np.float64 if any(isinstance(v, float) for v in value) else np.int64)
+    elif isinstance(value, (list, tuple)):
+        assert type(value) is type(compacted) and len(value) == len(compacted)
+        for item, compacted_item in zip(value, compacted):
+            assert_same(item, compacted_item)
+    elif isinstance(value, np.ndarray):
+        assert np.array_equal(value, compacted)
+    else:
+        assert type(value) is type(compacted) and value == compacted
+
+
+@pytest.mark.parametrize('kind', ['acqp', 'method', 'visu_pars'])
+def test_compact_values(kind):
+    lines = generate(kind, 1).split('\n')
+    par = Parameter(lines, name=kind)
+    compact = Parameter(iter(lines), name=kind, compact=True)
+    assert compact._contents is None and compact._params_key_struct is None
+    assert list(compact.keys()) == list(par.keys())
+    assert compact.header == par.header
+    for key, value in par.items():
+        assert_same(value, compact[key])
+    # the slots keep the layout small, while weak references and ad-hoc attributes still work
+    assert compact.__dict__ == {} and weakref.ref(compact)() is compact
+    compact.custom_attribute = 1
+    assert compact.custom_attribute == 1 and compact.__dict__ == {'custom_attribute': 1}
+    assert par.compact() is par and par._contents is None and list(par.keys()) == list(compact.keys())
+    for key, value in compact.items():
+        assert_same(value, par[key])
+
+
+def test_compact_interning():
+    lines = generate('visu_pars', 1).split('\n')
+    first, second = (Parameter(list(lines), name='visu_pars', compact=True) for _ in range(2))
+    for (key, value), (other_key, other) in zip(first.items(), second.items()):
+        assert key is other_key
+        if isinstance(value, (str, int, float)) and value and value == value:
+            assert value is other
+    assert Parameter.compact_value(-0.0) == 0.0 and str(Parameter.compact_value(-0.0)) == '-0.0'
+    assert type(Parameter.compact_value(1.0)) is float and type(Parameter.compact_value(1)) is int
+    assert Parameter.compact_value([1, 2 ** 70]) == [1, 2 ** 70]
+    assert Parameter.compact_value([['a', 1.5], []]) == [['a', 1.5], []]
+
+
+def test_compact_default(pvdataset_dir, monkeypatch):
+    monkeypatch.setattr(Parameter, 'compact_default', True)
+    parameter_cache.clear()
+    scan = PvStudy(pvdataset_dir).get_scan(1)
+    method = scan.method
+    assert method._contents is None
+    assert isinstance(method['PVM_EncSteps1'], np.ndarray)
+    assert scan.get_parameter('acqp', keys=['ACQ_scan_name'])._contents is None
+    assert Parameter(['##TITLE=x', '##END='], name='x', compact=False)._contents is not None
+    parameter_cache.clear()
+
+
+def test_compact_default_store(pvdataset_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(Parameter, 'compact_default', True)
+    parameter_store.configure(root=tmp_path / 'store')
+    parameter_store.reset_stats()
+    parameter_cache.clear()
+    try:
+        method = PvStudy(pvdataset_dir).get_scan(1).method
+        assert method._contents is None and len(parameter_store) == 1
+        parameter_cache.clear()
+        stored = PvStudy(pvdataset_dir).get_scan(1).method
+        assert parameter_store.hits == 1 and stored._contents is None
+        assert np.array_equal(stored['PVM_EncSteps1'], method['PVM_EncSteps1'])
+    finally:
+        parameter_store.configure()
+        parameter_store.reset_stats()
+        parameter_cache.clear()
+
+
+def measure(text, kind, compact, count=50):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        pars = [Parameter(text.split('\n'), name=kind, compact=compact) for _ in range(count)]
+        for par in pars:
+            par.parameters
+        gc.collect()
+        nbytes = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return nbytes / count
+
+
+def test_compact_memory():
+    text = generate('visu_pars', 1)
+    assert measure(text, 'visu_pars', True) < measure(text, 'visu_pars', False) * 0.75
+
+
+@pytest.mark.skipif(not importlib.util.find_spec('pytest_benchmark'), reason='requires pytest-benchmark')
+@pytest.mark.parametrize('compact', [False, True], ids=['default', 'compact'])
+def test_benchmark_memory(benchmark, compact):
+    text = generate('visu_pars', SIZE)
+    nbytes = benchmark.pedantic(measure, args=(text, 'visu_pars', compact, 10), rounds=1)
+    benchmark.extra_info.update({'size': SIZE, 'bytes': len(text), 'bytes/visu_pars': round(nbytes)})
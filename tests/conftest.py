@@ -1,9 +1,27 @@
+import os
 import pytest
 import re
+import zipfile
+import tarfile
+import numpy as np
 from pathlib import Path
 from brkraw.api.pvobj import PvStudy
 from pprint import pprint
 
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'timing: wall-clock speed comparisons, only run with BRKRAW_TIMING=1')
+
+
+def pytest_collection_modifyitems(config, items):
+    # speed ratios are unreliable on loaded machines or under tracing, so they are opt-in
+    if os.environ.get('BRKRAW_TIMING'):
+        return
+    skip = pytest.mark.skip(reason='BRKRAW_TIMING is not set')
+    for item in items:
+        if 'timing' in item.keywords:
+            item.add_marker(skip)
+
+
 # test functions
 def get_version(raw):
     ptrn = r'^[a-zA-Z]*[ -]?(?P<version>\d+\.\d+(?:\.\d+)?)'
@@ -28,8 +46,10 @@ def dataset():
     return get_dataset()
 
 def get_dataset():
-    dataset_path = Path('/mnt/nfs/active/Xoani_Lee_Package-dev/playground/brkraw_dev')
-    
+    # a directory of real PvDatasets, e.g. the samples of https://github.com/BrkRaw/brkraw-tutorial
+    if not (dataset_path := os.environ.get('BRKRAW_TEST_DATASET')):
+        pytest.skip('BRKRAW_TEST_DATASET is not set')
+    dataset_path = Path(dataset_path)
     dataset = {}
     for contents in dataset_path.iterdir():
         if raw := check_contents(contents):
@@ -37,4 +57,85 @@ def get_dataset():
                 if version not in dataset.keys():
                     dataset[version] = {}
                 dataset[version][raw.path.name] = raw
-    return dataset
\ No newline at end of file
+    return dataset
+
+# synthetic PvDataset
+JCAMP_HEADER = ("##TITLE=Parameter List, ParaVision 6.0.1\n"
+                "##JCAMPDX=4.24\n"
+                "##DATATYPE=Parameter Values\n"
+                "##ORIGIN=Bruker BioSpin MRI GmbH\n"
+                "##OWNER=nmrsu\n"
+                "$$ Wed Jul 24 11:49:46 2019 EDT (UTC-4) nmrsu\n")
+
+PARAMETER_FILES = {
+    'subject': ("##$SUBJECT_id=( 64 )\n<BRKRAW_1_1>\n"
+                "##$SUBJECT_study_name=( 64 )\n<1>\n"
+                "##$SUBJECT_position=SUBJ_POS_Supine\n"),
+    'acqp': ("##$ACQ_sw_version=( 65 )\n<PV 6.0.1>\n"
+             "##$ACQ_scan_name=( 64 )\n<1_Localizer>\n"
+             "##$NI=3\n"
+             "##$ACQ_phase_factor=1\n"
+             "##$ACQ_dim=2\n"),
+    'method': ("##$Method=<Bruker:FLASH>\n"
+               "##$PVM_Matrix=( 2 )\n4 4\n"
+               "##$PVM_EncSteps1=( 4 )\n-2 -1 0 1\n"),
+    'visu_pars': ("##$VisuCoreSize=( 2 )\n4 4\n"
+                  "##$VisuCoreWordType=_16BIT_SGN_INT\n"
+                  "##$VisuCoreByteOrder=littleEndian\n"
+                  "##$VisuCoreFrameCount=3\n"),
+    'reco': ("##$RECO_size=( 2 )\n4 4\n"
+             "##$RECO_wordtype=_16BIT_SGN_INT\n"),
+}
+
+
+def as_jcampdx(body: str) -> bytes:
+    return (JCAMP_HEADER + body + "##END=\n").encode('UTF-8')
+
+
+def build_pvdataset(root: Path, num_scans: int = 2):
+    """Write a minimal ParaVision study (subject, acqp, method, fid, 2dseq, visu_pars, reco) under root."""
+    root.mkdir(parents=True, exist_ok=True)
+    (root / 'subject').write_bytes(as_jcampdx(PARAMETER_FILES['subject']))
+    for scan_id in range(1, num_scans + 1):
+        scan_dir = root / str(scan_id)
+        reco_dir = scan_dir / 'pdata' / '1'
+        reco_dir.mkdir(parents=True)
+        for fname in ['acqp', 'method']:
+            (scan_dir / fname).write_bytes(as_jcampdx(PARAMETER_FILES[fname]))
+        (scan_dir / 'fid').write_bytes(np.arange(4 * 4 * 3 * 2, dtype='<i4').tobytes())
+        for fname in ['visu_pars', 'reco']:
+            (reco_dir / fname).write_bytes(as_jcampdx(PARAMETER_FILES[fname]))
+        data = (np.arange(4 * 4 * 3, dtype='<i2') + scan_id * 100)
+        (reco_dir / '2dseq').write_bytes(data.tobytes())
+    return root
+
+
+def zip_pvdataset(root: Path, dest: Path, compression: int = zipfile.ZIP_STORED):
+    with zipfile.ZipFile(dest, 'w', compression=compression) as zf:
+        for path in sorted(root.rglob('*')):
+            if path.is_file():
+                zf.write(path, arcname=os.path.join(root.name, path.relative_to(root)))
+    return dest
+
+
+def tar_pvdataset(root: Path, dest: Path, mode: str = 'w'):
+    with tarfile.open(dest, mode) as tf:
+        tf.add(root, arcname=root.name)
+    return dest
+
+
+@pytest.fixture(autouse=True)
+def index_dir(tmp_path_factory, monkeypatch):
+    path = tmp_path_factory.mktemp('index')
+    monkeypatch.setenv('BRKRAW_INDEX_DIR', str(path))
+    return path
+
+
+@pytest.fixture
+def pvdataset_dir(tmp_path):
+    return build_pvdataset(tmp_path / 'study')
+
+
+@pytest.fixture
+def pvdataset_zip(pvdataset_dir, tmp_path):
+    return zip_pvdataset(pvdataset_dir, tmp_path / 'study.zip')
@@ -0,0 +1,187 @@
+"""Synthetic JCAMP-DX parameter files for the parser benchmarks and golden tests.
+
+The generated acqp, method and visu_pars files mimic the layout of ParaVision files: the header preamble,
+scalar and enum parameters, strings, long numeric arrays wrapped over several lines, PV360 @N*(value) runs,
+struct arrays, nested parenthesized arrays and $Bis strings. The output only depends on the kind, the size
+and the seed, so the decoded values can be checked against the golden digests in `golden/parser.json`.
+
+Run `python -m tests.jcampdx` from the repository root to regenerate the golden digests after an intended
+change of the decoded values.
+"""
+
+import json
+import random
+import struct
+import hashlib
+import numpy as np
+from pathlib import Path
+
+GOLDEN_PATH = Path(__file__).parent / 'golden' / 'parser.json'
+GOLDEN_CASES = [(kind, size) for kind in ('acqp', 'method', 'visu_pars') for size in (1, 4)]
+
+PREAMBLE = ['##TITLE=Parameter List, ParaVision 360 V3.2',
+            '##JCAMPDX=4.24',
+            '##DATATYPE=Parameter Values',
+            '##ORIGIN=Bruker BioSpin MRI GmbH',
+            '##OWNER=nmrsu',
+            '$$ Wed Jul 24 11:49:46 2019 EDT (UTC-4) nmrsu',
+            '$$ /opt/PV-360.3.2/data/nmrsu/20190724_114946_BRKRAW_1_1/{kind}']
+
+# the parameter mix of each kind: (generator name, relative count)
+KINDS = {
+    'acqp': [('scalar', 12), ('enum', 8), ('string', 6), ('int_array', 6), ('float_array', 4), ('runs', 2),
+             ('struct_array', 2), ('nested', 1), ('bis', 1)],
+    'method': [('scalar', 10), ('enum', 10), ('string', 4), ('int_array', 8), ('float_array', 6), ('runs', 4),
+               ('struct_array', 3), ('nested', 2), ('bis', 1)],
+    'visu_pars': [('scalar', 6), ('enum', 6), ('string', 4), ('int_array', 2), ('float_array', 6),
+                  ('runs', 2), ('struct_array', 4), ('nested', 2), ('bis', 1)],
+}
+ENUMS = ['Yes', 'No', 'On', 'Off', 'FG_SLICE', 'FG_ECHO', 'FG_CYCLE', 'SUBJ_POS_Supine', '_16BIT_SGN_INT',
+         'littleEndian', 'Head_Prone', 'Cartesian', 'Magnitude_Image']
+WORDS = ['Localizer', 'FLASH', 'RARE', 'EPI', 'T2_TurboRARE', 'Bruker', 'mouse brain', 'coronal', 'B0Map',
+         'rest', 'task-fingertap', 'Quadrature Volume Coil']
+
+
+def wrap(tokens, width=72):
+    """Joins the tokens by spaces into lines of at most `width` characters, as ParaVision writes arrays."""
+    lines, line = [], ''
+    for token in tokens:
+        if line and len(line) + len(token) + 1 > width:
+            lines.append(line)
+            line = token
+        else:
+            line = f'{line} {token}' if line else token
+    return lines + [line]
+
+
+def format_float(rng, value):
+    return rng.choice([f'{value:.6g}', f'{value:.4f}', repr(round(value, 8))])
+
+
+def make_scalar(rng, size):
+    return [rng.choice([str(rng.randint(-1000, 100000)), format_float(rng, rng.uniform(-1e3, 1e3)),
+                        f'{rng.uniform(1e-9, 1e-3):.6e}'.replace('e-0', 'e-')])]
+
+
+def make_enum(rng, size):
+    return [rng.choice(ENUMS)]
+
+
+def make_string(rng, size):
+    return ['( 64 )', f'<{rng.choice(WORDS)} {rng.randint(1, 99)}>']
+
+
+def make_int_array(rng, size):
+    length = rng.randint(16, 128) * size
+    steps = rng.choice([list(range(-length // 2, length // 2)), [rng.randint(0, 65535) for _ in range(length)]])
+    return [f'( {length} )'] + wrap(map(str, steps))
+
+
+def make_float_array(rng, size):
+    rows, cols = rng.randint(2, 8) * size, rng.randint(3, 32)
+    values = [format_float(rng, rng.gauss(0, 50)) for _ in range(rows * cols)]
+    return [f'( {rows}, {cols} )'] + wrap(values)
+
+
+def make_runs(rng, size):
+    tokens, length = [], 0
+    for _ in range(rng.randint(4, 16) * size):
+        if rng.random() < 0.6:
+            count = rng.randint(2, 256)
+            tokens.append(f'@{count}*({rng.choice(["0", "1", "-1", "0.5", "100", "1e-3"])})')
+        else:
+            count = 1
+            tokens.append(rng.choice(['0', '1', '2.5', '-3', '1e-05']))
+        length += count
+    return [f'( {length} )'] + wrap(tokens)
+
+
+def make_struct_array(rng, size):
+    count = rng.randint(1, 4) * size
+    groups = [f'({rng.randint(1, 64)}, <{rng.choice(ENUMS)}>, <{rng.choice(["", "FG_ISA"])}>, '
+              f'{rng.randint(0, 8)}, {rng.randint(1, 4)})' for _ in range(count)]
+    return [f'( {count} )'] + wrap(groups)
+
+
+def make_nested(rng, size):
+    def group(depth):
+        items = []
+        for _ in range(rng.randint(2, 5)):
+            if depth < 3 and rng.random() < 0.3:
+                items.append(group(depth + 1))
+            else:
+                items.append(rng.choice([str(rng.randint(0, 512)), format_float(rng, rng.uniform(-90, 90)),
+                                         f'<{rng.choice(WORDS)}>', rng.choice(ENUMS), '<>']))
+        return '(' + ', '.join(items) + ')'
+    count = rng.randint(1, 3) * size
+    return [f'( {count} )', '(' + ' '.join(group(1) for _ in range(count)) + ')']
+
+
+def make_bis(rng, size):
+    count = rng.randint(1, 3)
+    return [f'( {count}, 65 )'] + [f'<$Bis{rng.randint(0, 9)} {rng.choice(WORDS)}, '
+                                   f'{rng.randint(0, 99)}#>' for _ in range(count)]
+
+
+def generate(kind='acqp', size=1, seed=0):
+    """Generates a synthetic parameter file.
+
+    Args:
+        kind (str): The kind of file, 'acqp', 'method' or 'visu_pars'.
+        size (int): The scale of the file. The number of parameters and the length of the arrays grow with it.
+        seed (int): The seed of the generator.
+
+    Returns:
+        str: The content of the file.
+    """
+    rng = random.Random(f'{kind}-{size}-{seed}')
+    lines = [line.format(kind=kind) for line in PREAMBLE]
+    index = 0
+    for name, count in KINDS[kind]:
+        for _ in range(count * size):
+            value, *data = globals()[f'make_{name}'](rng, size)
+            lines.append(f'##${kind.upper()}_{name}{index}={value}')
+            if rng.random() < 0.02:
+                lines.append('$$ @vis= comment')
+            lines.extend(data)
+            index += 1
+    lines.append('##END=')
+    return '\n'.join(lines) + '\n'
+
+
+def encode(value):
+    """Encodes a decoded value into JSON-compatible data that keeps types, dtypes and float bits."""
+    if isinstance(value, np.ndarray):
+        data = encode(value.tolist()) if value.dtype == object else hashlib.sha1(value.tobytes()).hexdigest()
+        return ['ndarray', value.dtype.str, list(value.shape), data]
+    if isinstance(value, dict):
+        return ['dict', [[key, encode(item)] for key, item in value.items()]]
+    if isinstance(value, (list, tuple)):
+        return [type(value).__name__, [encode(item) for item in value]]
+    if isinstance(value, float):
+        return ['float', struct.pack('<d', value).hex()]
+    return [type(value).__name__, value]
+
+
+def digest(value):
+    """Returns the SHA-1 digest of the encoding of a decoded value."""
+    return hashlib.sha1(json.dumps(encode(value)).encode('UTF-8')).hexdigest()
+
+
+def golden_digests(parameter):
+    """Returns the digests of the headers and of each parameter of a parsed file."""
+    return {'header': digest(parameter.header),
+            'parameters': {key: digest(value) for key, value in parameter.parameters.items()}}
+
+
+def update_golden():
+    from brkraw.api.pvobj import Parameter
+    golden = {f'{kind}-{size}': golden_digests(Parameter(generate(kind, size).split('\n'), name=kind))
+              for kind, size in GOLDEN_CASES}
+    GOLDEN_PATH.parent.mkdir(exist_ok=True)
+    GOLDEN_PATH.write_text(json.dumps(golden, indent=1) + '\n')
+    return golden
+
+
+if __name__ == '__main__':
+    print(f'{len(update_golden())} golden cases written to {GOLDEN_PATH}')